@@ -0,0 +1,200 @@
+"""Content-addressed local cache of downloaded season archives.
+
+Each archive is stored once under ``blobs/<digest>.zip``, where the digest is
+the whole-file digest computed while downloading (see ``integrity``). An
+index maps every download URL to the blob it produced, together with the
+server's validators (size, ETag, Last-Modified), so a reinstall - or a second
+install location - is served from disk without touching the network.
+
+The cache has a size cap; when it is exceeded the least recently used
+archives are evicted.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import zipfile
+
+import integrity
+
+INDEX_NAME = 'index.json'
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+
+
+class CacheError(Exception):
+    """Raised when a file cannot be added to the cache."""
+
+
+class ArchiveCache:
+    """Size-capped LRU store of archives keyed by content digest."""
+
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.blob_dir = os.path.join(root, 'blobs')
+        self.index_path = os.path.join(root, INDEX_NAME)
+        self._lock = threading.Lock()
+
+    # -- index -------------------------------------------------------------
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data.get('entries'), dict):
+                return data
+        except Exception:
+            pass
+        return {'entries': {}}
+
+    def _save(self, data):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self.index_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, self.index_path)
+
+    def blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest + '.zip')
+
+    # -- lookups -----------------------------------------------------------
+
+    def lookup(self, url, info=None, manifest=None):
+        """Return the cached archive for ``url`` or None.
+
+        ``info`` is a ``downloader.probe`` result; when the server reported a
+        size or validators they must match what was recorded. Without it
+        (e.g. offline) the most recently cached archive for the URL is used.
+        A ``manifest`` for the URL pins the exact content digest.
+        """
+        with self._lock:
+            data = self._load()
+            best = None
+            for digest, entry in data['entries'].items():
+                source = entry.get('urls', {}).get(url)
+                if source is None or not os.path.exists(self.blob_path(digest)):
+                    continue
+                if manifest is not None and digest != manifest.root:
+                    continue
+                if info is not None and not _validators_match(source, entry, info):
+                    continue
+                if best is None or entry.get('last_used', 0) > data['entries'][best].get('last_used', 0):
+                    best = digest
+            if best is None:
+                return None
+            data['entries'][best]['last_used'] = time.time()
+            self._save(data)
+            return self.blob_path(best)
+
+    def entries(self):
+        """Return ``[(digest, entry)]`` for everything in the cache."""
+        with self._lock:
+            return list(self._load()['entries'].items())
+
+    def total_bytes(self):
+        return sum(e.get('size', 0) for _, e in self.entries())
+
+    # -- updates -----------------------------------------------------------
+
+    def put(self, path, url, info, digest, move=True):
+        """Add the archive at ``path`` and return its cached path (or None if it does not fit).
+
+        With ``move`` the file is moved into the cache (renamed when it is on
+        the same volume); otherwise it is copied.
+        """
+        size = os.path.getsize(path)
+        if size > self.max_bytes:
+            if move:
+                _remove(path)
+            return None
+        blob = self.blob_path(digest)
+        os.makedirs(self.blob_dir, exist_ok=True)
+        with self._lock:
+            if os.path.exists(blob):
+                # Same content already cached (e.g. another URL): deduplicate
+                if move:
+                    _remove(path)
+            elif move:
+                try:
+                    os.replace(path, blob)
+                except OSError:
+                    # different volume
+                    _copy_atomic(path, blob)
+                    _remove(path)
+            else:
+                _copy_atomic(path, blob)
+
+            data = self._load()
+            now = time.time()
+            entry = data['entries'].setdefault(digest, {'size': size, 'created': now, 'urls': {}})
+            entry['size'] = size
+            entry['last_used'] = now
+            entry['urls'][url] = {
+                'size': (info or {}).get('total') or size,
+                'etag': (info or {}).get('etag'),
+                'last_modified': (info or {}).get('last_modified'),
+            }
+            self._evict(data, keep=digest)
+            self._save(data)
+        return blob
+
+    def preseed(self, zip_path, url, info=None):
+        """Copy an existing archive (e.g. a zip downloaded by hand) into the cache.
+
+        The file is hashed once to find its digest. If ``info`` says how big
+        the remote file is, the local one must be the same size.
+        """
+        if not zipfile.is_zipfile(zip_path):
+            raise CacheError(f"{zip_path} is not a zip archive")
+        size = os.path.getsize(zip_path)
+        if info and info.get('total') and info['total'] != size:
+            raise CacheError(f"{os.path.basename(zip_path)} is {size} bytes but the download is {info['total']} bytes")
+        manifest = integrity.hash_file(zip_path)
+        # Only the size is known for a hand-supplied file; ETag/Last-Modified
+        # stay unset so any server validators are accepted
+        self.put(zip_path, url, {'total': size}, manifest.root, move=False)
+        return manifest
+
+    def remove(self, digest):
+        with self._lock:
+            data = self._load()
+            data['entries'].pop(digest, None)
+            _remove(self.blob_path(digest))
+            self._save(data)
+
+    def _evict(self, data, keep=None):
+        """Drop least recently used blobs until the cache fits. Caller holds the lock."""
+        entries = data['entries']
+        total = sum(e.get('size', 0) for e in entries.values())
+        for digest in sorted(entries, key=lambda d: entries[d].get('last_used', 0)):
+            if total <= self.max_bytes:
+                break
+            if digest == keep:
+                continue
+            total -= entries[digest].get('size', 0)
+            _remove(self.blob_path(digest))
+            del entries[digest]
+
+
+def _validators_match(source, entry, info):
+    total = info.get('total')
+    if total is not None and total != entry.get('size'):
+        return False
+    for key in ('etag', 'last_modified'):
+        if source.get(key) and info.get(key) and source[key] != info[key]:
+            return False
+    return True
+
+
+def _copy_atomic(src, dst):
+    tmp = dst + '.tmp'
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -34,7 +34,11 @@ if (Test-Path "build\launcher.spec") { Remove-Item "build\launcher.spec" -Force
 Write-Host "Running PyInstaller... this may take a while"
 # On Windows PyInstaller expects add-data with a semicolon separator
 $addData = "assets;assets"
-& $PythonExe -m PyInstaller --noconsole --onefile --icon $ico --add-data $addData launcher.py
+# launcher.py imports these on first use (LazyModule), which PyInstaller cannot see
+$hidden = @("tkinter.ttk", "tkinter.filedialog", "tkinter.messagebox", "zipfile", "webbrowser",
+            "downloader", "installer", "integrity", "saves", "savewatch", "snapshots")
+$hiddenArgs = $hidden | ForEach-Object { "--hidden-import=$_" }
+& $PythonExe -m PyInstaller --noconsole --onefile --icon $ico --add-data $addData @hiddenArgs launcher.py
 
 Write-Host "Done. The single-file executable is in the 'dist' folder."
 Write-Host "Example: dist\launcher.exe"
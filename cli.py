@@ -0,0 +1,436 @@
+"""Command line front end for installing seasons and managing saves without Tk.
+
+Usage::
+
+    python cli.py install 1 [--target DIR] [--mirror URL ...]
+    python cli.py verify 2 [--repair] [--full]
+    python cli.py status 2
+    python cli.py uninstall 1
+    python cli.py backup 1 saves.zip [--saves-dir DIR] [--preset smallest]
+    python cli.py import 1 saves.zip [--saves-dir DIR] [--yes]
+    python cli.py undo-import 1 [--saves-dir DIR]
+    python cli.py snapshot 1 [--saves-dir DIR]
+    python cli.py snapshots 1
+    python cli.py restore 1 SNAPSHOT_ID [--saves-dir DIR] [--yes]
+    python cli.py export 1 SNAPSHOT_ID saves.zip [--preset fastest]
+    python cli.py watch [1 2]
+    python cli.py launch 2 [--exe PATH]
+
+Progress and results are written to stdout as JSON lines, one object per
+line with an ``event`` key (``status``, ``progress``, ``result``,
+``error``, and per-file ``damaged``/``changed``/``snapshot``), so batch
+scripts can follow along. The exit status is 0 on success, 1 on failure and
+3 when an import or restore was refused because it would overwrite saves
+without ``--yes``.
+
+This module must not import tkinter or PIL.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import zipfile
+
+import downloader
+import installer
+import saves
+import savewatch
+import settings
+import snapshots
+import zipwriter
+
+PROGRESS_INTERVAL = 0.5
+EXIT_FAILED = 1
+EXIT_DECLINED = 3
+
+
+class JsonLines:
+    """Writes events as JSON lines; progress is throttled to one line per interval."""
+
+    def __init__(self, stream=None, interval=PROGRESS_INTERVAL):
+        self.stream = stream or sys.stdout
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._last = {}
+
+    def emit(self, event, **fields):
+        fields = dict(event=event, time=round(time.time(), 3), **fields)
+        line = json.dumps(fields, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def status(self, text, percent=None):
+        self.emit('status', text=text, percent=percent)
+
+    def progress(self, stage, done, total, unit='bytes'):
+        # download workers call this from several threads; only one of them
+        # may pass the throttle for a given interval
+        now = time.monotonic()
+        with self._lock:
+            last = self._last.get(stage, 0)
+            if done != total and now - last < self.interval:
+                return
+            self._last[stage] = now
+        percent = round(done * 100.0 / total, 1) if total else None
+        self.emit('progress', stage=stage, done=done, total=total, unit=unit, percent=percent)
+
+
+def _season(number):
+    return installer.SEASONS[int(number)]
+
+
+def _season_number(text):
+    if text not in ('1', '2'):
+        raise argparse.ArgumentTypeError(f"invalid season {text!r} (choose 1 or 2)")
+    return int(text)
+
+
+def _saves_dir(season, args, config):
+    return args.saves_dir or config.get(season['saves_key']) or season['saves_dir']
+
+
+def _preset(args, config):
+    return args.preset or config.get('backup_preset') or zipwriter.DEFAULT_PRESET
+
+
+def _write_summary(result):
+    return dict(files=result.files, bytes=result.file_bytes, compressed=result.compressed_bytes,
+                seconds=round(result.seconds, 3), preset=result.preset,
+                codecs={name: dict(c, seconds=round(c['seconds'], 3)) for name, c in result.codecs.items()})
+
+
+def cmd_install(args, out, config):
+    season = _season(args.season)
+    target_dir = os.path.abspath(args.target or installer.default_install_dir(season))
+    mirrors = args.mirror or list(config.get(season['mirrors_key']) or [])
+    cache = settings.make_archive_cache(config)
+    out.status(f"Installing {season['title']} to {target_dir}", 0)
+    found = installer.install_season(season, target_dir, cache, mirrors,
+                                     progress=lambda done, total: out.progress('download', done, total),
+                                     status=out.status,
+                                     extract_progress=lambda done, total: out.progress('extract', done, total))
+    if not found:
+        out.emit('error', message=f"Extracted to {target_dir} but did not find {season['exe']}")
+        return EXIT_FAILED
+    config[season['config_key']] = found
+    settings.save_config(config)
+    out.emit('result', ok=True, target=target_dir, exe=found)
+    return 0
+
+
+def cmd_verify(args, out, config):
+    season = _season(args.season)
+    exe_path = args.exe or config.get(season['config_key'])
+    if not exe_path:
+        out.emit('error', message=f"{season['title']} is not installed (use --exe)")
+        return EXIT_FAILED
+    info = downloader.probe(season['url'])
+    archive = installer.open_archive(season['url'], settings.make_archive_cache(config), info if info['total'] else None)
+    try:
+        infos = archive.infolist()
+        install = installer.find_install(exe_path)
+        root = installer.install_root(infos, season, exe_path, install)
+        pairs = installer.member_paths(infos, root, season.get('layout', ()))
+        # the install manifest narrows the check to files that changed
+        checked = pairs if args.full or install is None else installer.changed_pairs(pairs, install)
+        problems = installer.verify_install(checked, quick=args.quick,
+                                            progress=lambda done, total: out.progress('verify', done, total))
+        for info_, path, reason in problems:
+            out.emit('damaged', path=path, reason=reason, size=info_.file_size)
+        if install is not None and not args.quick:
+            damaged = {p for _, p, _ in problems}
+            installer.record_files(install, [p for _, p in checked if p not in damaged])
+        fixed = 0
+        if problems and args.repair:
+            fixed = installer.repair_install(archive, problems, root,
+                                             progress=lambda done, total: out.progress('repair', done, total))
+            if install is not None:
+                installer.record_files(install, [p for _, p, _ in problems])
+    finally:
+        archive.close()
+    ok = not problems or fixed == len(problems)
+    out.emit('result', ok=ok, files=len(pairs), checked=len(checked), damaged=len(problems), repaired=fixed)
+    return 0 if ok else EXIT_FAILED
+
+
+def _find_install(season, args, out, config):
+    exe_path = args.exe or config.get(season['config_key'])
+    install = installer.find_install(exe_path)
+    if install is None:
+        out.emit('error', message=f"No install record found for {season['title']} (use --exe)")
+    return install
+
+
+def cmd_status(args, out, config):
+    season = _season(args.season)
+    install = _find_install(season, args, out, config)
+    if install is None:
+        return EXIT_FAILED
+    changes = install.changes()
+    for name, reason in changes:
+        out.emit('changed', path=install.full_path(name), reason=reason)
+    out.emit('result', ok=True, root=install.root, exe=install.exe_path(), files=len(install.files),
+             bytes=install.disk_usage(), changed=len(changes))
+    return 0
+
+
+def cmd_uninstall(args, out, config):
+    season = _season(args.season)
+    install = _find_install(season, args, out, config)
+    if install is None:
+        return EXIT_FAILED
+    exe_path = install.exe_path()
+    removed, failed = install.uninstall(progress=lambda i, total: out.progress('uninstall', i, total, unit='files'))
+    for name, message in failed:
+        out.emit('error', path=os.path.join(install.root, *name.split('/')), message=message)
+    if exe_path and not os.path.exists(exe_path) and \
+            os.path.normcase(config.get(season['config_key']) or '') == os.path.normcase(exe_path):
+        config[season['config_key']] = ""
+        settings.save_config(config)
+    out.emit('result', ok=not failed, root=install.root, removed=removed, failed=len(failed))
+    return EXIT_FAILED if failed else 0
+
+
+def cmd_backup(args, out, config):
+    season = _season(args.season)
+    saves_dir = _saves_dir(season, args, config)
+    files = saves.find_save_files(saves_dir)
+    if not files:
+        out.emit('error', message=f"No save files found in {saves_dir}")
+        return EXIT_FAILED
+    result = saves.backup_saves(files, args.dest, preset=_preset(args, config),
+                                progress=lambda i, total: out.progress('backup', i, total, unit='files'))
+    out.emit('result', ok=True, dest=os.path.abspath(args.dest), **_write_summary(result))
+    return 0
+
+
+def cmd_import(args, out, config):
+    season = _season(args.season)
+    saves_dir = _saves_dir(season, args, config)
+
+    def confirm(overwrites):
+        if not args.yes:
+            out.emit('error', message=f"{len(overwrites)} existing save file(s) would be overwritten; pass --yes to allow",
+                     overwrites=overwrites)
+        return args.yes
+
+    try:
+        result = saves.import_saves(args.zip, saves_dir, confirm,
+                                    progress=lambda copied, total: out.progress('import', copied, total, unit='files'))
+    except zipfile.BadZipFile:
+        out.emit('error', message=f"{args.zip} is not a valid zip")
+        return EXIT_FAILED
+    if result is None:
+        return EXIT_DECLINED
+    copied, skipped, found = result
+    ok = copied + skipped == found and found > 0
+    out.emit('result', ok=ok, saves_dir=saves_dir, copied=copied, skipped=skipped, found=found)
+    return 0 if ok else EXIT_FAILED
+
+
+def cmd_undo_import(args, out, config):
+    season = _season(args.season)
+    saves_dir = _saves_dir(season, args, config)
+    count = saves.undo_last_import(saves_dir)
+    if count is None:
+        out.emit('error', message=f"No import to undo in {saves_dir}")
+        return EXIT_FAILED
+    out.emit('result', ok=True, saves_dir=saves_dir, restored=count)
+    return 0
+
+
+def cmd_snapshot(args, out, config):
+    season = _season(args.season)
+    saves_dir = _saves_dir(season, args, config)
+    store = snapshots.SnapshotStore(settings.SNAPSHOTS_DIR)
+    snap, stats = store.snapshot(season['saves_key'], saves_dir,
+                                 progress=lambda i, total: out.progress('snapshot', i, total, unit='files'))
+    if not stats['files']:
+        out.emit('error', message=f"No save files found in {saves_dir}")
+        return EXIT_FAILED
+    out.emit('result', ok=True, id=snap.id, saves_dir=saves_dir, **stats)
+    return 0
+
+
+def cmd_snapshots(args, out, config):
+    season = _season(args.season)
+    snaps = snapshots.SnapshotStore(settings.SNAPSHOTS_DIR).list(season['saves_key'])
+    for snap in snaps:
+        out.emit('snapshot', id=snap.id, created=snap.created, source=snap.source,
+                 files=len(snap.files), bytes=snap.total_bytes(), auto=snap.auto)
+    out.emit('result', ok=True, snapshots=len(snaps))
+    return 0
+
+
+def cmd_restore(args, out, config):
+    season = _season(args.season)
+    saves_dir = _saves_dir(season, args, config)
+    store = snapshots.SnapshotStore(settings.SNAPSHOTS_DIR)
+    snap = store.load(season['saves_key'], args.id)
+
+    def confirm(overwrites):
+        if not args.yes:
+            out.emit('error', message=f"{len(overwrites)} existing save file(s) would be overwritten; pass --yes to allow",
+                     overwrites=overwrites)
+        return args.yes
+
+    restored = store.restore(snap, saves_dir, confirm,
+                             progress=lambda i, total: out.progress('restore', i, total, unit='files'))
+    if restored is None:
+        return EXIT_DECLINED
+    out.emit('result', ok=True, id=snap.id, saves_dir=saves_dir, restored=restored, files=len(snap.files))
+    return 0
+
+
+def cmd_export(args, out, config):
+    season = _season(args.season)
+    store = snapshots.SnapshotStore(settings.SNAPSHOTS_DIR)
+    snap = store.load(season['saves_key'], args.id)
+    result = store.export_zip(snap, args.dest, preset=_preset(args, config),
+                              progress=lambda i, total: out.progress('export', i, total, unit='files'))
+    out.emit('result', ok=True, id=snap.id, dest=os.path.abspath(args.dest), **_write_summary(result))
+    return 0
+
+
+def cmd_watch(args, out, config):
+    store = snapshots.SnapshotStore(settings.SNAPSHOTS_DIR)
+    watchers = []
+    for number in args.seasons:
+        season = _season(number)
+        saves_dir = config.get(season['saves_key']) or season['saves_dir']
+        w = savewatch.SaveWatcher(
+            store, season['saves_key'], saves_dir,
+            on_snapshot=lambda snap, stats, n=number: out.emit('snapshot', season=n, id=snap.id, **stats),
+            on_error=lambda e, n=number: out.emit('error', season=n, message=str(e)))
+        w.start()
+        watchers.append(w)
+        out.status(f"Watching {saves_dir}")
+    try:
+        while any(w.is_alive() for w in watchers):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    for w in watchers:
+        w.stop()
+        w.join()
+    out.emit('result', ok=True)
+    return 0
+
+
+def cmd_launch(args, out, config):
+    season = _season(args.season)
+    exe_path = args.exe or config.get(season['config_key'])
+    if not exe_path:
+        out.emit('error', message=f"{season['title']} is not installed (use --exe)")
+        return EXIT_FAILED
+    proc = installer.launch(exe_path)
+    out.emit('result', ok=True, exe=exe_path, pid=proc.pid)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='cli.py', description="Minecraft Story Mode launcher (headless)")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def season_arg(p):
+        p.add_argument('season', choices=['1', '2'], help="season number")
+
+    p = sub.add_parser('install', help="download and install a season")
+    season_arg(p)
+    p.add_argument('--target', help="install folder (default: the launcher's default folder)")
+    p.add_argument('--mirror', action='append', help="extra URL serving the same zip (repeatable)")
+    p.set_defaults(func=cmd_install)
+
+    p = sub.add_parser('verify', help="check an install against the archive")
+    season_arg(p)
+    p.add_argument('--exe', help="game executable (default: the configured path)")
+    p.add_argument('--quick', action='store_true', help="only check that files exist with the right size")
+    p.add_argument('--repair', action='store_true', help="re-fetch missing or damaged files")
+    p.add_argument('--full', action='store_true', help="check every file, not just those changed since the install")
+    p.set_defaults(func=cmd_verify)
+
+    p = sub.add_parser('status', help="show an install's size and files changed since the install")
+    season_arg(p)
+    p.add_argument('--exe', help="game executable (default: the configured path)")
+    p.set_defaults(func=cmd_status)
+
+    p = sub.add_parser('uninstall', help="remove the files an install put on disk")
+    season_arg(p)
+    p.add_argument('--exe', help="game executable (default: the configured path)")
+    p.set_defaults(func=cmd_uninstall)
+
+    p = sub.add_parser('backup', help="zip a season's saves")
+    season_arg(p)
+    p.add_argument('dest', help="zip file to write")
+    p.add_argument('--saves-dir', help="saves folder (default: the configured folder)")
+    p.add_argument('--preset', choices=list(zipwriter.PRESETS), help="compression preset (default: backup_preset in the config)")
+    p.set_defaults(func=cmd_backup)
+
+    p = sub.add_parser('import', help="restore saves from a backup zip")
+    season_arg(p)
+    p.add_argument('zip', help="backup zip to import")
+    p.add_argument('--saves-dir', help="saves folder (default: the configured folder)")
+    p.add_argument('--yes', action='store_true', help="overwrite existing save files")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser('undo-import', help="put back the saves the last import replaced")
+    season_arg(p)
+    p.add_argument('--saves-dir', help="saves folder (default: the configured folder)")
+    p.set_defaults(func=cmd_undo_import)
+
+    p = sub.add_parser('snapshot', help="take an incremental snapshot of a season's saves")
+    season_arg(p)
+    p.add_argument('--saves-dir', help="saves folder (default: the configured folder)")
+    p.set_defaults(func=cmd_snapshot)
+
+    p = sub.add_parser('snapshots', help="list a season's save snapshots")
+    season_arg(p)
+    p.set_defaults(func=cmd_snapshots)
+
+    p = sub.add_parser('restore', help="restore saves from a snapshot")
+    season_arg(p)
+    p.add_argument('id', help="snapshot id (see the snapshots command)")
+    p.add_argument('--saves-dir', help="saves folder (default: the configured folder)")
+    p.add_argument('--yes', action='store_true', help="overwrite existing save files")
+    p.set_defaults(func=cmd_restore)
+
+    p = sub.add_parser('export', help="write a snapshot as a plain zip")
+    season_arg(p)
+    p.add_argument('id', help="snapshot id (see the snapshots command)")
+    p.add_argument('dest', help="zip file to write")
+    p.add_argument('--preset', choices=list(zipwriter.PRESETS), help="compression preset (default: backup_preset in the config)")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser('watch', help="snapshot saves automatically whenever they change (until Ctrl+C)")
+    p.add_argument('seasons', nargs='*', type=_season_number, default=[1, 2], metavar='SEASON',
+                   help="season numbers (default: both)")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser('launch', help="start the game")
+    season_arg(p)
+    p.add_argument('--exe', help="game executable (default: the configured path)")
+    p.set_defaults(func=cmd_launch)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    out = JsonLines()
+    config = settings.load_config()
+    try:
+        return args.func(args, out, config)
+    except downloader.RemoteChangedError:
+        out.emit('error', message="The archive changed on the server while downloading; "
+                                  "the partial download was discarded")
+    except downloader.DownloadError as e:
+        out.emit('error', message=f"Download failed: {e}", resumable=True)
+    except Exception as e:
+        out.emit('error', message=str(e) or e.__class__.__name__)
+    return EXIT_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
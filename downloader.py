@@ -0,0 +1,887 @@
+"""Resumable HTTP downloader used by the launcher's archive.org installs.
+
+Ranged downloads go into a single file preallocated to the full size; every
+worker writes its bytes straight to their final offset. A small JSON journal
+next to the output file (``<file>.journal``) records the remote validators
+(ETag, Last-Modified and Content-Length) and, for every segment, how many
+bytes are already on disk. When the same URL is downloaded again - later in the session or after
+the launcher was restarted - only the missing bytes are fetched. If the remote
+file changed in the meantime the partial data is thrown away instead of being
+mixed with the new file.
+
+All requests go through a keep-alive ``httppool.ConnectionPool`` so ranges
+reuse connections instead of paying a new handshake each time.
+
+Every block of the file is hashed as it arrives (see ``integrity``). Blocks
+that do not match a known manifest are fetched again on their own.
+
+A download can draw from several mirrors of the same file at once. Mirrors
+are probed for latency and throughput first, segments are spread across them
+by measured speed, and a mirror that keeps failing or stalls is dropped while
+the others carry on.
+"""
+import json
+import os
+import threading
+import time
+import urllib.parse
+
+import integrity
+from httppool import ConnectionPool
+
+# Size of the reusable per-worker receive buffer
+READ_BUFFER_SIZE = 256 * 1024
+JOURNAL_SUFFIX = '.journal'
+# Version 1 journals described per-segment .partN files, version 2 had no
+# block digests
+JOURNAL_VERSION = 3
+# The journal is rewritten after this much new data (or this many seconds),
+# so a crash loses at most a few MB per segment.
+JOURNAL_FLUSH_BYTES = 4 * 1024 * 1024
+JOURNAL_FLUSH_SECONDS = 2.0
+# Files smaller than this are always fetched with a single request
+MIN_PARALLEL_SIZE = 256 * 1024
+# Concurrency is adjusted between these bounds while downloading (AIMD).
+# archive.org throttles clients that open too many connections, so the
+# ceiling stays modest.
+INITIAL_CONNECTIONS = 4
+MAX_CONNECTIONS = 10
+# An idle worker only steals from a segment with at least twice this much left
+MIN_SPLIT_SIZE = 1024 * 1024
+# Throughput is sampled this often to decide whether to add or drop a connection
+SAMPLE_SECONDS = 2.0
+# Adding a connection must raise total throughput by this fraction to be kept
+RAMP_GAIN = 0.05
+# Attempts per segment before the whole download is abandoned (the journal is
+# kept, so the next attempt still resumes)
+SEGMENT_RETRIES = 3
+# Rounds of re-fetching blocks that failed verification before giving up
+INTEGRITY_RETRIES = 3
+# A connection that receives nothing for this long counts as stalled
+STALL_TIMEOUT = 30
+# Bytes fetched from the end of the file when probing a mirror; the sample
+# is timed and compared with the primary's to make sure it is the same file
+MIRROR_SAMPLE_SIZE = 256 * 1024
+# Failures after which a mirror is dropped for the rest of the download
+MIRROR_MAX_ERRORS = 3
+# A mirror whose per-connection speed falls below this fraction of the best
+# mirror's is treated as stalled and gets no new segments
+MIRROR_SLOW_FRACTION = 0.1
+
+
+class DownloadError(Exception):
+    """Raised when a download cannot be completed."""
+
+
+class RemoteChangedError(DownloadError):
+    """Raised when the remote file no longer matches the partial download."""
+
+
+class DownloadResult:
+    """What ``download_file`` produced: the file plus what we know about it."""
+
+    def __init__(self, path, info, manifest=None):
+        self.path = path
+        # the HEAD probe result (size and validators)
+        self.info = info
+        # integrity.Manifest built from the streamed block digests, or None
+        self.manifest = manifest
+        # per-source stats (see Source.stats) for ranged downloads
+        self.sources = []
+
+    @property
+    def digest(self):
+        return self.manifest.root if self.manifest else None
+
+
+def download_path_for(url, directory):
+    """Return a stable local path for downloading ``url`` into ``directory``.
+
+    The name only depends on the URL so an interrupted download is found
+    again on the next attempt.
+    """
+    name = os.path.basename(urllib.parse.unquote(urllib.parse.urlparse(url).path))
+    return os.path.join(directory, name or 'download.bin')
+
+
+def probe(url, pool=None):
+    """Send a HEAD request and return what we learned about the remote file."""
+    info = {'total': None, 'accept_ranges': False, 'etag': None, 'last_modified': None}
+    own_pool = pool is None
+    if own_pool:
+        pool = ConnectionPool(timeout=15)
+    try:
+        with pool.request('HEAD', url) as resp:
+            if resp.status >= 400:
+                return info
+            total_hdr = resp.getheader('Content-Length')
+            if total_hdr:
+                info['total'] = int(total_hdr)
+            ar = resp.getheader('Accept-Ranges')
+            if ar and 'bytes' in ar.lower():
+                info['accept_ranges'] = True
+            info['etag'] = resp.getheader('ETag')
+            info['last_modified'] = resp.getheader('Last-Modified')
+    except Exception:
+        # HEAD might fail; the caller falls back to a single-stream download
+        pass
+    finally:
+        if own_pool:
+            pool.close()
+    return info
+
+
+class RangeJournal:
+    """Sidecar record of which byte ranges of a download are complete.
+
+    ``segments`` is a list of ``[start, end, done]`` entries where ``end`` is
+    exclusive and ``done`` counts the bytes from ``start`` that are on disk.
+    ``blocks`` maps block index to the digest of every finished hash block.
+    """
+
+    def __init__(self, path, url, total, etag=None, last_modified=None, segments=None, blocks=None):
+        self.path = path
+        self.url = url
+        self.total = total
+        self.etag = etag
+        self.last_modified = last_modified
+        self.segments = segments or []
+        self.blocks = blocks or {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        """Return the journal stored at ``path`` or None if it is missing/unreadable."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != JOURNAL_VERSION:
+                return None
+            segments = [[int(s), int(e), int(d)] for s, e, d in data['segments']]
+            blocks = {int(i): d for i, d in data.get('blocks', {}).items()}
+            return cls(path, data['url'], int(data['total']), data.get('etag'),
+                       data.get('last_modified'), segments, blocks)
+        except Exception:
+            return None
+
+    def matches(self, url, info):
+        """Return True if the remote described by ``info`` is the file we started."""
+        if url != self.url or info.get('total') != self.total:
+            return False
+        # Without any validator we cannot prove the file is unchanged
+        if not (self.etag or self.last_modified):
+            return False
+        if self.etag and info.get('etag') != self.etag:
+            return False
+        if self.last_modified and info.get('last_modified') != self.last_modified:
+            return False
+        return True
+
+    def if_range(self):
+        """Value for the If-Range header so a changed file is never spliced in."""
+        # Weak ETags are not allowed in If-Range; fall back to the date
+        if self.etag and not self.etag.startswith('W/'):
+            return self.etag
+        return self.last_modified
+
+    def done_bytes(self):
+        return sum(d for _, _, d in self.segments)
+
+    def save(self):
+        """Atomically write the journal to disk. Callers must hold ``lock``."""
+        data = {
+            'version': JOURNAL_VERSION,
+            'url': self.url,
+            'total': self.total,
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'segments': self.segments,
+            'blocks': self.blocks,
+        }
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+
+class OutputFile:
+    """Preallocated download target that accepts writes at arbitrary offsets.
+
+    Uses ``os.pwrite`` on a single descriptor where available. Windows has no
+    pwrite, so there each thread gets its own unbuffered handle and seeks.
+    Writes bypass Python's buffering so data is with the OS before the
+    journal records it.
+    """
+
+    def __init__(self, path, size):
+        self.path = path
+        with open(path, 'r+b' if os.path.exists(path) else 'w+b') as f:
+            f.truncate(size)
+        self._local = threading.local()
+        self._handles = []
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | getattr(os, 'O_BINARY', 0)) if hasattr(os, 'pwrite') else None
+
+    def write_at(self, data, offset):
+        view = memoryview(data)
+        if self._fd is not None:
+            while view:
+                n = os.pwrite(self._fd, view, offset)
+                view = view[n:]
+                offset += n
+            return
+        handle = getattr(self._local, 'handle', None)
+        if handle is None:
+            handle = open(self.path, 'r+b', buffering=0)
+            self._local.handle = handle
+            with self._lock:
+                self._handles.append(handle)
+        handle.seek(offset)
+        while view:
+            n = handle.write(view)
+            view = view[n:]
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        with self._lock:
+            for handle in self._handles:
+                handle.close()
+            self._handles = []
+
+
+def _plan_segments(total, count):
+    block = integrity.HASH_BLOCK_SIZE
+    # Segments start on hash block boundaries so no block is split between workers
+    part_size = max(block, (total // count + block - 1) // block * block)
+    segments = []
+    start = 0
+    while start < total:
+        end = min(total, start + part_size)
+        segments.append([start, end, 0])
+        start = end
+    return segments
+
+
+def discard_partial(dest_path):
+    """Remove a partial download and its journal."""
+    directory = os.path.dirname(dest_path) or '.'
+    # .partN files are left over from journals written by older versions
+    leftovers = [os.path.join(directory, n) for n in _listdir(directory)
+                 if n.startswith(os.path.basename(dest_path) + '.part')]
+    for p in [dest_path, dest_path + JOURNAL_SUFFIX] + leftovers:
+        try:
+            os.remove(p)
+        except OSError:
+            pass
+
+
+def _listdir(directory):
+    try:
+        return os.listdir(directory)
+    except OSError:
+        return []
+
+
+def _reconcile_output(dest_path, journal):
+    """Forget journalled progress if the output file is missing or the wrong size."""
+    try:
+        size = os.path.getsize(dest_path)
+    except OSError:
+        size = None
+    if size != journal.total:
+        for seg in journal.segments:
+            seg[2] = 0
+        journal.blocks = {}
+        return
+    # The hash state of a half-written block did not survive the restart, so
+    # each segment resumes from the end of its last fully hashed block
+    block = integrity.HASH_BLOCK_SIZE
+    for seg in journal.segments:
+        start, end, done = seg
+        pos = start
+        while pos < start + done:
+            block_end = min(journal.total, (pos // block + 1) * block)
+            if pos // block not in journal.blocks or block_end > start + done:
+                break
+            pos = block_end
+        seg[2] = pos - start
+
+
+def _refetch_blocks(journal, hasher):
+    """Turn every block that failed verification back into a pending segment."""
+    with journal.lock:
+        for index in sorted(hasher.bad):
+            bstart, bend = hasher.block_range(index)
+            hasher.forget(index)
+            journal.blocks.pop(index, None)
+            segments = []
+            for seg in journal.segments:
+                s, e, d = seg
+                if bend <= s or bstart >= e:
+                    segments.append(seg)
+                    continue
+                if s < bstart:
+                    segments.append([s, bstart, bstart - s])
+                segments.append([bstart, bend, 0])
+                if bend < e:
+                    segments.append([bend, e, e - bend])
+            journal.segments = segments
+        hasher.bad.clear()
+        journal.save()
+
+
+def download_file(url, dest_path, progress=None, max_connections=MAX_CONNECTIONS, pool=None,
+                  manifests=(), mirrors=(), on_block=None, info=None):
+    """Download ``url`` to ``dest_path``, resuming a previous attempt if possible.
+
+    ``progress`` is called as ``progress(done_bytes, total_bytes_or_None)``.
+    Pass a ``ConnectionPool`` to share connections with other requests or to
+    read its stats afterwards; otherwise a private pool is used.
+    ``manifests`` lists manifest files holding expected block digests.
+    ``mirrors`` are other URLs serving the same file; ranges are spread over
+    them by speed. The journal and manifest are keyed by ``url``.
+    For ranged downloads ``on_block(start, end)`` is called (from worker
+    threads) for every hash block that is on disk and verified, including
+    blocks kept from an earlier attempt, so callers can use the data before
+    the download ends.
+    ``info`` is the result of a ``probe(url)`` the caller already made; the
+    HEAD request is sent here only when it is missing.
+    On failure the partial data and journal are kept so calling this again
+    continues where it stopped. Returns a DownloadResult; raises
+    DownloadError (or RemoteChangedError).
+    """
+    if pool is None:
+        pool = ConnectionPool(timeout=STALL_TIMEOUT)
+        try:
+            return download_file(url, dest_path, progress, max_connections, pool, manifests, mirrors, on_block, info)
+        finally:
+            pool.close()
+
+    if info is None:
+        info = probe(url, pool)
+    total = info['total']
+    journal_path = dest_path + JOURNAL_SUFFIX
+    manifest = integrity.load_manifest(url, manifests)
+    os.makedirs(os.path.dirname(dest_path) or '.', exist_ok=True)
+
+    if not (info['accept_ranges'] and total and total > MIN_PARALLEL_SIZE):
+        # No range support: nothing can be resumed, start from scratch
+        discard_partial(dest_path)
+        result = _download_single(pool, url, dest_path, progress, manifest)
+        result.info = info
+        return result
+
+    journal = RangeJournal.load(journal_path)
+    if journal is None or not journal.matches(url, info):
+        discard_partial(dest_path)
+        journal = RangeJournal(journal_path, url, total, info['etag'], info['last_modified'],
+                               _plan_segments(total, min(INITIAL_CONNECTIONS, max_connections)))
+    else:
+        _reconcile_output(dest_path, journal)
+    with journal.lock:
+        journal.save()
+
+    sources = probe_mirrors(pool, url, info, mirrors)
+    hasher = integrity.BlockHasher(total, manifest, journal.blocks)
+    out = OutputFile(dest_path, total)
+    if on_block:
+        for index in sorted(hasher.digests):
+            on_block(*hasher.block_range(index))
+    try:
+        for _ in range(INTEGRITY_RETRIES):
+            _download_ranges(pool, sources, out, journal, progress, max_connections, hasher, on_block)
+            if not hasher.bad:
+                break
+            # Only the damaged blocks are fetched again
+            _refetch_blocks(journal, hasher)
+        try:
+            hasher.verify()
+        except integrity.IntegrityError as e:
+            raise DownloadError(f"Downloaded data failed verification: {e}")
+    finally:
+        out.close()
+
+    try:
+        os.remove(journal_path)
+    except OSError:
+        pass
+    result = DownloadResult(dest_path, info, hasher.to_manifest())
+    result.sources = [src.stats() for src in sources.sources]
+    return result
+
+
+def _download_single(pool, url, dest_path, progress, manifest=None):
+    with pool.request('GET', url) as resp:
+        if resp.status != 200:
+            raise DownloadError(f"Server returned HTTP {resp.status} {resp.reason}")
+        total_hdr = resp.getheader('Content-Length')
+        total = int(total_hdr) if total_hdr else None
+        downloaded = 0
+        buf = memoryview(bytearray(READ_BUFFER_SIZE))
+        block = integrity.HASH_BLOCK_SIZE
+        blocks = []
+        h = integrity.hashlib.sha256()
+        with open(dest_path, 'wb') as out:
+            while True:
+                n = resp.readinto(buf)
+                if not n:
+                    break
+                out.write(buf[:n])
+                # hash the stream in the same fixed blocks as ranged downloads
+                view = buf[:n]
+                while view:
+                    take = min(len(view), block - downloaded % block)
+                    h.update(view[:take])
+                    downloaded += take
+                    view = view[take:]
+                    if downloaded % block == 0:
+                        blocks.append(h.hexdigest())
+                        h = integrity.hashlib.sha256()
+                if progress:
+                    progress(downloaded, total)
+    if total is not None and downloaded != total:
+        raise DownloadError(f"Connection closed after {downloaded} of {total} bytes")
+    if downloaded % block:
+        blocks.append(h.hexdigest())
+    result = integrity.Manifest(downloaded, block, blocks)
+    if manifest is not None and manifest.applies_to(downloaded) and manifest.root != result.root:
+        # Without range support there is no way to re-fetch just the bad part
+        os.remove(dest_path)
+        raise DownloadError("Downloaded data failed verification against the known digests")
+    return DownloadResult(dest_path, None, result)
+
+
+class Source:
+    """One URL serving the file, with the speed and errors seen from it."""
+
+    def __init__(self, url, info, primary=False):
+        self.url = url
+        self.primary = primary
+        etag = info.get('etag')
+        # Each mirror is checked against its own validators
+        self.validator = etag if etag and not etag.startswith('W/') else info.get('last_modified')
+        self.latency = None
+        # smoothed per-connection throughput in bytes/s
+        self.rate = None
+        self.active = 0
+        self.errors = 0
+        self.bytes = 0
+        self.dropped = False
+
+    def stats(self):
+        return {'url': self.url, 'latency': self.latency, 'rate': self.rate,
+                'bytes': self.bytes, 'errors': self.errors, 'dropped': self.dropped}
+
+
+class MirrorSet:
+    """Spreads segment fetches across sources in proportion to their speed."""
+
+    def __init__(self, sources):
+        self.sources = list(sources)
+        self.lock = threading.Lock()
+
+    def usable(self):
+        with self.lock:
+            return [src for src in self.sources if not src.dropped]
+
+    def pick(self):
+        """Return the source that would serve one more connection best, or None."""
+        with self.lock:
+            live = [src for src in self.sources if not src.dropped]
+            if not live:
+                return None
+            known = [src.rate for src in live if src.rate]
+            default = max(known) if known else 1.0
+            # Expected speed of one more connection, shared with those running
+            best = max(live, key=lambda src: (src.rate or default) / (src.active + 1))
+            best.active += 1
+            return best
+
+    def release(self, src, nbytes, seconds):
+        with self.lock:
+            src.active -= 1
+            src.bytes += nbytes
+            if nbytes and seconds > 0:
+                rate = nbytes / seconds
+                src.rate = rate if src.rate is None else 0.7 * src.rate + 0.3 * rate
+                src.errors = 0
+            live = [s for s in self.sources if not s.dropped and s.rate]
+            if len(live) > 1 and src.rate:
+                fastest = max(s.rate for s in live)
+                if src.rate < fastest * MIRROR_SLOW_FRACTION:
+                    src.dropped = True
+
+    def fail(self, src, fatal=False):
+        """Record an error on ``src``; return True if it has been dropped."""
+        with self.lock:
+            src.errors += 1
+            if fatal or src.errors >= MIRROR_MAX_ERRORS:
+                # Keep the last source alive; the retry limit handles it
+                others = [s for s in self.sources if s is not src and not s.dropped]
+                if others or fatal:
+                    src.dropped = True
+            return src.dropped
+
+
+def _fetch_tail(pool, url, total, validator):
+    """Fetch the last MIRROR_SAMPLE_SIZE bytes; return (data, seconds)."""
+    start = max(0, total - MIRROR_SAMPLE_SIZE)
+    headers = {'Range': f'bytes={start}-{total - 1}'}
+    if validator:
+        headers['If-Range'] = validator
+    t0 = time.monotonic()
+    with pool.request('GET', url, headers) as resp:
+        if resp.status != 206:
+            return None, 0
+        data = resp.read()
+    return data, time.monotonic() - t0
+
+
+def probe_mirrors(pool, url, info, mirrors):
+    """Probe ``mirrors`` in parallel and return a MirrorSet including ``url``.
+
+    A mirror is used only if it supports ranges, reports the same size as the
+    primary and serves the same bytes at the end of the file (where a zip
+    keeps its central directory).
+    """
+    primary = Source(url, info, primary=True)
+    mirrors = [m for m in mirrors if m and m != url]
+    if not mirrors:
+        return MirrorSet([primary])
+    total = info['total']
+    results = {}
+
+    def check(src_url):
+        try:
+            if src_url == url:
+                src = primary
+            else:
+                t0 = time.monotonic()
+                m_info = probe(src_url, pool)
+                latency = time.monotonic() - t0
+                if not (m_info['accept_ranges'] and m_info['total'] == total):
+                    return
+                src = Source(src_url, m_info)
+                src.latency = latency
+            sample, seconds = _fetch_tail(pool, src_url, total, src.validator)
+            if sample is None:
+                return
+            if seconds > 0:
+                src.rate = len(sample) / seconds
+            results[src_url] = (src, sample)
+        except Exception:
+            pass
+
+    threads = [threading.Thread(target=check, args=(u,), daemon=True) for u in [url] + mirrors]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    sources = [primary]
+    reference = results.get(url, (None, None))[1]
+    for m in mirrors:
+        if m not in results:
+            continue
+        src, sample = results[m]
+        if reference is not None and sample != reference:
+            # Same size but different content: not a mirror of this file
+            continue
+        sources.append(src)
+    return MirrorSet(sources)
+
+
+class SegmentScheduler:
+    """Hands out journal segments to workers and splits them on demand.
+
+    When no untouched segment is left, an idle worker steals the second half
+    of the largest remaining range, so a slow connection never ends up owning
+    the tail of the download on its own.
+    """
+
+    def __init__(self, journal, min_split=MIN_SPLIT_SIZE):
+        self.journal = journal
+        self.min_split = min_split
+        self.active = []
+
+    @staticmethod
+    def remaining(seg):
+        return seg[1] - seg[0] - seg[2]
+
+    def is_finished(self):
+        with self.journal.lock:
+            return all(self.remaining(seg) <= 0 for seg in self.journal.segments)
+
+    def _find(self):
+        """Return ``(free_segment, None)``, ``(victim, split_offset)`` or None; caller holds the lock."""
+        for seg in self.journal.segments:
+            if self.remaining(seg) > 0 and not any(seg is a for a in self.active):
+                return seg, None
+        if not self.active:
+            return None
+        victim = max(self.active, key=self.remaining)
+        left = self.remaining(victim)
+        if left < 2 * self.min_split:
+            return None
+        # The owner stops at the new end; the thief continues from there.
+        # Split on a hash block boundary so each block keeps one writer.
+        pos = victim[0] + victim[2]
+        block = integrity.HASH_BLOCK_SIZE
+        mid = (pos + left // 2) // block * block
+        if mid - pos < self.min_split or victim[1] - mid < self.min_split:
+            return None
+        return victim, mid
+
+    def has_work(self):
+        """True if ``acquire`` would currently hand out a segment."""
+        with self.journal.lock:
+            return self._find() is not None
+
+    def acquire(self):
+        """Return a segment to work on, or None if there is nothing worth taking."""
+        with self.journal.lock:
+            found = self._find()
+            if found is None:
+                return None
+            seg, mid = found
+            if mid is None:
+                self.active.append(seg)
+                return seg
+            victim = seg
+            stolen = [mid, victim[1], 0]
+            victim[1] = mid
+            self.journal.segments.append(stolen)
+            self.journal.segments.sort()
+            self.active.append(stolen)
+            self.journal.save()
+            return stolen
+
+    def release(self, seg):
+        with self.journal.lock:
+            self.active = [a for a in self.active if a is not seg]
+
+
+class _HandBack(Exception):
+    """Raised inside a worker that should close its connection after a decrease."""
+
+
+class ConcurrencyController:
+    """Additive-increase / multiplicative-decrease control of the connection count.
+
+    Every sample the aggregate throughput is compared with the previous one.
+    A new connection is kept only while it keeps paying off; errors (resets,
+    timeouts, throttling responses) halve the limit.
+    """
+
+    def __init__(self, initial=INITIAL_CONNECTIONS, maximum=MAX_CONNECTIONS, minimum=1):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.limit = max(minimum, min(initial, self.maximum))
+        self._last_rate = None
+        self._ramped = False
+        self._hold = 0
+        self.lock = threading.Lock()
+
+    def on_sample(self, rate):
+        """Feed the aggregate throughput (bytes/s) measured over the last sample."""
+        with self.lock:
+            if self._last_rate is not None and self._ramped and rate < self._last_rate * (1 + RAMP_GAIN):
+                # The extra connection did not help: give it back and wait a bit
+                self.limit = max(self.minimum, self.limit - 1)
+                self._hold = 3
+            elif self._hold > 0:
+                self._hold -= 1
+            elif self.limit < self.maximum:
+                self.limit += 1
+                self._ramped = True
+                self._last_rate = rate
+                return
+            self._ramped = False
+            self._last_rate = rate
+
+    def on_error(self):
+        with self.lock:
+            self.limit = max(self.minimum, self.limit // 2)
+            self._ramped = False
+            self._hold = 3
+
+
+def _download_ranges(pool, sources, out, journal, progress, max_connections=MAX_CONNECTIONS, hasher=None,
+                    on_block=None):
+    stop = threading.Event()
+    errors = []
+    failures = {}
+    done_total = [journal.done_bytes()]
+    scheduler = SegmentScheduler(journal)
+    controller = ConcurrencyController(min(INITIAL_CONNECTIONS, max_connections), max_connections)
+    workers = []
+    workers_lock = threading.Lock()
+    if progress:
+        progress(done_total[0], journal.total)
+
+    def retire():
+        """Leave the pool if it is over the current limit; return True if this worker left."""
+        me = threading.current_thread()
+        with workers_lock:
+            if len(workers) > controller.limit and me in workers:
+                workers.remove(me)
+                return True
+        return False
+
+    def fetch_segment(seg, buf, src):
+        """Fetch the rest of ``seg`` from ``src``; return the number of bytes received."""
+        start = seg[0]
+        pos = start + seg[2]
+        first = pos
+        if pos >= seg[1]:
+            return 0
+        # Ask for the whole rest of the segment; if it gets split while we
+        # read, we simply stop early at the new end
+        headers = {'Range': f'bytes={pos}-{seg[1] - 1}'}
+        validator = journal.if_range() if src.primary else src.validator
+        if validator:
+            headers['If-Range'] = validator
+        with pool.request('GET', src.url, headers) as resp:
+            if resp.status == 200:
+                # If-Range failed (or ranges were ignored): the file changed
+                raise RemoteChangedError("The remote file changed since the download started")
+            if resp.status != 206:
+                raise DownloadError(f"Server returned HTTP {resp.status} {resp.reason}")
+            unsaved = 0
+            last_save = time.monotonic()
+            while pos < seg[1] and not stop.is_set():
+                n = resp.readinto(buf[:min(len(buf), seg[1] - pos)])
+                if not n:
+                    break
+                with journal.lock:
+                    # the segment may have been split since the read started
+                    n = min(n, max(0, seg[1] - pos))
+                out.write_at(buf[:n], pos)
+                finished = hasher.update(pos, buf[:n]) if hasher else ()
+                pos += n
+                unsaved += n
+                now = time.monotonic()
+                save = unsaved >= JOURNAL_FLUSH_BYTES or now - last_save >= JOURNAL_FLUSH_SECONDS
+                with journal.lock:
+                    seg[2] = pos - start
+                    done_total[0] += n
+                    for index, digest in finished:
+                        journal.blocks[index] = digest
+                    if save:
+                        journal.save()
+                    if progress:
+                        progress(done_total[0], journal.total)
+                if on_block:
+                    for index, _ in finished:
+                        on_block(*hasher.block_range(index))
+                if save:
+                    unsaved = 0
+                    last_save = now
+                if pos < seg[1] and retire():
+                    # A decrease takes effect now rather than at the end of
+                    # a segment that may be a quarter of the file: the rest
+                    # of the range goes back to the scheduler
+                    with journal.lock:
+                        journal.save()
+                    raise _HandBack()
+            with journal.lock:
+                journal.save()
+        if pos < seg[1] and not stop.is_set():
+            raise DownloadError(f"Connection closed early at byte {pos} (expected {seg[1]})")
+        return pos - first
+
+    def worker():
+        me = threading.current_thread()
+        # one receive buffer per worker, reused for every read
+        buf = memoryview(bytearray(READ_BUFFER_SIZE))
+        try:
+            while not stop.is_set():
+                # Ramp down: surplus workers leave between segments too
+                if retire():
+                    return
+                src = sources.pick()
+                if src is None:
+                    errors.append(DownloadError("Every download source failed"))
+                    stop.set()
+                    return
+                seg = scheduler.acquire()
+                if seg is None:
+                    sources.release(src, 0, 0)
+                    return
+                t0 = time.monotonic()
+                received = 0
+                try:
+                    received = fetch_segment(seg, buf, src)
+                    failures.pop(seg[0], None)
+                except _HandBack:
+                    return
+                except RemoteChangedError as e:
+                    if src.primary:
+                        errors.append(e)
+                        stop.set()
+                    else:
+                        # A mirror that changed is just no longer a mirror
+                        sources.fail(src, fatal=True)
+                except Exception as e:
+                    controller.on_error()
+                    if sources.fail(src) and sources.usable():
+                        # the segment is not to blame; another source takes it
+                        continue
+                    failures[seg[0]] = failures.get(seg[0], 0) + 1
+                    if failures[seg[0]] >= SEGMENT_RETRIES:
+                        errors.append(e)
+                        stop.set()
+                    else:
+                        time.sleep(failures[seg[0]] * 2 - 1)
+                finally:
+                    sources.release(src, received, time.monotonic() - t0)
+                    scheduler.release(seg)
+        finally:
+            with workers_lock:
+                if me in workers:
+                    workers.remove(me)
+
+    last_sample = time.monotonic()
+    last_done = done_total[0]
+    while not stop.is_set():
+        with workers_lock:
+            running = len(workers)
+        if scheduler.is_finished() and running == 0:
+            break
+        # Top up to the current limit, but only while there is a segment
+        # to hand out or steal: otherwise a new worker would exit at once
+        while running < controller.limit and scheduler.has_work():
+            t = threading.Thread(target=worker, daemon=True)
+            with workers_lock:
+                workers.append(t)
+            t.start()
+            running += 1
+        time.sleep(0.1)
+        now = time.monotonic()
+        if now - last_sample >= SAMPLE_SECONDS:
+            with journal.lock:
+                done = done_total[0]
+            controller.on_sample((done - last_done) / (now - last_sample))
+            last_sample, last_done = now, done
+
+    while True:
+        with workers_lock:
+            pending = list(workers)
+        if not pending:
+            break
+        for t in pending:
+            t.join()
+
+    with journal.lock:
+        journal.save()
+    if errors:
+        if isinstance(errors[0], RemoteChangedError):
+            # Never mix old and new data: start over next time
+            out.close()
+            discard_partial(out.path)
+            raise errors[0]
+        raise DownloadError(f"Download interrupted ({errors[0]}); run it again to resume")
+    if not scheduler.is_finished():
+        raise DownloadError("Download stopped before all ranges were fetched; run it again to resume")
@@ -0,0 +1,216 @@
+"""Thread-safe event bus between background workers and the Tk main loop.
+
+Workers never touch Tk directly. They post progress, status lines, UI calls
+and dialogs to an ``EventBus``; the main loop drains it at a fixed frame rate.
+
+Progress is coalesced: a worker that reports after every chunk just
+overwrites the latest sample for its channel (a plain dict store, no lock),
+so the UI sees at most one update per channel per frame no matter how fast
+data arrives. Each delivered sample carries throughput, ETA and percent.
+
+The last status line of each channel is kept. A page built after a worker
+has already reported (pages are created on first visit) gets that line as
+soon as it subscribes, instead of a blank status.
+"""
+import collections
+import itertools
+import threading
+import time
+
+# UI refresh rate for draining the bus
+FRAME_RATE = 20
+# Smoothing factor for the throughput average (higher reacts faster)
+RATE_SMOOTHING = 0.3
+
+
+class ProgressSample:
+    """One coalesced progress reading, as delivered to UI subscribers."""
+
+    def __init__(self, channel, done, total, label, unit, rate, eta):
+        self.channel = channel
+        self.done = done
+        self.total = total
+        self.label = label
+        self.unit = unit
+        # units per second (bytes/s for downloads) and seconds left, or None
+        self.rate = rate
+        self.eta = eta
+
+    @property
+    def percent(self):
+        if not self.total:
+            return 0
+        return min(100, int(self.done * 100 / self.total))
+
+    def text(self):
+        """Human readable one-liner such as ``Downloading... 42% — 12.3 MB/s, 3m 10s left``."""
+        if self.total:
+            base = f"{self.label}... {self.percent}%"
+        elif self.unit == 'bytes':
+            base = f"{self.label}... {self.done // 1024} KB"
+        else:
+            base = f"{self.label}... {self.done}"
+        extras = []
+        if self.unit == 'bytes' and self.rate:
+            extras.append(f"{format_size(self.rate)}/s")
+        if self.eta is not None and self.eta >= 1:
+            extras.append(f"{format_duration(self.eta)} left")
+        if extras:
+            base += " — " + ", ".join(extras)
+        return base
+
+
+def format_size(n):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(n) < 1024 or unit == 'GB':
+            return f"{n:.1f} {unit}" if unit != 'B' else f"{int(n)} B"
+        n /= 1024.0
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60}s"
+    return f"{seconds}s"
+
+
+class EventBus:
+    """Collects events from any thread and delivers them on the Tk main thread."""
+
+    def __init__(self):
+        # Ordered events (status lines, calls, dialogs). deque.append and
+        # popleft are atomic, so posting needs no lock.
+        self._queue = collections.deque()
+        # channel -> latest raw progress tuple; overwritten, never queued
+        self._latest = {}
+        self._delivered = {}
+        self._rates = {}
+        self._seq = itertools.count()
+        self._subscribers = {}
+        # channel -> (text, percent) of the last status line drained
+        self._last_status = {}
+        self._root = None
+        self._main_thread = threading.current_thread()
+        self._dialogs = None
+        self._interval = int(1000 / FRAME_RATE)
+
+    # -- worker side -------------------------------------------------------
+
+    def progress(self, channel, done, total=None, label="Working", unit='bytes'):
+        """Report progress for ``channel``; only the latest value per frame is shown."""
+        self._latest[channel] = (next(self._seq), done, total, label, unit, time.monotonic())
+
+    def status(self, channel, text, percent=None):
+        """Show a status line for ``channel`` (optionally setting the percentage)."""
+        self._queue.append((next(self._seq), 'status', channel, text, percent))
+
+    def call(self, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` on the main thread."""
+        self._queue.append((next(self._seq), 'call', fn, args, kwargs))
+
+    def dialog(self, kind, title, message):
+        """Show a messagebox (e.g. ``'showinfo'``) on the main thread without waiting."""
+        self._queue.append((next(self._seq), 'dialog', kind, title, message, None))
+
+    def ask(self, kind, title, message):
+        """Show a messagebox question (e.g. ``'askyesno'``) and wait for the answer."""
+        if threading.current_thread() is self._main_thread:
+            return self._show(kind, title, message)
+        reply = {'event': threading.Event(), 'value': None}
+        self._queue.append((next(self._seq), 'dialog', kind, title, message, reply))
+        reply['event'].wait()
+        return reply['value']
+
+    # -- UI side -----------------------------------------------------------
+
+    def subscribe(self, channel, on_progress=None, on_status=None):
+        """Register UI callbacks for a channel.
+
+        ``on_progress(sample)`` receives a ProgressSample and
+        ``on_status(text, percent)`` receives status lines, starting with
+        the channel's last one if any was posted before subscribing.
+        """
+        self._subscribers[channel] = (on_progress, on_status)
+        last = self._last_status.get(channel)
+        if on_status and last is not None:
+            try:
+                on_status(*last)
+            except Exception:
+                pass
+
+    def attach(self, root, dialogs):
+        """Start draining on ``root``'s event loop; ``dialogs`` is the messagebox module."""
+        self._root = root
+        self._dialogs = dialogs
+        self._main_thread = threading.current_thread()
+        root.after(self._interval, self._pump)
+
+    def _pump(self):
+        try:
+            self.drain()
+        finally:
+            # Rescheduled only after dialogs close, so a modal dialog's nested
+            # event loop does not re-enter the drain
+            if self._root is not None:
+                self._root.after(self._interval, self._pump)
+
+    def _show(self, kind, title, message):
+        if self._dialogs is None:
+            return None
+        return getattr(self._dialogs, kind)(title, message)
+
+    def drain(self):
+        """Deliver everything posted since the last frame, in posting order."""
+        items = []
+        while True:
+            try:
+                items.append(self._queue.popleft())
+            except IndexError:
+                break
+        for channel, raw in list(self._latest.items()):
+            if self._delivered.get(channel) is not raw:
+                self._delivered[channel] = raw
+                items.append((raw[0], 'progress', channel, raw))
+        items.sort(key=lambda item: item[0])
+
+        for item in items:
+            kind = item[1]
+            try:
+                if kind == 'progress':
+                    on_progress = self._subscribers.get(item[2], (None, None))[0]
+                    if on_progress:
+                        on_progress(self._sample(item[2], item[3]))
+                elif kind == 'status':
+                    self._last_status[item[2]] = (item[3], item[4])
+                    on_status = self._subscribers.get(item[2], (None, None))[1]
+                    if on_status:
+                        on_status(item[3], item[4])
+                elif kind == 'call':
+                    item[2](*item[3], **item[4])
+                elif kind == 'dialog':
+                    value = self._show(item[2], item[3], item[4])
+                    if item[5] is not None:
+                        item[5]['value'] = value
+                        item[5]['event'].set()
+            except Exception:
+                # A broken callback must not stop the pump
+                if kind == 'dialog' and item[5] is not None:
+                    item[5]['event'].set()
+
+    def _sample(self, channel, raw):
+        _, done, total, label, unit, stamp = raw
+        prev = self._rates.get(channel)
+        rate = None
+        if prev and prev[3] == label and done >= prev[0] and stamp > prev[1]:
+            inst = (done - prev[0]) / (stamp - prev[1])
+            rate = inst if prev[2] is None else prev[2] + RATE_SMOOTHING * (inst - prev[2])
+            self._rates[channel] = (done, stamp, rate, label)
+        else:
+            # New phase (or first sample): start measuring from here
+            self._rates[channel] = (done, stamp, None, label)
+        eta = None
+        if rate and total and total > done:
+            eta = (total - done) / rate
+        return ProgressSample(channel, done, total, label, unit, rate, eta)
@@ -0,0 +1,419 @@
+"""Parallel extraction of season archives.
+
+``ZipFile.extractall`` inflates one member after another on a single
+thread. Here members are spread over a thread pool instead. zlib releases
+the GIL while inflating and computing CRCs, so threads scale across cores.
+Each worker opens its own handle on the archive because a ZipFile shares
+one file position between readers.
+
+Members are queued largest first, so the longest job starts early and small
+files fill in around it. Every directory is created once before any worker
+starts. Each file is written to ``member_path``, which resolves names the
+way ``extractall`` does (no member can land outside the target folder),
+using only public ``zipfile`` APIs. Verify, repair and the install manifest
+use the same function, so they always look where a file was written.
+
+``PipelinedExtractor`` extracts an archive that is still downloading: each
+member is extracted as soon as every block of its bytes is on disk.
+
+Layout rules rename members as they are extracted. Each rule is a
+``(pattern, replacement)`` regex pair, and the first rule that matches a
+member name rewrites it. A member that maps to an empty name is skipped.
+Files land at their final paths in one pass, with nothing moved afterwards.
+"""
+import copy
+import io
+import os
+import re
+import shutil
+import threading
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+from integrity import HASH_BLOCK_SIZE
+
+EXTRACT_WORKERS = min(8, os.cpu_count() or 4)
+# below this much data a pool costs more than it saves
+MIN_PARALLEL_BYTES = 16 * 1024 * 1024
+# What reading a member raises when its bytes are not really there yet (the
+# preallocated file is zeros): zipfile's own checks, zlib, bz2 (OSError) and
+# lzma, plus EOFError from a stream that ends early
+DECOMPRESS_ERRORS = (zipfile.BadZipFile, zlib.error, OSError, EOFError) + ((lzma.LZMAError,) if lzma else ())
+
+
+class ExtractResult:
+    """Wall time and per-member timings of one extraction."""
+
+    def __init__(self, seconds, timings, workers):
+        self.seconds = seconds
+        # [(member name, uncompressed size, seconds)]
+        self.timings = timings
+        self.workers = workers
+
+    @property
+    def total_bytes(self):
+        return sum(size for _, size, _ in self.timings)
+
+    def slowest(self, count=10):
+        return sorted(self.timings, key=lambda t: t[2], reverse=True)[:count]
+
+    def find(self, basename):
+        """Return the extracted name (after layout rules) of the first file called ``basename``."""
+        basename = basename.lower()
+        for name, _, _ in self.timings:
+            if name.rsplit('/', 1)[-1].lower() == basename:
+                return name
+        return None
+
+
+def apply_layout(rules, name):
+    """Return ``name`` rewritten by the first matching ``(pattern, replacement)`` rule."""
+    for pattern, replacement in rules:
+        new, count = re.subn(pattern, replacement, name, count=1)
+        if count:
+            return new
+    return name
+
+
+def plan_members(infos, rules=()):
+    """Return the ZipInfos to extract, renamed by ``rules``.
+
+    When several members map to the same name the last one in the archive
+    wins, as it would if they were extracted in order over each other.
+    """
+    planned = {}
+    for info in infos:
+        name = apply_layout(rules, info.filename) if rules else info.filename
+        if not name.strip('/'):
+            continue
+        if name != info.filename:
+            # ZipFile.open checks the local header against orig_filename,
+            # which the copy keeps
+            info = copy.copy(info)
+            info.filename = name
+        planned[name.rstrip('/')] = info
+    return list(planned.values())
+
+
+def _target_dirs(infos, target_dir):
+    """Every directory the members need, resolved the way ZipFile.extract does.
+
+    Creating them up front means workers never race to create the same
+    folder.
+    """
+    dirs = set()
+    for info in infos:
+        path = member_path(info, target_dir)
+        dirs.add(path if info.is_dir() else os.path.dirname(path))
+    return dirs
+
+
+def member_path(info, target_dir):
+    """Return where ``info`` is extracted below ``target_dir`` (the rules ``ZipFile.extract`` uses)."""
+    arcname = info.filename.replace('/', os.path.sep)
+    if os.path.altsep:
+        arcname = arcname.replace(os.path.altsep, os.path.sep)
+    # strip drive letters, empty, '.' and '..' components like ZipFile does
+    arcname = os.path.splitdrive(arcname)[1]
+    invalid = ('', os.path.curdir, os.path.pardir)
+    arcname = os.path.sep.join(x for x in arcname.split(os.path.sep) if x not in invalid)
+    if os.path.sep == '\\':
+        arcname = _sanitize_windows_name(arcname, os.path.sep)
+    return os.path.normpath(os.path.join(target_dir, arcname))
+
+
+_WINDOWS_ILLEGAL = str.maketrans(':<>|"?*', '_' * 7)
+
+
+def _sanitize_windows_name(arcname, pathsep):
+    # characters Windows forbids in names become '_', and trailing dots and
+    # spaces (which Windows drops silently) are removed from every part
+    arcname = arcname.translate(_WINDOWS_ILLEGAL)
+    parts = (x.rstrip(' .') for x in arcname.split(pathsep))
+    return pathsep.join(x for x in parts if x)
+
+
+def extract_member(z, info, target_dir):
+    """Write the file member ``info`` of ``z`` to its ``member_path`` and return that path.
+
+    Its folder must exist already (see ``_target_dirs``).
+    """
+    path = member_path(info, target_dir)
+    with z.open(info) as src, open(path, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    return path
+
+
+def extract_all(zip_path, target_dir, workers=EXTRACT_WORKERS, progress=None, layout=()):
+    """Extract every member of ``zip_path`` into ``target_dir``; return an ExtractResult.
+
+    ``layout`` is a list of rename rules (see ``apply_layout``).
+    ``progress(done_bytes, total_bytes)`` is called as members finish.
+    Raises ``zipfile.BadZipFile`` for a damaged archive (including CRC
+    mismatches), like ``extractall``.
+    """
+    t0 = time.monotonic()
+    with zipfile.ZipFile(zip_path) as z:
+        infos = plan_members(z.infolist(), layout)
+        for d in sorted(_target_dirs(infos, target_dir)):
+            os.makedirs(d, exist_ok=True)
+        files = sorted((i for i in infos if not i.is_dir()), key=lambda i: i.file_size, reverse=True)
+        total = sum(i.file_size for i in files)
+        if workers <= 1 or len(files) < 2 or total < MIN_PARALLEL_BYTES:
+            timings = []
+            done = 0
+            for info in files:
+                start = time.monotonic()
+                extract_member(z, info, target_dir)
+                timings.append((info.filename, info.file_size, time.monotonic() - start))
+                done += info.file_size
+                if progress:
+                    progress(done, total)
+            return ExtractResult(time.monotonic() - t0, timings, 1)
+
+    local = threading.local()
+    handles = []
+    lock = threading.Lock()
+    failed = threading.Event()
+    timings = []
+    state = {'done': 0}
+
+    def extract_one(info):
+        if failed.is_set():
+            return
+        z = getattr(local, 'zip', None)
+        if z is None:
+            z = local.zip = zipfile.ZipFile(zip_path)
+            with lock:
+                handles.append(z)
+        start = time.monotonic()
+        try:
+            extract_member(z, info, target_dir)
+        except BaseException:
+            failed.set()
+            raise
+        elapsed = time.monotonic() - start
+        with lock:
+            timings.append((info.filename, info.file_size, elapsed))
+            state['done'] += info.file_size
+            done = state['done']
+        if progress:
+            progress(done, total)
+
+    workers = min(workers, len(files))
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='extract') as pool:
+            # submitted largest first; the pool takes work in submission order
+            futures = [pool.submit(extract_one, info) for info in files]
+            for f in futures:
+                f.result()
+    finally:
+        for z in handles:
+            z.close()
+    return ExtractResult(time.monotonic() - t0, timings, workers)
+
+
+class _OverlayFile(io.RawIOBase):
+    """Read-only view of a partly downloaded archive with its tail served from memory.
+
+    ``zipfile`` reads the end record and central directory before anything
+    else; those bytes were fetched up front, so they come from ``tail``
+    while everything below ``tail_offset`` is read from the file on disk.
+    """
+
+    def __init__(self, path, tail_offset, tail):
+        super().__init__()
+        self._f = open(path, 'rb', buffering=0)
+        self._tail_offset = tail_offset
+        self._tail = tail
+        self._size = tail_offset + len(tail)
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._pos = offset
+        return offset
+
+    def readinto(self, b):
+        view = memoryview(b).cast('B')
+        pos = self._pos
+        if pos >= self._size:
+            return 0
+        if pos >= self._tail_offset:
+            chunk = self._tail[pos - self._tail_offset:pos - self._tail_offset + len(view)]
+            n = len(chunk)
+            view[:n] = chunk
+        else:
+            self._f.seek(pos)
+            n = self._f.readinto(view[:min(len(view), self._tail_offset - pos)]) or 0
+        self._pos += n
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._f.close()
+        super().close()
+
+
+class PipelinedExtractor:
+    """Extracts members of an archive while it is still being downloaded.
+
+    ``infos`` and ``tail`` (``(offset, bytes)`` from the start of the
+    central directory to the end of the file) come from the remote archive
+    before the download starts, e.g. ``RemoteZip.central_directory()``.
+    The downloader calls ``block_done(start, end)`` as verified blocks land
+    in ``archive_path``. A member is queued once every block holding its
+    header and data has arrived. ``finish()`` extracts whatever is left
+    once the download is complete and returns an ExtractResult.
+    """
+
+    def __init__(self, archive_path, target_dir, infos, tail, layout=(), workers=EXTRACT_WORKERS,
+                 progress=None, block_size=HASH_BLOCK_SIZE):
+        self.archive_path = archive_path
+        self.target_dir = target_dir
+        self.tail_offset, self.tail = tail
+        self.block_size = block_size
+        self.progress = progress
+        self._t0 = time.monotonic()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._handles = []
+        self._timings = []
+        self._retry = []
+        self._done_bytes = 0
+        self._aborted = False
+        self._futures = []
+        self._seen_blocks = set()
+
+        planned = plan_members(infos, layout)
+        for d in sorted(_target_dirs(planned, target_dir)):
+            os.makedirs(d, exist_ok=True)
+        self._files = [i for i in planned if not i.is_dir()]
+        self._total = sum(i.file_size for i in self._files)
+
+        # A member's bytes run from its local header to the next header (or
+        # the central directory), which also covers any data descriptor
+        offsets = sorted({i.header_offset for i in infos})
+        extent_end = dict(zip(offsets, offsets[1:] + [self.tail_offset]))
+        self._missing = {}
+        self._waiting = {}
+        for n, info in enumerate(self._files):
+            first = info.header_offset // block_size
+            last = (extent_end[info.header_offset] - 1) // block_size
+            self._missing[n] = last - first + 1
+            for index in range(first, last + 1):
+                self._waiting.setdefault(index, []).append(n)
+        self._submitted = set()
+        self.workers = max(1, min(workers, len(self._files) or 1))
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='extract')
+
+    def block_done(self, start, end):
+        """Record that bytes ``[start, end)`` are on disk and queue members that became complete."""
+        ready = []
+        with self._lock:
+            for index in range(start // self.block_size, (end - 1) // self.block_size + 1):
+                if index in self._seen_blocks:
+                    continue
+                self._seen_blocks.add(index)
+                for n in self._waiting.pop(index, ()):
+                    self._missing[n] -= 1
+                    if self._missing[n] == 0:
+                        ready.append(n)
+            # large members first among those that became ready together
+            ready.sort(key=lambda n: self._files[n].file_size, reverse=True)
+            for n in ready:
+                self._submit(n)
+
+    def _submit(self, n):
+        # caller holds the lock
+        if n in self._submitted or self._aborted:
+            return
+        self._submitted.add(n)
+        self._futures.append(self._pool.submit(self._extract, self._files[n]))
+
+    def _open(self):
+        z = getattr(self._local, 'zip', None)
+        if z is None:
+            f = io.BufferedReader(_OverlayFile(self.archive_path, self.tail_offset, self.tail), 1024 * 1024)
+            z = self._local.zip = zipfile.ZipFile(f)
+            with self._lock:
+                # ZipFile leaves a file object it was given open
+                self._handles.append((z, f))
+        return z
+
+    def _extract(self, info, z=None):
+        if self._aborted:
+            return
+        start = time.monotonic()
+        try:
+            extract_member(z or self._open(), info, self.target_dir)
+        except DECOMPRESS_ERRORS as e:
+            if z is not None:
+                if isinstance(e, zipfile.BadZipFile) or (isinstance(e, OSError) and e.errno is not None):
+                    # damaged archive, or a real I/O error such as a full disk
+                    raise
+                raise zipfile.BadZipFile(f"{info.filename}: {e}") from e
+            # tried again once the whole archive is on disk
+            with self._lock:
+                self._retry.append(info)
+            return
+        elapsed = time.monotonic() - start
+        with self._lock:
+            self._timings.append((info.filename, info.file_size, elapsed))
+            self._done_bytes += info.file_size
+            done = self._done_bytes
+        if self.progress:
+            self.progress(done, self._total)
+
+    def finish(self):
+        """Extract the remaining members (the download must be complete) and return an ExtractResult.
+
+        Raises ``zipfile.BadZipFile`` if a member is still damaged (whatever
+        the decompressor reported).
+        """
+        with self._lock:
+            for n in sorted(range(len(self._files)), key=lambda n: self._files[n].file_size, reverse=True):
+                self._submit(n)
+            futures = list(self._futures)
+        try:
+            for f in futures:
+                f.result()
+            if self._retry:
+                with zipfile.ZipFile(self.archive_path) as z:
+                    for info in self._retry:
+                        self._extract(info, z)
+        finally:
+            self._close()
+        return ExtractResult(time.monotonic() - self._t0, self._timings, self.workers)
+
+    def abort(self):
+        """Stop extracting (e.g. the download failed); already extracted files stay."""
+        with self._lock:
+            self._aborted = True
+        self._close()
+
+    def _close(self):
+        self._pool.shutdown(wait=True)
+        for z, f in self._handles:
+            z.close()
+            f.close()
+        self._handles = []
@@ -0,0 +1,280 @@
+"""Keep-alive HTTP connection pool for the downloader.
+
+``urllib.request.urlopen`` opens a new connection (DNS, TCP and TLS handshake)
+for every request. A download split into many ranges pays that cost again for
+each range, so the downloader goes through this pool instead: connections are
+kept open after a response has been fully read and handed to the next request
+for the same host. Redirects (archive.org sends every download to a data
+node) are remembered so later ranges go straight to the final host.
+"""
+import http.client
+import ssl
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+DEFAULT_TIMEOUT = 60
+# Idle connections kept per host; anything beyond this is closed on release
+MAX_IDLE_PER_HOST = 16
+MAX_REDIRECTS = 5
+# A response abandoned with less than this left is drained so the
+# connection can be reused; otherwise the connection is closed.
+DRAIN_LIMIT = 64 * 1024
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+
+class PooledConnection:
+    """An ``http.client`` connection plus the numbers we track for it."""
+
+    def __init__(self, key, conn, connect_seconds):
+        self.key = key
+        self.conn = conn
+        self.connect_seconds = connect_seconds
+        self.created = time.monotonic()
+        self.requests = 0
+        self.bytes_read = 0
+
+    def stats(self):
+        return {
+            'host': f"{self.key[0]}://{self.key[1]}:{self.key[2]}",
+            'connect_seconds': round(self.connect_seconds, 4),
+            'requests': self.requests,
+            'bytes_read': self.bytes_read,
+        }
+
+
+class PooledResponse:
+    """Wraps ``http.client.HTTPResponse`` and returns its connection to the pool.
+
+    Use it as a context manager (or call ``release``) once done reading.
+    """
+
+    def __init__(self, pool, pooled, resp, url):
+        self._pool = pool
+        self._pooled = pooled
+        self._resp = resp
+        self.url = url
+        self.status = resp.status
+        self.reason = resp.reason
+
+    def getheader(self, name, default=None):
+        return self._resp.getheader(name, default)
+
+    def read(self, amt=None):
+        data = self._resp.read(amt)
+        self._pooled.bytes_read += len(data)
+        return data
+
+    def readinto(self, b):
+        n = self._resp.readinto(b)
+        self._pooled.bytes_read += n
+        return n
+
+    def release(self):
+        if self._pooled is None:
+            return
+        pooled, self._pooled = self._pooled, None
+        resp = self._resp
+        reusable = not resp.will_close
+        if reusable and not resp.isclosed():
+            # Partially read (e.g. the segment was split under us)
+            left = resp.length
+            if left is not None and left <= DRAIN_LIMIT:
+                try:
+                    resp.read()
+                except Exception:
+                    reusable = False
+            else:
+                reusable = False
+        if reusable:
+            self._pool._put(pooled)
+        else:
+            self._pool._discard(pooled)
+
+    def close(self):
+        self.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+class ConnectionPool:
+    """Thread-safe pool of persistent HTTP/HTTPS connections keyed by host."""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_idle_per_host=MAX_IDLE_PER_HOST):
+        self.timeout = timeout
+        self.max_idle_per_host = max_idle_per_host
+        self._idle = {}
+        self._redirects = {}
+        # open connections, for the per-connection stats; closed ones are
+        # folded into the totals below so they can be freed
+        self._live = set()
+        self._lock = threading.Lock()
+        self._ssl_context = ssl.create_default_context()
+        self._proxies = urllib.request.getproxies()
+        self.opened = 0
+        self.reused = 0
+        self.connect_seconds = 0.0
+        self.redirects_followed = 0
+        self.redirects_skipped = 0
+        self.closed_requests = 0
+        self.closed_bytes_read = 0
+
+    def _key(self, parts):
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        return (parts.scheme, parts.hostname, port)
+
+    def _proxy_for(self, parts):
+        proxy = self._proxies.get(parts.scheme)
+        if not proxy or urllib.request.proxy_bypass(parts.hostname or ''):
+            return None
+        return urllib.parse.urlparse(proxy if '://' in proxy else 'http://' + proxy)
+
+    def _get(self, parts):
+        key = self._key(parts)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self.reused += 1
+                return idle.pop(), True
+        proxy = self._proxy_for(parts)
+        if proxy is not None:
+            conn_host, conn_port = proxy.hostname, proxy.port or 80
+        else:
+            conn_host, conn_port = key[1], key[2]
+        if key[0] == 'https':
+            conn = http.client.HTTPSConnection(conn_host, conn_port, timeout=self.timeout,
+                                               context=self._ssl_context)
+            if proxy is not None:
+                conn.set_tunnel(key[1], key[2])
+        else:
+            conn = http.client.HTTPConnection(conn_host, conn_port, timeout=self.timeout)
+        # Connect explicitly so DNS + TCP + TLS setup can be timed
+        t0 = time.monotonic()
+        conn.connect()
+        elapsed = time.monotonic() - t0
+        pooled = PooledConnection(key, conn, elapsed)
+        with self._lock:
+            self.opened += 1
+            self.connect_seconds += elapsed
+            self._live.add(pooled)
+        return pooled, False
+
+    def _put(self, pooled):
+        with self._lock:
+            idle = self._idle.setdefault(pooled.key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(pooled)
+                return
+        self._discard(pooled)
+
+    def _discard(self, pooled):
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            if pooled in self._live:
+                self._live.remove(pooled)
+                self.closed_requests += pooled.requests
+                self.closed_bytes_read += pooled.bytes_read
+
+    def _send(self, method, url, headers):
+        """Send one request, retrying once on a stale keep-alive connection."""
+        parts = urllib.parse.urlparse(url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL scheme: {url}")
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        if parts.scheme == 'http' and self._proxy_for(parts) is not None:
+            # plain HTTP proxies expect the absolute URL
+            target = url
+        for attempt in range(2):
+            pooled, reused = self._get(parts)
+            try:
+                pooled.conn.request(method, target, headers=headers)
+                resp = pooled.conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionError, http.client.BadStatusLine):
+                self._discard(pooled)
+                # The server closed an idle connection; a fresh one should work
+                if reused and attempt == 0:
+                    continue
+                raise
+            except Exception:
+                self._discard(pooled)
+                raise
+            pooled.requests += 1
+            return PooledResponse(self, pooled, resp, url)
+
+    def request(self, method, url, headers=None, max_redirects=MAX_REDIRECTS):
+        """Perform a request, following redirects, and return a PooledResponse."""
+        headers = dict(headers or {})
+        headers.setdefault('User-Agent', 'MCSM-Launcher')
+        with self._lock:
+            cached = self._redirects.get(url)
+        if cached:
+            try:
+                resp = self._send(method, cached, headers)
+            except (OSError, http.client.HTTPException):
+                # The data node went away; start again from the original URL
+                resp = None
+            if resp is not None and resp.status < 400 and resp.status not in REDIRECT_CODES:
+                with self._lock:
+                    self.redirects_skipped += 1
+                return resp
+            # The cached location went stale; resolve it again
+            if resp is not None:
+                resp.release()
+            with self._lock:
+                self._redirects.pop(url, None)
+
+        current = url
+        for _ in range(max_redirects + 1):
+            resp = self._send(method, current, headers)
+            if resp.status not in REDIRECT_CODES:
+                if current != url:
+                    with self._lock:
+                        self._redirects[url] = current
+                return resp
+            location = resp.getheader('Location')
+            resp.release()
+            if not location:
+                raise http.client.HTTPException(f"Redirect without Location from {current}")
+            current = urllib.parse.urljoin(current, location)
+            with self._lock:
+                self.redirects_followed += 1
+            if resp.status == 303:
+                method = 'GET'
+        raise http.client.HTTPException(f"Too many redirects for {url}")
+
+    def stats(self):
+        """Return pool totals plus per-connection numbers for the connections still open."""
+        with self._lock:
+            live = sorted(self._live, key=lambda c: c.created)
+            conns = [c.stats() for c in live]
+            avg = self.connect_seconds / self.opened if self.opened else 0.0
+            return {
+                'connections_opened': self.opened,
+                'connections_reused': self.reused,
+                'connect_seconds': round(self.connect_seconds, 4),
+                # every reuse (and every skipped redirect hop) avoided one handshake
+                'estimated_seconds_saved': round(avg * (self.reused + self.redirects_skipped), 4),
+                'redirects_followed': self.redirects_followed,
+                'redirects_skipped': self.redirects_skipped,
+                'requests': self.closed_requests + sum(c.requests for c in live),
+                'bytes_read': self.closed_bytes_read + sum(c.bytes_read for c in live),
+                'connections': conns,
+            }
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for pooled in conns:
+                self._discard(pooled)
@@ -0,0 +1,221 @@
+"""Per-install index of the files a season install put on disk.
+
+Written into the install folder as ``.mcsm-install.json`` right after
+extraction. It records every file with its size and modification time, plus
+the executable's location. Finding the executable, adding up disk usage,
+uninstalling and spotting files that changed since the install then read
+this index (one ``stat`` per file at most) instead of walking the tree.
+
+Names are recorded as the paths extraction actually wrote (see
+``extractor.member_path``), and any name that would point outside the
+install folder, e.g. in a hand-edited manifest, is refused.
+"""
+import json
+import os
+import time
+import zipfile
+
+import extractor
+
+MANIFEST_NAME = '.mcsm-install.json'
+MANIFEST_VERSION = 1
+# how many folders above the executable to look for the manifest
+SEARCH_DEPTH = 4
+
+
+class InstallManifest:
+    """Files (relative '/' names -> [size, mtime_ns]) installed under ``root``."""
+
+    def __init__(self, root, season, exe=None, files=None, url=None, digest=None, created=None):
+        self.root = root
+        self.season = season
+        self.exe = exe
+        self.files = files or {}
+        self.url = url
+        self.digest = digest
+        self.created = created or time.time()
+
+    @property
+    def path(self):
+        return os.path.join(self.root, MANIFEST_NAME)
+
+    def full_path(self, name):
+        """Return the path of ``name`` under ``root``; raise ValueError if it lies outside it."""
+        path = os.path.join(self.root, *name.split('/'))
+        if not _inside(self.root, path):
+            raise ValueError(f"{name} is outside the install folder {self.root}")
+        return path
+
+    def exe_path(self):
+        return self.full_path(self.exe) if self.exe else None
+
+    def disk_usage(self):
+        return sum(size for size, _ in self.files.values())
+
+    # -- persistence -------------------------------------------------------
+
+    @classmethod
+    def create(cls, root, season, names, exe=None, url=None, digest=None):
+        """Build a manifest for freshly extracted ``names`` by stat-ing each one.
+
+        ``names`` and ``exe`` are member names after layout rules; each is
+        recorded as the path extraction wrote it to, relative to ``root``.
+        """
+        files = {}
+        for name in names:
+            rel = _extracted_name(root, name)
+            if rel is None:
+                continue
+            try:
+                st = os.stat(os.path.join(root, *rel.split('/')))
+            except OSError:
+                continue
+            files[rel] = [st.st_size, st.st_mtime_ns]
+        return cls(root, season, exe and _extracted_name(root, exe), files, url, digest)
+
+    @classmethod
+    def load(cls, root):
+        """Return the manifest stored in ``root`` or None if there is none."""
+        try:
+            with open(os.path.join(root, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != MANIFEST_VERSION:
+                return None
+            # never trust a name that leads out of the install folder
+            files = {name: [int(size), int(mtime)] for name, (size, mtime) in data['files'].items()
+                     if _inside(root, os.path.join(root, *name.split('/')))}
+            exe = data.get('exe')
+            if exe and not _inside(root, os.path.join(root, *exe.split('/'))):
+                exe = None
+            return cls(root, data.get('season'), exe, files, data.get('url'),
+                       data.get('digest'), data.get('created'))
+        except Exception:
+            return None
+
+    @classmethod
+    def for_exe(cls, exe_path):
+        """Find the manifest of the install containing ``exe_path``."""
+        d = os.path.dirname(os.path.abspath(exe_path))
+        for _ in range(SEARCH_DEPTH):
+            manifest = cls.load(d)
+            if manifest is not None:
+                return manifest
+            parent = os.path.dirname(d)
+            if parent == d:
+                break
+            d = parent
+        return None
+
+    def save(self):
+        data = {
+            'version': MANIFEST_VERSION,
+            'season': self.season,
+            'url': self.url,
+            'digest': self.digest,
+            'created': self.created,
+            'exe': self.exe,
+            'files': self.files,
+        }
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    # -- checks ------------------------------------------------------------
+
+    def changes(self):
+        """Return ``[(name, reason)]`` for files that are missing or differ in size or mtime.
+
+        ``reason`` is ``'missing'``, ``'size'`` or ``'mtime'``. This is only a
+        stat per file; use ``installer.verify_install`` to compare contents.
+        """
+        changed = []
+        for name, (size, mtime) in self.files.items():
+            try:
+                st = os.stat(self.full_path(name))
+            except OSError:
+                changed.append((name, 'missing'))
+                continue
+            if st.st_size != size:
+                changed.append((name, 'size'))
+            elif st.st_mtime_ns != mtime:
+                changed.append((name, 'mtime'))
+        return changed
+
+    def refresh(self, names):
+        """Record the current size and mtime of ``names`` (e.g. after a repair)."""
+        for name in names:
+            try:
+                st = os.stat(self.full_path(name))
+            except OSError:
+                self.files.pop(name, None)
+                continue
+            self.files[name] = [st.st_size, st.st_mtime_ns]
+
+    # -- removal -----------------------------------------------------------
+
+    def uninstall(self, progress=None):
+        """Delete every installed file, then the folders left empty; return ``(removed, failed)``.
+
+        ``removed`` counts the files deleted. ``failed`` lists
+        ``(name, error message)`` for files that could not be deleted (e.g.
+        a running game holds them open); the manifest is rewritten to list
+        just those, so a later uninstall can finish the job. Files that
+        were not part of the install (e.g. added by the user) are kept, and
+        so are the folders holding them.
+        """
+        removed = 0
+        failed = []
+        total = len(self.files)
+        dirs = set()
+        for i, name in enumerate(self.files, start=1):
+            try:
+                os.remove(self.full_path(name))
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                failed.append((name, str(e)))
+            parent = os.path.dirname(name)
+            while parent:
+                dirs.add(parent)
+                parent = os.path.dirname(parent)
+            if progress:
+                progress(i, total)
+        remaining = dict(failed)
+        self.files = {name: stat for name, stat in self.files.items() if name in remaining}
+        if self.exe not in self.files:
+            self.exe = None
+        try:
+            if failed:
+                self.save()
+            else:
+                os.remove(self.path)
+        except OSError:
+            pass
+        # deepest first so parents are empty by the time they are reached
+        for d in sorted(dirs, key=lambda d: d.count('/'), reverse=True) + ['']:
+            try:
+                os.rmdir(self.full_path(d) if d else self.root)
+            except (OSError, ValueError):
+                pass
+        return removed, failed
+
+
+def _inside(root, path):
+    """True if ``path`` resolves to somewhere below ``root`` (not ``root`` itself)."""
+    real_root = os.path.realpath(root)
+    real = os.path.realpath(path)
+    try:
+        return real != real_root and os.path.commonpath([real_root, real]) == real_root
+    except ValueError:
+        # different drives on Windows
+        return False
+
+
+def _extracted_name(root, name):
+    """Return the '/' path, relative to ``root``, that extraction wrote member ``name`` to."""
+    path = extractor.member_path(zipfile.ZipInfo(name), root)
+    if not _inside(root, path):
+        return None
+    return os.path.relpath(path, root).replace(os.sep, '/')
@@ -0,0 +1,336 @@
+"""Season installs: download, extract, verify and repair.
+
+``install_season`` is the whole install pipeline used by both the Tk
+launcher and the command line: probe, archive cache, download, extract, and
+finding the game executable. It reports through plain callbacks and raises
+on failure, so it has no UI dependencies.
+
+A season zip already records the size and CRC-32 of every member in its
+central directory. ``verify_install`` compares an installed tree against
+those values and ``repair_install`` rewrites only the files that are missing
+or damaged, reading just those members from a cached copy of the archive or
+from the remote zip with HTTP range requests.
+"""
+import os
+import posixpath
+import subprocess
+import sys
+import zipfile
+import zlib
+
+import downloader
+import extractor
+import integrity
+import settings
+from install_manifest import InstallManifest
+from remotezip import RemoteZip
+
+CRC_CHUNK = 1024 * 1024
+# folder inside the install folder that holds the archive while it downloads
+PARTIAL_DIR = '.mcsm-download'
+
+SEASONS = settings.SEASONS
+
+
+class InstallError(Exception):
+    """Raised when an install cannot complete (e.g. the archive is not a valid zip)."""
+
+
+def season_for_key(config_key):
+    for season in SEASONS.values():
+        if season['config_key'] == config_key:
+            return season
+    raise KeyError(config_key)
+
+
+def default_install_dir(season):
+    # When running as a PyInstaller one-file executable, APP_DIR
+    # points to the temporary extraction folder which is ephemeral.
+    # In that case prefer a persistent location under the user's
+    # Documents folder. Otherwise use the repository/app dir so
+    # running from source keeps installs next to the app.
+    if getattr(sys, 'frozen', False):
+        base_install_dir = os.path.join(os.path.expanduser("~"), "Documents", "MCSM-Launcher")
+    else:
+        base_install_dir = settings.APP_DIR
+    return os.path.join(base_install_dir, season['default_name'])
+
+
+def install_season(season, target_dir, cache, mirrors=(), progress=None, status=None,
+                   extract_progress=None, pipelined=True):
+    """Download (or take from ``cache``) and extract ``season`` into ``target_dir``.
+
+    ``progress(done, total)`` reports download bytes, ``extract_progress``
+    the same for extraction, and ``status(text, percent)`` each step.
+    With ``pipelined`` (and a server that supports ranges) members are
+    extracted while the rest of the archive is still downloading.
+    Returns the path of the game executable, or None if the archive did
+    not contain it. Download failures raise ``downloader.DownloadError``; a
+    damaged archive raises InstallError.
+    """
+    url = season['url']
+    expected_exe_name = season['exe']
+    layout = season.get('layout', ())
+    if status is None:
+        status = lambda text, percent=None: None
+    os.makedirs(target_dir, exist_ok=True)
+
+    # The archive is downloaded inside the install folder: extraction then
+    # never crosses filesystems, and the path is stable so an interrupted
+    # download resumes on the next attempt instead of starting at byte 0.
+    partial_dir = os.path.join(target_dir, PARTIAL_DIR)
+    tmp_path = downloader.download_path_for(url, partial_dir)
+
+    # A previous install (possibly into another folder) may have
+    # left this exact archive in the local cache. The same probe is
+    # handed to the downloader, so archive.org sees a single HEAD.
+    info = downloader.probe(url)
+    if not info['total']:
+        # offline or HEAD refused: any cached copy will do
+        info = None
+    manifest = integrity.load_manifest(url, settings.MANIFEST_PATHS)
+    cached = cache.lookup(url, info, manifest)
+
+    pipeline = None
+    if cached:
+        status("Found archive in local cache — extracting...", 100)
+        result = None
+        tmp_path = cached
+    else:
+        if pipelined:
+            pipeline = _start_pipeline(url, info, tmp_path, target_dir, layout, extract_progress)
+        try:
+            result = downloader.download_file(url, tmp_path, progress=progress,
+                                              manifests=settings.MANIFEST_PATHS, mirrors=mirrors,
+                                              on_block=pipeline.block_done if pipeline else None, info=info)
+        except BaseException:
+            if pipeline is not None:
+                pipeline.abort()
+            raise
+        status("Download complete — extracting...", 100)
+
+    try:
+        if pipeline is not None:
+            extracted = pipeline.finish()
+        else:
+            extracted = extractor.extract_all(tmp_path, target_dir, progress=extract_progress, layout=layout)
+    except zipfile.BadZipFile:
+        if cached:
+            # drop the bad copy so the next attempt downloads again
+            cache.remove(os.path.splitext(os.path.basename(cached))[0])
+            raise InstallError("Cached archive was damaged and has been removed — try again")
+        os.remove(tmp_path)
+        raise InstallError("Downloaded file is not a valid zip")
+
+    if result is not None:
+        # Every member passed zipfile's CRC check, so remember the
+        # block digests to verify future downloads of this URL
+        if result.manifest is not None and manifest is None:
+            try:
+                integrity.save_manifest(settings.LEARNED_MANIFESTS_PATH, url, result.manifest)
+            except Exception:
+                pass
+        # Keep the archive for reinstalls instead of deleting it
+        try:
+            if result.digest:
+                cache.put(tmp_path, url, result.info, result.digest)
+        except Exception:
+            pass
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.rmdir(partial_dir)
+        except OSError:
+            pass
+    status("Extract complete.", 100)
+
+    # layout rules already put every file at its final path, so the
+    # executable's location is known without walking the tree; record it
+    # with the file list for later lookups, usage, uninstall and checks
+    digest = result.digest if result is not None else os.path.splitext(os.path.basename(cached))[0]
+    manifest = InstallManifest.create(target_dir, season['config_key'], [name for name, _, _ in extracted.timings],
+                                      extracted.find(expected_exe_name), url, digest)
+    try:
+        manifest.save()
+    except Exception:
+        pass
+    return manifest.exe_path()
+
+
+def _start_pipeline(url, info, archive_path, target_dir, layout, extract_progress):
+    """Fetch the remote central directory so members can be extracted while downloading.
+
+    Returns a PipelinedExtractor, or None when the server cannot serve
+    ranges (the archive is then extracted after the download).
+    """
+    if not info or not info.get('accept_ranges'):
+        return None
+    try:
+        with RemoteZip(url, info=info) as rz:
+            infos = rz.infolist()
+            tail = rz.central_directory()
+    except Exception:
+        return None
+    return extractor.PipelinedExtractor(archive_path, target_dir, infos, tail, layout, progress=extract_progress)
+
+
+def find_install(exe_path):
+    """Return the InstallManifest of the install holding ``exe_path``, or None."""
+    if not exe_path:
+        return None
+    return InstallManifest.for_exe(exe_path)
+
+
+def changed_pairs(pairs, manifest):
+    """Keep the ``member_paths`` pairs whose files changed since the install.
+
+    Uses the manifest's size/mtime record, so unchanged files are never
+    read. Files the manifest does not list are always kept. ``pairs`` must
+    be mapped below ``manifest.root``.
+    """
+    changed = {os.path.normcase(manifest.full_path(name)) for name, _ in manifest.changes()}
+    listed = {os.path.normcase(manifest.full_path(name)) for name in manifest.files}
+    kept = []
+    for info, path in pairs:
+        key = os.path.normcase(os.path.normpath(path))
+        if key in changed or key not in listed:
+            kept.append((info, path))
+    return kept
+
+
+def record_files(manifest, paths):
+    """Store the current size/mtime of ``paths`` (checked or repaired files) in ``manifest``."""
+    names = [os.path.relpath(path, manifest.root).replace(os.sep, '/') for path in paths]
+    manifest.refresh(names)
+    manifest.save()
+
+
+def launch(exe_path):
+    """Start the game executable from its own folder and return the process."""
+    if not os.path.exists(exe_path):
+        raise FileNotFoundError(exe_path)
+    return subprocess.Popen([exe_path], cwd=os.path.dirname(exe_path))
+
+
+def open_archive(url, cache=None, info=None, manifest=None, pool=None):
+    """Return an open archive for ``url``: the cached zip if there is one, else the remote zip.
+
+    Both results offer ``infolist()``, ``open(member)`` and ``close()``.
+    """
+    if cache is not None:
+        cached = cache.lookup(url, info, manifest)
+        if cached:
+            try:
+                return zipfile.ZipFile(cached)
+            except zipfile.BadZipFile:
+                pass
+    return RemoteZip(url, pool, info)
+
+
+def install_root(infos, season, exe_path, install=None):
+    """Return the folder ``season`` was installed into.
+
+    That is the install manifest's root when there is one. Otherwise it is
+    worked out from ``exe_path``: the executable's name after the season's
+    layout rules says how many folders deep it sits below the root.
+    """
+    if install is not None:
+        return install.root
+    exe_name = season['exe'].lower()
+    for info in extractor.plan_members(infos, season.get('layout', ())):
+        if not info.is_dir() and posixpath.basename(info.filename).lower() == exe_name:
+            depth = len([part for part in info.filename.split('/') if part]) - 1
+            break
+    else:
+        raise ValueError(f"{season['exe']} is not in the archive")
+    root = os.path.dirname(os.path.abspath(exe_path))
+    for _ in range(depth):
+        root = os.path.dirname(root)
+    return root
+
+
+def member_paths(infos, root, layout=()):
+    """Map archive members to their installed paths below ``root``.
+
+    This is the mapping ``install_season`` extracts with (``layout`` rules,
+    then ``extractor.member_path``), so verify and repair look exactly where
+    the install put each file. Returns ``[(info, path)]`` for every file
+    member; ``info`` carries the name after layout rules.
+    """
+    return [(info, extractor.member_path(info, root))
+            for info in extractor.plan_members(infos, layout) if not info.is_dir()]
+
+
+def file_crc32(path):
+    crc = 0
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(CRC_CHUNK)
+            if not data:
+                break
+            crc = zlib.crc32(data, crc)
+    return crc & 0xFFFFFFFF
+
+
+def verify_install(pairs, quick=False, progress=None):
+    """Check installed files against the archive; return ``[(info, path, reason)]`` problems.
+
+    ``reason`` is ``'missing'``, ``'size'`` or ``'crc'``. With ``quick`` only
+    presence and size are checked. ``progress(done_bytes, total_bytes)`` is
+    reported while hashing.
+    """
+    problems = []
+    total = sum(info.file_size for info, _ in pairs)
+    done = 0
+    for info, path in pairs:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            problems.append((info, path, 'missing'))
+            done += info.file_size
+            continue
+        if size != info.file_size:
+            problems.append((info, path, 'size'))
+        elif not quick and file_crc32(path) != info.CRC:
+            problems.append((info, path, 'crc'))
+        done += info.file_size
+        if progress:
+            progress(done, total)
+    return problems
+
+
+def repair_install(archive, problems, root, progress=None):
+    """Rewrite every file listed in ``problems`` from ``archive``; return how many were fixed.
+
+    Each file is written to a temporary name next to it and renamed into
+    place, so an interrupted repair never leaves a half-written file.
+    Raises InstallError, before writing anything, if a path is not inside
+    the install folder ``root``.
+    """
+    real_root = os.path.realpath(root)
+    for _, path, _ in problems:
+        real = os.path.realpath(path)
+        if real == real_root or os.path.commonpath([real_root, real]) != real_root:
+            raise InstallError(f"Refusing to write {path}: it is outside the install folder {root}")
+    total = sum(info.file_size for info, _, _ in problems)
+    done = 0
+    fixed = 0
+    for info, path, _ in problems:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.repair'
+        try:
+            with archive.open(info) as src, open(tmp, 'wb') as dst:
+                while True:
+                    data = src.read(CRC_CHUNK)
+                    if not data:
+                        break
+                    dst.write(data)
+                    done += len(data)
+                    if progress:
+                        progress(done, total)
+            os.replace(tmp, path)
+            fixed += 1
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return fixed
@@ -0,0 +1,194 @@
+"""Block digests for downloads, computed while the data streams in.
+
+A download is divided into fixed ``HASH_BLOCK_SIZE`` blocks. Segment
+boundaries always fall on block boundaries, so every block is written by one
+worker from start to end and can be hashed incrementally as it arrives. The
+digest of the whole file is the SHA-256 of the ordered block digests, so it
+is available the moment the last block lands, without reading the file back.
+
+Expected digests come from manifests: JSON files mapping a download URL to
+``{"size", "block_size", "root", "blocks"}``. One manifest ships with the
+launcher (``assets/manifests.json``); another, in the config directory, is
+filled in after an archive installed cleanly, so later downloads of the
+same file are checked against it. A block that does not match is fetched
+again on its own instead of discarding the whole download.
+"""
+import hashlib
+import json
+import os
+
+HASH_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+class IntegrityError(Exception):
+    """Raised when downloaded data does not match the expected digests."""
+
+
+def block_count(total, block_size=HASH_BLOCK_SIZE):
+    return (total + block_size - 1) // block_size
+
+
+def root_digest(block_digests):
+    """Combine ordered hex block digests into the whole-file digest."""
+    h = hashlib.sha256()
+    for d in block_digests:
+        h.update(bytes.fromhex(d))
+    return h.hexdigest()
+
+
+class Manifest:
+    """Expected size and digests for one remote file."""
+
+    def __init__(self, size, block_size, blocks, root=None):
+        self.size = size
+        self.block_size = block_size
+        self.blocks = list(blocks)
+        self.root = root or root_digest(self.blocks)
+
+    def expected(self, index):
+        if 0 <= index < len(self.blocks):
+            return self.blocks[index]
+        return None
+
+    def applies_to(self, total):
+        """A manifest for a different size (or block size) describes another file."""
+        return (self.size == total and self.block_size == HASH_BLOCK_SIZE
+                and len(self.blocks) == block_count(total, self.block_size))
+
+    def to_dict(self):
+        return {'size': self.size, 'block_size': self.block_size, 'root': self.root, 'blocks': self.blocks}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(int(data['size']), int(data['block_size']), data['blocks'], data.get('root'))
+
+
+def load_manifest(url, paths):
+    """Return the Manifest for ``url`` from the first of ``paths`` that has one."""
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            entry = data.get(url)
+            if entry:
+                return Manifest.from_dict(entry)
+        except Exception:
+            continue
+    return None
+
+
+def save_manifest(path, url, manifest):
+    """Record ``manifest`` for ``url`` in the manifest file at ``path``."""
+    data = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception:
+        pass
+    data[url] = manifest.to_dict()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def hash_file(path, block_size=HASH_BLOCK_SIZE):
+    """Return a Manifest for a local file by reading it once (used for existing zips)."""
+    blocks = []
+    size = 0
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(block_size)
+            if not data:
+                break
+            size += len(data)
+            blocks.append(hashlib.sha256(data).hexdigest())
+    return Manifest(size, block_size, blocks)
+
+
+class BlockHasher:
+    """Incremental per-block SHA-256 over data written at arbitrary offsets.
+
+    Each block must be fed sequentially from its first byte, which the
+    downloader guarantees by aligning segments to block boundaries.
+    ``digests`` maps block index to hex digest for finished blocks; blocks
+    that did not match the manifest end up in ``bad`` instead.
+    """
+
+    def __init__(self, total, manifest=None, digests=None, block_size=HASH_BLOCK_SIZE):
+        self.total = total
+        self.block_size = block_size
+        self.manifest = manifest if manifest is not None and manifest.applies_to(total) else None
+        self.digests = dict(digests or {})
+        self.bad = set()
+        # block index -> [hash object, next expected offset]; each entry is
+        # only touched by the worker writing that block
+        self._partial = {}
+
+    @property
+    def count(self):
+        return block_count(self.total, self.block_size)
+
+    def block_range(self, index):
+        start = index * self.block_size
+        return start, min(self.total, start + self.block_size)
+
+    def update(self, offset, data):
+        """Hash ``data`` written at ``offset``; return [(index, digest)] for finished good blocks."""
+        finished = []
+        view = memoryview(data)
+        while view:
+            index = offset // self.block_size
+            start, end = self.block_range(index)
+            state = self._partial.get(index)
+            if state is None:
+                if offset != start:
+                    raise IntegrityError(f"Block {index} was not written from its start")
+                state = [hashlib.sha256(), start]
+                self._partial[index] = state
+            elif state[1] != offset:
+                raise IntegrityError(f"Block {index} was written out of order")
+            take = min(len(view), end - offset)
+            state[0].update(view[:take])
+            state[1] += take
+            offset += take
+            view = view[take:]
+            if state[1] == end:
+                del self._partial[index]
+                digest = state[0].hexdigest()
+                expected = self.manifest.expected(index) if self.manifest else None
+                if expected is not None and expected != digest:
+                    self.bad.add(index)
+                else:
+                    self.bad.discard(index)
+                    self.digests[index] = digest
+                    finished.append((index, digest))
+        return finished
+
+    def forget(self, index):
+        """Drop any state for a block that is about to be fetched again."""
+        self._partial.pop(index, None)
+        self.digests.pop(index, None)
+
+    def complete(self):
+        return not self.bad and len(self.digests) == self.count
+
+    def root(self):
+        if not self.complete():
+            return None
+        return root_digest(self.digests[i] for i in range(self.count))
+
+    def to_manifest(self):
+        if not self.complete():
+            return None
+        return Manifest(self.total, self.block_size, [self.digests[i] for i in range(self.count)])
+
+    def verify(self):
+        """Raise IntegrityError unless every block is present and matches the manifest."""
+        if self.bad:
+            raise IntegrityError(f"{len(self.bad)} block(s) did not match the expected digests")
+        if len(self.digests) != self.count:
+            raise IntegrityError("Some blocks were never hashed")
+        if self.manifest and self.root() != self.manifest.root:
+            raise IntegrityError("The file digest does not match the manifest")
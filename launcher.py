@@ -1,24 +1,69 @@
+import sys
+
+# Must come before the imports it should time (see startup_timing)
+import startup_timing
+if __name__ == "__main__" and "--startup-timing" in sys.argv[1:]:
+    startup_timing.install()
+
+import importlib
 import os
-import json
-import subprocess
+import time
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
 import threading
-import sys
-import urllib.request
-import shutil
-import zipfile
-import tempfile
-import webbrowser
-
-# Optional Pillow support for banner resizing. If not installed we fall back to Tk's PhotoImage
-try:
-    from PIL import Image, ImageTk
-    HAS_PIL = True
-except Exception:
-    Image = None
-    ImageTk = None
-    HAS_PIL = False
+
+import events
+import settings
+import thumbcache
+# Paths, default config and the JSON config file live in settings so the
+# command line tool can share them without importing tkinter
+from settings import APP_DIR, ASSETS_DIR, MANIFEST_PATHS
+
+
+class LazyModule:
+    """Stands in for a module that is only imported when an attribute is first used.
+
+    Dialogs, the download code and the saves tools are all behind a button,
+    so importing them up front only delays the first frame.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+ttk = LazyModule('tkinter.ttk')
+filedialog = LazyModule('tkinter.filedialog')
+messagebox = LazyModule('tkinter.messagebox')
+zipfile = LazyModule('zipfile')
+webbrowser = LazyModule('webbrowser')
+downloader = LazyModule('downloader')
+installer = LazyModule('installer')
+integrity = LazyModule('integrity')
+saves = LazyModule('saves')
+savewatch = LazyModule('savewatch')
+snapshots = LazyModule('snapshots')
+zipwriter = LazyModule('zipwriter')
+
+# Optional Pillow support for banner resizing. If not installed we fall back to
+# Tk's PhotoImage. It is imported on first use: once the scaled images are in
+# the thumbnail cache, Tk loads them directly and Pillow is never needed.
+_PIL = []
+
+
+def load_pil():
+    """Return ``(Image, ImageTk)``, or None when Pillow is not installed."""
+    if not _PIL:
+        try:
+            from PIL import Image, ImageTk
+            _PIL.append((Image, ImageTk))
+        except Exception:
+            _PIL.append(None)
+    return _PIL[0]
 
 # Launcher with vertical tabs and banner images for Season 1 / Season 2
 
@@ -29,43 +74,19 @@ BTN_BG = "#146114"
 BTN_ACTIVE = "#1f7b1f"
 BTN_FG = "#ffffff"
 
-APP_DIR = os.path.dirname(os.path.abspath(__file__))
-
-# When bundled as a one-file PyInstaller exe, APP_DIR points to a temporary
-# extraction folder that is removed after the process exits. We must not
-# store persistent user data there. Prefer a persistent per-user config
-# directory when frozen; otherwise keep config next to the script during
-# development.
-if getattr(sys, 'frozen', False):
-    CONFIG_DIR = os.path.join(os.path.expanduser("~"), "Documents", 'MCSM-Launcher')
-else:
-    CONFIG_DIR = APP_DIR
-
-# Ensure the config directory exists so writes won't fail
-try:
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-except Exception:
-    # Non-fatal; save_config will try again before writing
-    pass
-
-CONFIG_PATH = os.path.join(CONFIG_DIR, 'launcher_config.json')
-ASSETS_DIR = os.path.join(APP_DIR, 'assets')
-
-# Default saves locations inside user's Documents
-S1_SAVES_DIR = os.path.join(os.path.expanduser("~"), "Documents", "Telltale Games", "S1")
-S2_SAVES_DIR = os.path.join(os.path.expanduser("~"), "Documents", "Telltale Games", "S2")
-
-DEFAULT_CONFIG = {
-    "season1_path": "",
-    "season2_path": "",
-    # save locations (remember user's choice)
-    "s1_saves": S1_SAVES_DIR,
-    "s2_saves": S2_SAVES_DIR,
-}
+SEASONS = settings.SEASONS
+
+
+# target locked banner height (pixels); cache key for scaled banners
+BANNER_HEIGHT = 180
+BANNER_DECODE_HEIGHT = 170
 
 
 class LauncherApp(tk.Tk):
     def __init__(self):
+        # time to first frame is measured from here (see _on_first_map)
+        self._started = time.perf_counter()
+        self.first_frame_seconds = None
         super().__init__()
         self.title("Minecraft Story Mode Launcher")
         self.geometry("800x440")
@@ -80,21 +101,71 @@ class LauncherApp(tk.Tk):
         except Exception:
             pass
 
+        # keep track of banner labels so we can refresh them on resize
+        # each entry is (label_widget, filename, title_text)
+        self.banner_labels = []
+        # cache scaled PhotoImage objects: key=(filename, height) -> PhotoImage
+        self._banner_cache = {}
+        # banners being decoded in the background
+        self._banner_pending = set()
+
+        # icon cache key=(filename, size)
+        self._icon_cache = {}
+        # scaled banners and icons on disk, reused across starts
+        self.thumbs = thumbcache.ThumbCache(settings.THUMBS_DIR)
+
+        # archive cache and snapshot store: made on first use (properties below)
+        self._archive_cache = None
+        self._snapshot_store = None
+        # saves_key -> SaveWatcher while automatic snapshots are on
+        self.save_watchers = {}
+
+        # used for debouncing configure events
+        self._resize_after_id = None
+
+        # Background workers post progress, status and dialogs here; the
+        # main loop drains it at a fixed frame rate
+        self.events = events.EventBus()
+        self.events.attach(self, messagebox)
+
+        self.create_widgets()
+        self.update_save_watchers()
+
+        # Bind resize to schedule banner refresh (debounced)
+        self.bind("<Configure>", self._on_resize)
+        self.bind("<Map>", self._on_first_map, add="+")
+
+    def _on_first_map(self, event):
+        if event.widget is not self or self.first_frame_seconds is not None:
+            return
+        # the window is mapped; it is drawn by the idle handlers queued now
+        self.after_idle(self._first_frame_drawn)
+
+    def _first_frame_drawn(self):
+        self.first_frame_seconds = time.perf_counter() - self._started
+        startup_timing.first_frame(self.first_frame_seconds)
+        # now that the user sees something: window icon, then the season
+        # banners, so they are ready by the time a season page is opened
+        self.after_idle(self.set_window_icon)
+        for filename in ("S1logo.png", "S2logo.png"):
+            self.request_banner(filename)
+
+    def set_window_icon(self):
         # Attempt to load and set the application/window icon from assets/Logo.png
         try:
             logo_path = os.path.join(ASSETS_DIR, "Logo.png")
             if os.path.exists(logo_path):
-                if HAS_PIL:
-                    try:
-                        _img = Image.open(logo_path)
-                        _tkimg = ImageTk.PhotoImage(_img)
-                    except Exception:
-                        _tkimg = None
-                else:
-                    try:
-                        _tkimg = tk.PhotoImage(file=logo_path)
-                    except Exception:
-                        _tkimg = None
+                # Tk reads PNG itself; Pillow only for files it cannot
+                try:
+                    _tkimg = tk.PhotoImage(file=logo_path)
+                except Exception:
+                    _tkimg = None
+                    pil = load_pil()
+                    if pil:
+                        try:
+                            _tkimg = pil[1].PhotoImage(pil[0].open(logo_path))
+                        except Exception:
+                            _tkimg = None
 
                 if _tkimg:
                     # keep reference to avoid GC
@@ -111,66 +182,50 @@ class LauncherApp(tk.Tk):
             # non-fatal if icon can't be set
             pass
 
-        # keep track of banner labels so we can refresh them on resize
-        # each entry is (label_widget, filename, title_text)
-        self.banner_labels = []
-        # cache scaled PhotoImage objects: key=(filename, height) -> PhotoImage
-        self._banner_cache = {}
-
-        # icon cache key=(filename, size)
-        self._icon_cache = {}
+    def load_config(self):
+        return settings.load_config()
 
-        # used for debouncing configure events
-        self._resize_after_id = None
+    def make_archive_cache(self):
+        return settings.make_archive_cache(self.config)
 
-        self.create_widgets()
+    @property
+    def archive_cache(self):
+        if self._archive_cache is None:
+            self._archive_cache = self.make_archive_cache()
+        return self._archive_cache
 
-        # Bind resize to schedule banner refresh (debounced)
-        self.bind("<Configure>", self._on_resize)
-
-    def load_config(self):
-        # Load config from disk if present. If missing, create a default
-        # config file at CONFIG_PATH (ensuring parent dirs exist) so that
-        # the bundled exe has a persistent config file to modify.
-        try:
-            if os.path.exists(CONFIG_PATH):
-                with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    if isinstance(data, dict):
-                        return {**DEFAULT_CONFIG, **data}
-            else:
-                # Create parent directory if necessary and write default config
-                cfg_dir = os.path.dirname(CONFIG_PATH)
-                if cfg_dir and not os.path.isdir(cfg_dir):
-                    try:
-                        os.makedirs(cfg_dir, exist_ok=True)
-                    except Exception:
-                        pass
-                try:
-                    with open(CONFIG_PATH, "w", encoding="utf-8") as f:
-                        json.dump(DEFAULT_CONFIG, f, indent=2)
-                except Exception:
-                    # If we can't write the file that's non-fatal; continue
-                    pass
-                return DEFAULT_CONFIG.copy()
-        except Exception:
-            pass
-        return DEFAULT_CONFIG.copy()
+    @property
+    def snapshot_store(self):
+        if self._snapshot_store is None:
+            self._snapshot_store = snapshots.SnapshotStore(settings.SNAPSHOTS_DIR)
+        return self._snapshot_store
 
     def save_config(self):
         try:
-            # Ensure parent directory exists (important for frozen exe)
-            cfg_dir = os.path.dirname(CONFIG_PATH)
-            if cfg_dir and not os.path.isdir(cfg_dir):
-                try:
-                    os.makedirs(cfg_dir, exist_ok=True)
-                except Exception:
-                    pass
-            with open(CONFIG_PATH, "w", encoding="utf-8") as f:
-                json.dump(self.config, f, indent=2)
+            settings.save_config(self.config)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save config: {e}")
 
+    def update_save_watchers(self):
+        """Start, stop or restart the save watchers to match the config."""
+        enabled = bool(self.config.get('auto_snapshots'))
+        for season in SEASONS.values():
+            key = season['saves_key']
+            saves_dir = self.config.get(key) or season['saves_dir']
+            watcher = self.save_watchers.get(key)
+            if watcher is not None and (not enabled or watcher.saves_dir != saves_dir):
+                watcher.stop()
+                del self.save_watchers[key]
+                watcher = None
+            if watcher is None and enabled:
+                watcher = savewatch.SaveWatcher(
+                    self.snapshot_store, key, saves_dir,
+                    on_snapshot=lambda snap, stats, key=key: self.events.status(
+                        key, f"Automatic snapshot {snap.id} ({stats['hashed']} changed files)"),
+                    on_error=lambda e, key=key: self.events.status(key, f"Automatic snapshot failed: {e}"))
+                watcher.start()
+                self.save_watchers[key] = watcher
+
     def create_widgets(self):
         # Use tk.Frame so we can set background color easily
         container = tk.Frame(self, bg=BG_COLOR, padx=8, pady=8)
@@ -199,81 +254,160 @@ class LauncherApp(tk.Tk):
         self.main_area = tk.Frame(container, bg=BG_COLOR)
         self.main_area.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(12, 0))
 
-        # Create tab frames (use tk.Frame so background matches)
-        self.home_frame = tk.Frame(self.main_area, bg=BG_COLOR)
-        self.s1_frame = tk.Frame(self.main_area, bg=BG_COLOR)
-        self.s2_frame = tk.Frame(self.main_area, bg=BG_COLOR)
-        self.saves_frame = tk.Frame(self.main_area, bg=BG_COLOR)
-
-        self.create_home(self.home_frame)
-        self.create_season_page(self.s1_frame, "Season 1", "S1logo.png", "season1_path")
-        self.create_season_page(self.s2_frame, "Season 2", "S2logo.png", "season2_path")
-        self.create_saves_page(self.saves_frame)
+        # Tab frames are created and filled the first time they are shown,
+        # so startup only builds Home: page name -> (frame, builder)
+        self.pages = {}
+        self.page_builders = {
+            'home': self.create_home,
+            's1': lambda parent: self.create_season_page(parent, "Season 1", "S1logo.png", "season1_path"),
+            's2': lambda parent: self.create_season_page(parent, "Season 2", "S2logo.png", "season2_path"),
+            'saves': self.create_saves_page,
+        }
 
         # Start on Home
         self.show_home()
 
     def clear_main(self):
-        for f in (self.home_frame, self.s1_frame, self.s2_frame, self.saves_frame):
+        for f in self.pages.values():
             f.pack_forget()
 
-    def show_home(self):
+    def show_page(self, name):
         self.clear_main()
-        self.home_frame.pack(fill=tk.BOTH, expand=True)
+        frame = self.pages.get(name)
+        if frame is None:
+            # use tk.Frame so background matches
+            frame = tk.Frame(self.main_area, bg=BG_COLOR)
+            self.page_builders[name](frame)
+            self.pages[name] = frame
+        frame.pack(fill=tk.BOTH, expand=True)
+
+    def show_home(self):
+        self.show_page('home')
 
     def show_season1(self):
-        self.clear_main()
-        self.s1_frame.pack(fill=tk.BOTH, expand=True)
+        self.show_page('s1')
 
     def show_season2(self):
-        self.clear_main()
-        self.s2_frame.pack(fill=tk.BOTH, expand=True)
+        self.show_page('s2')
 
     def show_saves(self):
-        self.clear_main()
-        self.saves_frame.pack(fill=tk.BOTH, expand=True)
+        self.show_page('saves')
+
+    def _cached_photo(self, path, width, height):
+        """Return a PhotoImage of ``path`` scaled into width x height from the thumbnail cache, or None."""
+        thumb = self.thumbs.get(path, width, height)
+        if thumb is None:
+            return None
+        try:
+            return tk.PhotoImage(file=thumb)
+        except Exception:
+            return None
+
+    def _cached_banner(self, filename):
+        """Return the banner from memory or the thumbnail cache without decoding the full image."""
+        key = (filename, BANNER_HEIGHT)
+        img = self._banner_cache.get(key)
+        if img is None:
+            img = self._cached_photo(os.path.join(ASSETS_DIR, filename), 0, BANNER_DECODE_HEIGHT)
+            if img is not None:
+                self._banner_cache[key] = img
+        return img
 
-    def load_banner(self, filename):
+    def _decode_banner(self, filename):
+        """Read and scale a banner without touching Tk, so it can run on any thread.
+
+        Returns a PIL image (also written to the thumbnail cache), the raw
+        file bytes (no Pillow, or Pillow could not read it: Tk decodes them)
+        or None if the file is missing.
+        """
         path = os.path.join(ASSETS_DIR, filename)
         if not os.path.exists(path):
             return None
 
-        # target locked banner height (pixels)
-        MAX_BANNER_HEIGHT = 170
-
-        if HAS_PIL:
+        pil = load_pil()
+        if pil:
+            Image = pil[0]
             try:
-                # Load with PIL and scale to MAX_BANNER_HEIGHT while preserving aspect ratio
+                # Load with PIL and scale to BANNER_DECODE_HEIGHT while preserving aspect ratio
                 img = Image.open(path)
                 w, h = img.size
-                if h > MAX_BANNER_HEIGHT:
-                    scale = MAX_BANNER_HEIGHT / float(h)
+                if h > BANNER_DECODE_HEIGHT:
+                    scale = BANNER_DECODE_HEIGHT / float(h)
                     new_w = max(1, int(w * scale))
                     new_h = max(1, int(h * scale))
                     img = img.resize((new_w, new_h), Image.LANCZOS)
+                img.load()
+                self.thumbs.store(path, 0, BANNER_DECODE_HEIGHT, lambda dst: img.save(dst, 'PNG'))
+                return img
+            except Exception:
+                # fallback to PhotoImage if PIL can't handle it
+                pass
+
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except Exception:
+            return None
+
+    def _banner_photo(self, filename, decoded):
+        """Turn the result of ``_decode_banner`` into a PhotoImage (main thread only)."""
+        if decoded is None:
+            return None
+        path = os.path.join(ASSETS_DIR, filename)
+        if not isinstance(decoded, bytes):
+            try:
                 # Convert to ImageTk.PhotoImage for Tk
-                tkimg = ImageTk.PhotoImage(img)
+                tkimg = load_pil()[1].PhotoImage(decoded)
                 self.photo_refs[path] = tkimg
                 return tkimg
             except Exception:
-                # fallback to PhotoImage if PIL can't handle it
-                pass
+                return None
 
         try:
-            tkimg = tk.PhotoImage(file=path)
-            # If image is taller than MAX_BANNER_HEIGHT we attempt a crude subsample
+            tkimg = tk.PhotoImage(data=decoded)
+            # If image is taller than BANNER_DECODE_HEIGHT we attempt a crude subsample
             try:
                 h = tkimg.height()
-                if h > MAX_BANNER_HEIGHT:
-                    factor = max(1, int(h // MAX_BANNER_HEIGHT))
+                if h > BANNER_DECODE_HEIGHT:
+                    factor = max(1, int(h // BANNER_DECODE_HEIGHT))
                     tkimg = tkimg.subsample(factor, factor)
             except Exception:
                 pass
             self.photo_refs[path] = tkimg
+            self.thumbs.store(path, 0, BANNER_DECODE_HEIGHT, lambda dst: tkimg.write(dst, format='png'))
             return tkimg
         except Exception:
             return None
 
+    def request_banner(self, filename):
+        """Decode ``filename`` on a background thread unless it is cached or already under way.
+
+        When it is ready every banner label showing it is updated.
+        """
+        key = (filename, BANNER_HEIGHT)
+        if key in self._banner_cache or filename in self._banner_pending:
+            return
+        if self._cached_banner(filename) is not None:
+            return
+        self._banner_pending.add(filename)
+
+        def worker():
+            try:
+                decoded = self._decode_banner(filename)
+            except Exception:
+                decoded = None
+            self.events.call(self._banner_decoded, filename, decoded)
+
+        threading.Thread(target=worker, name=f'banner-{filename}', daemon=True).start()
+
+    def _banner_decoded(self, filename, decoded):
+        self._banner_pending.discard(filename)
+        # None marks a banner that could not be loaded, so it is not retried
+        self._banner_cache[(filename, BANNER_HEIGHT)] = self._banner_photo(filename, decoded)
+        for lbl, name, title_text in self.banner_labels:
+            if name == filename:
+                self._set_banner_on_label(lbl, filename, title_text)
+
     def load_icon(self, filename, size):
         """Load and return a PhotoImage for an icon (square size px)."""
         path = os.path.join(ASSETS_DIR, filename)
@@ -284,12 +418,20 @@ class LauncherApp(tk.Tk):
         if cached:
             return cached
 
-        if HAS_PIL:
+        tkimg = self._cached_photo(path, size, size)
+        if tkimg is not None:
+            self._icon_cache[key] = tkimg
+            return tkimg
+
+        pil = load_pil()
+        if pil:
+            Image, ImageTk = pil
             try:
                 img = Image.open(path).convert("RGBA")
                 img = img.resize((size, size), Image.LANCZOS)
                 tkimg = ImageTk.PhotoImage(img)
                 self._icon_cache[key] = tkimg
+                self.thumbs.store(path, size, size, lambda dst: img.save(dst, 'PNG'))
                 return tkimg
             except Exception:
                 pass
@@ -303,6 +445,7 @@ class LauncherApp(tk.Tk):
                     tkimg = tkimg.subsample(factor, factor)
             except Exception:
                 pass
+            self.thumbs.store(path, size, size, lambda dst: tkimg.write(dst, format='png'))
             self._icon_cache[key] = tkimg
             return tkimg
         except Exception:
@@ -321,8 +464,6 @@ class LauncherApp(tk.Tk):
     def _refresh_banners(self):
         """Refresh all banner labels using cached scaled images where possible."""
         self._resize_after_id = None
-        # target locked banner height (pixels)
-        MAX_BANNER_HEIGHT = 180
         for entry in list(self.banner_labels):
             try:
                 lbl, filename, title_text = entry
@@ -333,34 +474,22 @@ class LauncherApp(tk.Tk):
                 except Exception:
                     continue
                 title_text = ""
-            # Use cache key (filename, MAX_BANNER_HEIGHT)
-            key = (filename, MAX_BANNER_HEIGHT)
-            img = self._banner_cache.get(key)
-            if img is None:
-                # load and cache
-                img = self.load_banner(filename)
-                if img:
-                    self._banner_cache[key] = img
-            if img:
-                lbl.configure(image=img, text="")
-                lbl.image = img
-            else:
-                lbl.configure(image="", text=title_text, anchor="w")
+            self._set_banner_on_label(lbl, filename, title_text)
 
     def _set_banner_on_label(self, label, filename, title_text=""):
-        """Set a single banner label using cache or by loading the banner."""
-        MAX_BANNER_HEIGHT = 180
-        key = (filename, MAX_BANNER_HEIGHT)
-        img = self._banner_cache.get(key)
-        if img is None:
-            img = self.load_banner(filename)
-            if img:
-                self._banner_cache[key] = img
+        """Set a single banner label from the cache, or show the title while it is decoded."""
+        key = (filename, BANNER_HEIGHT)
+        img = self._cached_banner(filename)
         if img:
             label.configure(image=img, text="")
             label.image = img
-        else:
-            label.configure(image="", text=title_text, anchor="w")
+            return
+        # placeholder: the page title, until the banner arrives (or for good
+        # if it cannot be loaded)
+        label.configure(image="", text=title_text, anchor="w", font=(None, 20, "bold"), fg=BTN_FG)
+        label.image = None
+        if key not in self._banner_cache:
+            self.request_banner(filename)
 
     def create_home(self, parent):
         parent.columnconfigure(0, weight=1)
@@ -470,7 +599,7 @@ class LauncherApp(tk.Tk):
                 messagebox.showerror("Not found", f"The selected file does not exist:\n{p}")
                 return
             try:
-                subprocess.Popen([p], cwd=os.path.dirname(p))
+                installer.launch(p)
             except Exception as e:
                 messagebox.showerror("Launch failed", f"Failed to launch the game: {e}")
 
@@ -519,29 +648,37 @@ class LauncherApp(tk.Tk):
             except Exception:
                 pass
 
-        def update_progress(value, text=None):
+        def on_progress_sample(sample):
+            show_progress_widget()
+            try:
+                progress['value'] = sample.percent
+            except Exception:
+                pass
+            status_lbl.config(text=sample.text())
+
+        def on_status(text, value):
             # ensure progress widgets are visible
-            def cb():
-                show_progress_widget()
+            show_progress_widget()
+            if value is not None:
                 try:
                     progress['value'] = value
                 except Exception:
                     pass
-                if text is not None:
-                    status_lbl.config(text=text)
-            self.after(0, cb)
-
-        def on_download_click(url, default_folder_name, expected_exe_name):
-            # When running as a PyInstaller one-file executable, APP_DIR
-            # points to the temporary extraction folder which is ephemeral.
-            # In that case prefer a persistent location under the user's
-            # Documents folder. Otherwise use the repository/app dir so
-            # running from source keeps installs next to the app.
-            if getattr(sys, 'frozen', False):
-                base_install_dir = os.path.join(os.path.expanduser("~"), "Documents", "MCSM-Launcher")
-            else:
-                base_install_dir = APP_DIR
-            default_dir = os.path.join(base_install_dir, default_folder_name)
+            status_lbl.config(text=text)
+
+        # Workers report on this page's channel (the config key)
+        self.events.subscribe(config_key, on_progress_sample, on_status)
+
+        def update_progress(value, text=None):
+            self.events.status(config_key, text if text is not None else "", value)
+        season = installer.season_for_key(config_key)
+        dl_url = season['url']
+        mirrors_key = season['mirrors_key']
+        expected_exe = season['exe']
+
+        def on_download_click():
+            mirrors = list(self.config.get(mirrors_key) or [])
+            default_dir = installer.default_install_dir(season)
             use_default = messagebox.askyesno("Install location",
                                               f"Default install folder will be:\n{default_dir}\n\nUse this location?\n(Choose No to select a different folder)")
             if use_default:
@@ -559,266 +696,211 @@ class LauncherApp(tk.Tk):
 
             def download_worker():
                 try:
-                    # Try to use a multi-threaded ranged download when possible.
-                    tmp_fd, tmp_path = tempfile.mkstemp(suffix='.zip')
-                    os.close(tmp_fd)
+                    def on_progress(done, total):
+                        # coalesced by the event bus; cheap enough to call per read
+                        self.events.progress(config_key, done, total, "Downloading")
 
-                    # First attempt a HEAD request to get content length and range support
-                    total = None
-                    accept_ranges = False
                     try:
-                        head_req = urllib.request.Request(url, method='HEAD')
-                        with urllib.request.urlopen(head_req, timeout=15) as head_resp:
-                            total_hdr = head_resp.getheader('Content-Length')
-                            if total_hdr:
-                                total = int(total_hdr)
-                            ar = head_resp.getheader('Accept-Ranges')
-                            if ar and 'bytes' in ar.lower():
-                                accept_ranges = True
-                    except Exception:
-                        # HEAD might fail; we'll attempt a ranged GET or fallback later
-                        pass
-
-                    # If server accepts ranges and file is reasonably large, download in parallel
-                    if accept_ranges and total and total > 256 * 1024:
-                        # Choose number of threads based on size, cap at 10
-                        max_threads = 10
-                        part_size = max(256 * 1024, total // max_threads)
-                        parts = []
-                        ranges = []
-                        start = 0
-                        while start < total:
-                            end = min(total - 1, start + part_size - 1)
-                            ranges.append((start, end))
-                            start = end + 1
-
-                        downloaded_lock = threading.Lock()
-                        downloaded_total = 0
-                        part_paths = [f"{tmp_path}.part{i}" for i in range(len(ranges))]
-
-                        def fetch_part(idx, byte_range, out_path):
-                            nonlocal downloaded_total
-                            start_b, end_b = byte_range
-                            req = urllib.request.Request(url)
-                            req.add_header('Range', f'bytes={start_b}-{end_b}')
-                            try:
-                                with urllib.request.urlopen(req, timeout=60) as resp:
-                                    with open(out_path, 'wb') as outf:
-                                        while True:
-                                            chunk = resp.read(16384)
-                                            if not chunk:
-                                                break
-                                            outf.write(chunk)
-                                            with downloaded_lock:
-                                                downloaded_total += len(chunk)
-                                                if total:
-                                                    pct = int(downloaded_total * 100 / total)
-                                                    update_progress(pct, f"Downloading... {pct}%")
-                                                else:
-                                                    update_progress(0, f"Downloading... {downloaded_total // 1024} KB")
-                            except Exception:
-                                # Any exception will be handled by the caller
-                                raise
-
-                        threads = []
-                        error_during = False
-                        try:
-                            for i, r in enumerate(ranges):
-                                t = threading.Thread(target=fetch_part, args=(i, r, part_paths[i]), daemon=True)
-                                threads.append(t)
-                                t.start()
-
-                            # wait for threads
-                            for t in threads:
-                                t.join()
-                        except Exception:
-                            error_during = True
-
-                        if not error_during:
-                            # concatenate parts
-                            with open(tmp_path, 'wb') as final_out:
-                                for p in part_paths:
-                                    with open(p, 'rb') as pf:
-                                        shutil.copyfileobj(pf, final_out)
-                                    try:
-                                        os.remove(p)
-                                    except Exception:
-                                        pass
-                            update_progress(100, "Download complete — extracting...")
-                        else:
-                            # Clean partial files and fall back to single-stream
-                            for p in part_paths:
-                                try:
-                                    os.remove(p)
-                                except Exception:
-                                    pass
-                            raise Exception("Parallel download failed, falling back")
-                    else:
-                        # Single-threaded download (fallback)
-                        req = urllib.request.urlopen(url, timeout=60)
-                        total_hdr = req.getheader('Content-Length')
-                        if total_hdr:
-                            total = int(total_hdr)
-                        chunk_size = 16384
-                        downloaded = 0
-                        with open(tmp_path, 'wb') as out:
-                            while True:
-                                chunk = req.read(chunk_size)
-                                if not chunk:
-                                    break
-                                out.write(chunk)
-                                downloaded += len(chunk)
-                                if total:
-                                    pct = int(downloaded * 100 / total)
-                                    update_progress(pct, f"Downloading... {pct}%")
-                                else:
-                                    update_progress(0, f"Downloading... {downloaded // 1024} KB")
-
-                        update_progress(100, "Download complete — extracting...")
-
-                    try:
-                        with zipfile.ZipFile(tmp_path, 'r') as z:
-                            z.extractall(target_dir)
-                    except zipfile.BadZipFile:
-                        update_progress(0, "Downloaded file is not a valid zip")
-                        os.remove(tmp_path)
+                        found = installer.install_season(season, target_dir, self.archive_cache, mirrors,
+                                                         progress=on_progress,
+                                                         status=lambda text, value=None: update_progress(value, text),
+                                                         extract_progress=lambda done, total: self.events.progress(
+                                                             config_key, done, total, "Extracting"))
+                    except downloader.RemoteChangedError:
+                        update_progress(0, "Remote file changed — partial download discarded")
+                        self.events.dialog("showerror", "Error", "The archive changed on the server while downloading. "
+                                                                 "The partial download was discarded; please try again.")
+                        self.events.call(self.after, 700, hide_progress_widget)
+                        return
+                    except downloader.DownloadError as e:
+                        update_progress(0, "Download interrupted — click Download again to resume")
+                        self.events.dialog("showerror", "Error", f"Download failed: {e}")
+                        self.events.call(self.after, 700, hide_progress_widget)
+                        return
+                    except installer.InstallError as e:
+                        update_progress(0, str(e))
                         return
-
-                    os.remove(tmp_path)
-                    update_progress(100, "Extract complete — scanning for executable...")
-
-                    # Some season zips contain nested folders. For Season 2 the build
-                    # often ends up under a nested path such as:
-                    # "S2\Minecraft.Story.Mode.Season.Two\Minecraft Story Mode Season Two"
-                    # or similar variations. Detect a likely 'Season Two' folder and
-                    # move its contents up into target_dir so the game files aren't
-                    # buried several folder levels deep.
-                    try:
-                        if config_key == 'season2_path':
-                            # First, handle the precise nested layout you reported:
-                            # S2\Minecraft.Story.Mode.Season.Two\Minecraft Story Mode Season Two
-                            precise_candidate = None
-                            for root, dirs, files in os.walk(target_dir):
-                                parts = os.path.normpath(root).split(os.path.sep)
-                                if len(parts) >= 3:
-                                    tail3 = [p.lower() for p in parts[-3:]]
-                                    if tail3 == ['s2', 'minecraft.story.mode.season.two', 'minecraft story mode season two']:
-                                        precise_candidate = root
-                                        break
-
-                            if precise_candidate and os.path.isdir(precise_candidate):
-                                # Find the nearest ancestor named 'S2' (case-insensitive)
-                                dest = None
-                                p = precise_candidate
-                                while True:
-                                    parent = os.path.dirname(p)
-                                    if not parent or os.path.normpath(parent) == os.path.normpath(p):
-                                        break
-                                    if os.path.basename(parent).lower() == 's2':
-                                        dest = parent
-                                        break
-                                    p = parent
-                                if dest is None:
-                                    # fallback to target_dir
-                                    dest = target_dir
-
-                                # Move everything from the deepest folder into the S2 dest
-                                for name in os.listdir(precise_candidate):
-                                    src = os.path.join(precise_candidate, name)
-                                    dst = os.path.join(dest, name)
-                                    try:
-                                        if os.path.exists(dst):
-                                            if os.path.isdir(dst):
-                                                shutil.rmtree(dst)
-                                            else:
-                                                os.remove(dst)
-                                        shutil.move(src, dst)
-                                    except Exception:
-                                        pass
-                                try:
-                                    shutil.rmtree(precise_candidate, ignore_errors=True)
-                                except Exception:
-                                    pass
-                            else:
-                                # Fallback: try flexible matching if the precise pattern wasn't found
-                                candidate = None
-                                matches = []
-                                for root, dirs, files in os.walk(target_dir):
-                                    base = os.path.basename(root).lower()
-                                    if 'season' in base and 'two' in base and 'story' in base:
-                                        matches.append(root)
-                                if not matches:
-                                    for root, dirs, files in os.walk(target_dir):
-                                        base = os.path.basename(root).lower()
-                                        if 'minecraft.story.mode' in base or 'minecraft.story.mode.season.two' in base or 'minecraft.st' in base:
-                                            matches.append(root)
-                                if matches:
-                                    candidate = max(matches, key=lambda p: len(p.split(os.path.sep)))
-                                    if candidate and os.path.isdir(candidate) and os.path.normpath(candidate) != os.path.normpath(target_dir):
-                                        for name in os.listdir(candidate):
-                                            src = os.path.join(candidate, name)
-                                            dst = os.path.join(target_dir, name)
-                                            try:
-                                                if os.path.exists(dst):
-                                                    if os.path.isdir(dst):
-                                                        shutil.rmtree(dst)
-                                                    else:
-                                                        os.remove(dst)
-                                                shutil.move(src, dst)
-                                            except Exception:
-                                                pass
-                                        try:
-                                            shutil.rmtree(candidate, ignore_errors=True)
-                                        except Exception:
-                                            pass
-                    except Exception:
-                        # non-fatal: continue to normal scan even if moving failed
-                        pass
-
-                    found = None
-                    for root, dirs, files in os.walk(target_dir):
-                        for f in files:
-                            if f.lower() == expected_exe_name.lower():
-                                found = os.path.join(root, f)
-                                break
-                        if found:
-                            break
 
                     if found:
-                        self.config[config_key] = found
-                        self.save_config()
                         update_progress(100, f"Installed and found: {os.path.basename(found)}")
                         def set_entry():
+                            self.config[config_key] = found
+                            self.save_config()
                             entry.delete(0, tk.END)
                             entry.insert(0, found)
-                        self.after(0, set_entry)
-                        messagebox.showinfo("Install complete", f"Installed to {target_dir}\nFound: {found}")
+                        self.events.call(set_entry)
+                        self.events.dialog("showinfo", "Install complete", f"Installed to {target_dir}\nFound: {found}")
                     else:
                         update_progress(0, "Install complete — executable not found.")
-                        messagebox.showwarning("Install finished", f"Extracted to {target_dir} but did not find {expected_exe_name}")
+                        self.events.dialog("showwarning", "Install finished", f"Extracted to {target_dir} but did not find {expected_exe}")
 
                     # hide progress widgets after a short delay
-                    self.after(700, hide_progress_widget)
+                    self.events.call(self.after, 700, hide_progress_widget)
 
                 except Exception as e:
                     update_progress(0, "Error during download/install")
-                    messagebox.showerror("Error", f"Download/install failed: {e}")
-                    self.after(700, hide_progress_widget)
+                    self.events.dialog("showerror", "Error", f"Download/install failed: {e}")
+                    self.events.call(self.after, 700, hide_progress_widget)
 
             t = threading.Thread(target=download_worker, daemon=True)
             t.start()
 
-        if config_key == 'season1_path':
-            dl_url = 'https://archive.org/download/minecraft-story-mode-s1-2/Minecraft%20Story%20Mode%20S1.zip'
-            expected_exe = 'MinecraftStoryMode.exe'
-            default_name = 'S1'
-        else:
-            dl_url = 'https://archive.org/download/minecraft-story-mode-s1-2/Minecraft%20Story%20Mode%20S2.zip'
-            expected_exe = 'Minecraft2.exe'
-            default_name = 'S2'
+        def on_preseed_click():
+            # Let a zip that was downloaded some other way stand in for the
+            # download: it is copied into the archive cache, and the next
+            # install of this season is served from there
+            p = filedialog.askopenfilename(title=f"Select an existing {title_text} zip", initialdir=os.path.expanduser("~"),
+                                           filetypes=[("Zip files", "*.zip"), ("All files", "*")])
+            if not p:
+                return
+            update_progress(0, "Adding archive to the local cache...")
 
-        dl_btn = tk.Button(dl_frame, text='Download from archive.org', command=lambda: on_download_click(dl_url, default_name, expected_exe), bg=BTN_BG, fg=BTN_FG, activebackground=BTN_ACTIVE)
-        dl_btn.pack(anchor=tk.W, pady=(6, 0))
+            def preseed_worker():
+                try:
+                    info = downloader.probe(dl_url)
+                    self.archive_cache.preseed(p, dl_url, info if info['total'] else None)
+                    update_progress(100, "Archive cached — Download will now install from it.")
+                    self.events.dialog("showinfo", "Archive cached",
+                                       f"{os.path.basename(p)} was added to the local cache.\n"
+                                       "Use 'Download from archive.org' to install from it without downloading.")
+                except Exception as e:
+                    update_progress(0, "Could not cache the archive")
+                    self.events.dialog("showerror", "Error", f"Could not use that zip: {e}")
+                self.events.call(self.after, 700, hide_progress_widget)
+
+            threading.Thread(target=preseed_worker, daemon=True).start()
+
+        def on_verify_click():
+            # Compare the installed files against the sizes and CRCs in the
+            # archive's central directory and re-fetch only what is broken
+            exe_path = var.get().strip()
+            if not exe_path:
+                messagebox.showwarning("No path", "Please select the executable path first.")
+                return
+            update_progress(0, "Reading archive index...")
+
+            def verify_worker():
+                archive = None
+                try:
+                    info = downloader.probe(dl_url)
+                    if not info['total']:
+                        info = None
+                    manifest = integrity.load_manifest(dl_url, MANIFEST_PATHS)
+                    archive = installer.open_archive(dl_url, self.archive_cache, info, manifest)
+                    # With an install manifest only files whose size or mtime
+                    # changed since the install need their contents checked
+                    infos = archive.infolist()
+                    install = installer.find_install(exe_path)
+                    root = installer.install_root(infos, season, exe_path, install)
+                    pairs = installer.member_paths(infos, root, season.get('layout', ()))
+                    checked = pairs
+                    if install is not None:
+                        checked = installer.changed_pairs(pairs, install)
+                        if not checked:
+                            if not self.events.ask("askyesno", "No changes found",
+                                                   f"None of the {len(pairs)} installed files changed since the install.\n\n"
+                                                   "Compare every file with the archive anyway?"):
+                                update_progress(100, "No changes since install.")
+                                return
+                            checked = pairs
+
+                    def on_check(done, total):
+                        self.events.progress(config_key, done, total, "Verifying")
+
+                    problems = installer.verify_install(checked, progress=on_check)
+                    if install is not None:
+                        damaged = {p for _, p, _ in problems}
+                        installer.record_files(install, [p for _, p in checked if p not in damaged])
+                    if not problems:
+                        update_progress(100, f"All {len(pairs)} files are intact.")
+                        self.events.dialog("showinfo", "Verify complete", f"All {len(pairs)} installed files match the archive.")
+                        return
+                    names = "\n".join(os.path.relpath(p, root) + f" ({why})" for _, p, why in problems[:10])
+                    if len(problems) > 10:
+                        names += f"\n…and {len(problems) - 10} more"
+                    size = events.format_size(sum(i.file_size for i, _, _ in problems))
+                    update_progress(0, f"{len(problems)} file(s) missing or damaged")
+                    if not self.events.ask("askyesno", "Repair install?",
+                                           f"{len(problems)} file(s) are missing or damaged:\n\n{names}\n\n"
+                                           f"Re-fetch them ({size})?"):
+                        return
+
+                    def on_repair(done, total):
+                        self.events.progress(config_key, done, total, "Repairing")
+
+                    fixed = installer.repair_install(archive, problems, root, progress=on_repair)
+                    if install is not None:
+                        installer.record_files(install, [p for _, p, _ in problems])
+                    update_progress(100, f"Repaired {fixed} file(s).")
+                    self.events.dialog("showinfo", "Repair complete", f"Repaired {fixed} file(s).")
+                except Exception as e:
+                    update_progress(0, "Verify/repair failed")
+                    self.events.dialog("showerror", "Error", f"Verify/repair failed: {e}")
+                finally:
+                    if archive is not None:
+                        try:
+                            archive.close()
+                        except Exception:
+                            pass
+                    self.events.call(self.after, 700, hide_progress_widget)
+
+            threading.Thread(target=verify_worker, daemon=True).start()
+
+        def on_uninstall_click():
+            # Only installs made by the launcher have a file list, so only
+            # those files are removed (never anything the user added)
+            install = installer.find_install(var.get().strip())
+            if install is None:
+                messagebox.showinfo("Uninstall", "No install record was found next to the selected executable.\n"
+                                                 "Only installs made by this launcher can be removed here.")
+                return
+            if not messagebox.askyesno("Uninstall",
+                                       f"Remove {len(install.files)} files ({events.format_size(install.disk_usage())}) from\n"
+                                       f"{install.root}?\n\nSave games are not affected."):
+                return
+
+            def uninstall_worker():
+                try:
+                    exe_path = install.exe_path()
+                    removed, failed = install.uninstall(progress=lambda i, total: self.events.progress(
+                        config_key, i, total, "Removing", unit='files'))
+
+                    def clear_entry():
+                        self.config[config_key] = ""
+                        self.save_config()
+                        entry.delete(0, tk.END)
+                    if not (exe_path and os.path.exists(exe_path)):
+                        self.events.call(clear_entry)
+                    if failed:
+                        update_progress(0, f"Removed {removed} files, {len(failed)} could not be removed")
+                        listing = "\n".join(f"{name}: {message}" for name, message in failed[:10])
+                        more = f"\n…and {len(failed) - 10} more" if len(failed) > 10 else ""
+                        self.events.dialog("showwarning", "Uninstall",
+                                           f"{len(failed)} files could not be removed (is the game still running?):\n\n"
+                                           f"{listing}{more}\n\nRun Uninstall again to remove them.")
+                    else:
+                        update_progress(100, f"Removed {removed} files.")
+                except Exception as e:
+                    update_progress(0, "Uninstall failed")
+                    self.events.dialog("showerror", "Error", f"Uninstall failed: {e}")
+                self.events.call(self.after, 700, hide_progress_widget)
+
+            threading.Thread(target=uninstall_worker, daemon=True).start()
+
+        dl_btns = tk.Frame(dl_frame, bg=BG_COLOR)
+        dl_btns.pack(anchor=tk.W, pady=(6, 0))
+
+        dl_btn = tk.Button(dl_btns, text='Download from archive.org', command=on_download_click, bg=BTN_BG, fg=BTN_FG, activebackground=BTN_ACTIVE)
+        dl_btn.pack(side=tk.LEFT)
+
+        preseed_btn = tk.Button(dl_btns, text='Use existing zip…', command=on_preseed_click, bg=BTN_BG, fg=BTN_FG, activebackground=BTN_ACTIVE)
+        preseed_btn.pack(side=tk.LEFT, padx=(8, 0))
+
+        verify_btn = tk.Button(dl_btns, text='Verify / Repair', command=on_verify_click, bg=BTN_BG, fg=BTN_FG, activebackground=BTN_ACTIVE)
+        verify_btn.pack(side=tk.LEFT, padx=(8, 0))
+
+        uninstall_btn = tk.Button(dl_btns, text='Uninstall', command=on_uninstall_click, bg=BTN_BG, fg=BTN_FG, activebackground=BTN_ACTIVE)
+        uninstall_btn.pack(side=tk.LEFT, padx=(8, 0))
 
     def create_saves_page(self, parent):
         parent.columnconfigure(0, weight=1)
@@ -850,6 +932,7 @@ class LauncherApp(tk.Tk):
                     try:
                         self.config[config_key] = d
                         self.save_config()
+                        self.update_save_watchers()
                     except Exception:
                         pass
 
@@ -862,6 +945,7 @@ class LauncherApp(tk.Tk):
                 try:
                     self.config[config_key] = saves_dir
                     self.save_config()
+                    self.update_save_watchers()
                 except Exception:
                     pass
 
@@ -873,52 +957,41 @@ class LauncherApp(tk.Tk):
             status = tk.Label(frame, text="", bg=BG_COLOR, fg=BTN_FG)
             status.grid(row=2, column=0, columnspan=4, sticky=tk.W)
 
-            def find_save_files():
-                """Return list of tuples (fullpath, relpath) for all files under the saves folder."""
-                directory = path_var.get()
-                if not os.path.isdir(directory):
-                    return []
-                found = []
-                try:
-                    for root, dirs, files in os.walk(directory):
-                        for name in files:
-                            full = os.path.join(root, name)
-                            rel = os.path.relpath(full, start=directory)
-                            found.append((full, rel))
-                except Exception:
-                    pass
-                return found
+            # Backup/import workers report through the event bus on this channel
+            self.events.subscribe(config_key,
+                                  lambda sample: status.config(text=sample.text()),
+                                  lambda text, _value: status.config(text=text))
 
-            def backup_action():
-                files = find_save_files()
-                if not files:
-                    messagebox.showinfo("No saves", f"No save files found in {path_var.get()}")
-                    return
+            def set_status(text):
+                self.events.status(config_key, text)
 
-                default_name = f"{season_name.replace(' ', '_')}_saves_backup.zip"
-                dest = filedialog.asksaveasfilename(title="Save backup as", defaultextension=".zip", initialfile=default_name, initialdir=APP_DIR, filetypes=[("Zip files","*.zip")])
-                if not dest:
-                    return
+            store = self.snapshot_store
 
-                status.config(text="Backing up saves...")
+            def backup_action():
+                saves_dir = path_var.get()
+                status.config(text="Taking snapshot...")
 
                 def worker():
                     try:
-                        total = len(files)
-                        with zipfile.ZipFile(dest, 'w', zipfile.ZIP_DEFLATED) as z:
-                            for i, (full, rel) in enumerate(files, start=1):
-                                # store with relative path so folder structure is preserved
-                                z.write(full, arcname=rel)
-                                pct = int(i * 100 / total)
-                                self.after(0, lambda p=pct, t=f"Backing up... {pct}%": status.config(text=t))
-                        self.after(0, lambda: status.config(text=f"Backup complete: {dest}"))
-                        messagebox.showinfo("Backup complete", f"Saved backup to {dest}")
+                        snap, stats = store.snapshot(config_key, saves_dir, progress=lambda i, total: self.events.progress(
+                            config_key, i, total, "Snapshotting", unit='files'))
+                        if not stats['files']:
+                            set_status("")
+                            self.events.dialog("showinfo", "No saves", f"No save files found in {saves_dir}")
+                        elif stats['unchanged']:
+                            set_status(f"Saves unchanged since snapshot {snap.id}")
+                        else:
+                            set_status(f"Snapshot {snap.id}: {stats['files']} files, {stats['stored']} new "
+                                       f"({events.format_size(stats['stored_bytes'])} stored)")
                     except Exception as e:
-                        self.after(0, lambda: status.config(text="Backup failed"))
-                        messagebox.showerror("Error", f"Backup failed: {e}")
+                        set_status("Snapshot failed")
+                        self.events.dialog("showerror", "Error", f"Snapshot failed: {e}")
 
                 threading.Thread(target=worker, daemon=True).start()
 
+            def snapshots_action():
+                self.open_snapshots_window(season_name, config_key, store, path_var.get, set_status)
+
             def import_action():
                 zippath = filedialog.askopenfilename(title="Select backup zip", initialdir=APP_DIR, filetypes=[("Zip files","*.zip" )])
                 if not zippath:
@@ -927,102 +1000,221 @@ class LauncherApp(tk.Tk):
 
                 def worker():
                     try:
-                        tmpdir = tempfile.mkdtemp()
+                        saves_dir = path_var.get()
+
+                        def confirm(overwrites):
+                            # show a limited list to avoid giant dialogs
+                            display_list = "\n".join(overwrites[:50])
+                            if len(overwrites) > 50:
+                                display_list += f"\n... and {len(overwrites)-50} more"
+                            msg = (
+                                f"The following save files already exist and will be overwritten in:\n{saves_dir}\n\n"
+                                f"{display_list}\n\nProceed and overwrite these files?"
+                            )
+                            # the bus shows the dialog on the main thread and waits for the user's decision
+                            return self.events.ask("askyesno", "Overwrite existing saves?", msg)
+
                         try:
-                            with zipfile.ZipFile(zippath, 'r') as z:
-                                z.extractall(tmpdir)
+                            result = saves.import_saves(zippath, saves_dir, confirm, progress=lambda copied, total: self.events.progress(
+                                config_key, copied, total, "Importing", unit='files'))
                         except zipfile.BadZipFile:
-                            self.after(0, lambda: messagebox.showerror("Error", "Selected file is not a valid zip"))
-                            shutil.rmtree(tmpdir, ignore_errors=True)
-                            self.after(0, lambda: status.config(text=""))
+                            self.events.dialog("showerror", "Error", "Selected file is not a valid zip")
+                            set_status("")
                             return
 
-                        # collect all files extracted from the zip and their relative paths
-                        found_files = []
-                        for root, dirs, files in os.walk(tmpdir):
-                            for name in files:
-                                full = os.path.join(root, name)
-                                rel = os.path.relpath(full, start=tmpdir)
-                                found_files.append((full, rel))
-
-                        if not found_files:
-                            shutil.rmtree(tmpdir, ignore_errors=True)
-                            self.after(0, lambda: status.config(text="No files found in the zip."))
-                            self.after(0, lambda: messagebox.showwarning("No files", "No files were found in the selected zip"))
+                        if result is None:
+                            set_status("Import cancelled by user.")
                             return
-
-                        os.makedirs(path_var.get(), exist_ok=True)
-
-                        # Detect files that would be overwritten (by relative path)
-                        overwrites = []
-                        for full, rel in found_files:
-                            dst = os.path.join(path_var.get(), rel)
-                            if os.path.exists(dst):
-                                overwrites.append(rel)
-                        # If there are existing files, ask the user on the main thread whether to overwrite
-                        if overwrites:
-                            evt = threading.Event()
-                            result = {"allow": False}
-
-                            def ask_overwrite():
-                                # show a limited list to avoid giant dialogs
-                                display_list = "\n".join(overwrites[:50])
-                                if len(overwrites) > 50:
-                                    display_list += f"\n... and {len(overwrites)-50} more"
-                                msg = (
-                                    f"The following save files already exist and will be overwritten in:\n{path_var.get()}\n\n"
-                                    f"{display_list}\n\nProceed and overwrite these files?"
-                                )
-                                allow = messagebox.askyesno("Overwrite existing saves?", msg)
-                                result["allow"] = bool(allow)
-                                evt.set()
-
-                            # schedule the dialog on the main thread and wait for the user's decision
-                            self.after(0, ask_overwrite)
-                            evt.wait()
-                            if not result.get("allow"):
-                                shutil.rmtree(tmpdir, ignore_errors=True)
-                                self.after(0, lambda: status.config(text="Import cancelled by user."))
-                                return
-
-                        # Perform the copy (this will overwrite any existing files if the user allowed it)
-                        copied = 0
-                        for full, rel in found_files:
-                            try:
-                                dst = os.path.join(path_var.get(), rel)
-                                dst_dir = os.path.dirname(dst)
-                                if not os.path.isdir(dst_dir):
-                                    os.makedirs(dst_dir, exist_ok=True)
-                                shutil.copy2(full, dst)
-                                copied += 1
-                                # update status occasionally
-                                if copied % 10 == 0:
-                                    self.after(0, lambda c=copied: status.config(text=f"Imported {c} files..."))
-                            except Exception:
-                                # skip individual copy errors
-                                pass
-
-                        shutil.rmtree(tmpdir, ignore_errors=True)
-                        if copied:
-                            self.after(0, lambda: status.config(text=f"Imported {copied} save files."))
-                            self.after(0, lambda: messagebox.showinfo("Import complete", f"Imported {copied} save files to {saves_dir}"))
+                        copied, skipped, found = result
+                        same = f" ({skipped} already up to date)" if skipped else ""
+                        if not found:
+                            set_status("No files found in the zip.")
+                            self.events.dialog("showwarning", "No files", "No files were found in the selected zip")
+                        elif copied:
+                            set_status(f"Imported {copied} save files{same}. \"Undo import\" puts the old saves back.")
+                            self.events.dialog("showinfo", "Import complete", f"Imported {copied} save files to {saves_dir}{same}")
+                        elif skipped == found:
+                            set_status("Saves already match the zip; nothing to import.")
                         else:
-                            self.after(0, lambda: status.config(text="No save files were imported."))
-                            self.after(0, lambda: messagebox.showwarning("No saves", "No save files were imported from the zip"))
+                            set_status("No save files were imported.")
+                            self.events.dialog("showwarning", "No saves", "No save files were imported from the zip")
                     except Exception as e:
-                        self.after(0, lambda: status.config(text="Import failed"))
-                        self.after(0, lambda: messagebox.showerror("Error", f"Import failed: {e}"))
+                        set_status("Import failed")
+                        self.events.dialog("showerror", "Error", f"Import failed: {e}")
 
                 threading.Thread(target=worker, daemon=True).start()
 
-            btn_backup = tk.Button(frame, text="Backup saves (zip)", command=backup_action, bg=BTN_BG, fg=BTN_FG, activebackground=BTN_ACTIVE)
+            def undo_import_action():
+                saves_dir = path_var.get()
+                if not messagebox.askyesno("Undo import?", f"Put back the saves the last import replaced in\n{saves_dir}?"):
+                    return
+                try:
+                    count = saves.undo_last_import(saves_dir)
+                except Exception as e:
+                    messagebox.showerror("Error", f"Undo failed: {e}")
+                    return
+                if count is None:
+                    messagebox.showinfo("Nothing to undo", "There is no import to undo for this folder.")
+                else:
+                    set_status(f"Import undone ({count} files restored or removed).")
+
+            btn_backup = tk.Button(frame, text="Snapshot saves", command=backup_action, bg=BTN_BG, fg=BTN_FG, activebackground=BTN_ACTIVE)
             btn_backup.grid(row=0, column=3, sticky=tk.E)
 
+            btn_snapshots = tk.Button(frame, text="Snapshots…", command=snapshots_action, bg=BTN_BG, fg=BTN_FG, activebackground=BTN_ACTIVE)
+            btn_snapshots.grid(row=0, column=4, sticky=tk.E, padx=(8, 0))
+
             btn_import = tk.Button(frame, text="Import saves (zip)", command=import_action, bg=BTN_BG, fg=BTN_FG, activebackground=BTN_ACTIVE)
             btn_import.grid(row=1, column=3, sticky=tk.E)
 
-        make_season_block(2, "Season 1", S1_SAVES_DIR, "s1_saves")
-        make_season_block(4, "Season 2", S2_SAVES_DIR, "s2_saves")
+            btn_undo = tk.Button(frame, text="Undo import", command=undo_import_action, bg=BTN_BG, fg=BTN_FG, activebackground=BTN_ACTIVE)
+            btn_undo.grid(row=1, column=4, sticky=tk.E, padx=(8, 0))
+
+        for row, season in ((2, SEASONS[1]), (4, SEASONS[2])):
+            make_season_block(row, season['title'], season['saves_dir'], season['saves_key'])
+
+        auto_var = tk.BooleanVar(value=bool(self.config.get('auto_snapshots')))
+
+        def toggle_auto():
+            self.config['auto_snapshots'] = auto_var.get()
+            self.save_config()
+            self.update_save_watchers()
+
+        auto_chk = tk.Checkbutton(parent, text="Take snapshots automatically when the game saves",
+                                  variable=auto_var, command=toggle_auto, bg=BG_COLOR, fg=BTN_FG,
+                                  selectcolor=SIDEBAR_BG, activebackground=BG_COLOR, activeforeground=BTN_FG)
+        auto_chk.grid(row=6, column=0, sticky=tk.W, padx=6, pady=(12, 0))
+
+    def open_snapshots_window(self, season_name, config_key, store, get_saves_dir, set_status):
+        """List a season's save snapshots with restore, export and delete actions."""
+        win = tk.Toplevel(self, bg=BG_COLOR, padx=8, pady=8)
+        win.title(f"{season_name} save snapshots")
+        win.transient(self)
+
+        listbox = tk.Listbox(win, width=64, height=12, bg=SIDEBAR_BG, fg=BTN_FG, selectbackground=BTN_ACTIVE)
+        listbox.pack(fill=tk.BOTH, expand=True)
+        shown = []
+
+        def refresh():
+            shown[:] = store.list(config_key)
+            listbox.delete(0, tk.END)
+            for snap in shown:
+                kind = "  (automatic)" if snap.auto else ""
+                listbox.insert(tk.END, f"{snap.id}    {len(snap.files)} files, {events.format_size(snap.total_bytes())}{kind}")
+            if not shown:
+                listbox.insert(tk.END, "No snapshots yet — use \"Snapshot saves\" first.")
+
+        def selected():
+            sel = listbox.curselection()
+            if not sel or sel[0] >= len(shown):
+                messagebox.showinfo("No snapshot selected", "Select a snapshot first.", parent=win)
+                return None
+            return shown[sel[0]]
+
+        def restore():
+            snap = selected()
+            if snap is None:
+                return
+            saves_dir = get_saves_dir()
+            if not messagebox.askyesno("Restore snapshot?", f"Restore snapshot {snap.id} into\n{saves_dir}?", parent=win):
+                return
+
+            def worker():
+                try:
+                    def confirm(overwrites):
+                        display_list = "\n".join(overwrites[:50])
+                        if len(overwrites) > 50:
+                            display_list += f"\n... and {len(overwrites)-50} more"
+                        return self.events.ask("askyesno", "Overwrite existing saves?",
+                                               f"These save files will be replaced:\n\n{display_list}\n\nProceed?")
+
+                    restored = store.restore(snap, saves_dir, confirm, progress=lambda i, total: self.events.progress(
+                        config_key, i, total, "Restoring", unit='files'))
+                    if restored is None:
+                        set_status("Restore cancelled by user.")
+                    else:
+                        set_status(f"Restored {restored} files from snapshot {snap.id}.")
+                except Exception as e:
+                    set_status("Restore failed")
+                    self.events.dialog("showerror", "Error", f"Restore failed: {e}")
+
+            threading.Thread(target=worker, daemon=True).start()
+
+        def export():
+            snap = selected()
+            if snap is None:
+                return
+            default_name = f"{season_name.replace(' ', '_')}_saves_{snap.id}.zip"
+            dest = filedialog.asksaveasfilename(parent=win, title="Export snapshot as", defaultextension=".zip", initialfile=default_name, initialdir=APP_DIR, filetypes=[("Zip files","*.zip")])
+            if not dest:
+                return
+
+            def worker():
+                try:
+                    result = store.export_zip(snap, dest, preset=self.config.get('backup_preset') or zipwriter.DEFAULT_PRESET,
+                                              progress=lambda i, total: self.events.progress(
+                                                  config_key, i, total, "Exporting", unit='files'))
+                    set_status(f"Exported snapshot {snap.id} to {dest}")
+                    self.events.dialog("showinfo", "Export complete",
+                                       f"Saved {result.files} files to {dest}\n"
+                                       f"{events.format_size(result.file_bytes)} -> {events.format_size(result.compressed_bytes)} "
+                                       f"in {result.seconds:.1f}s ({result.preset})\n\n" + "\n".join(result.summary()))
+                except Exception as e:
+                    set_status("Export failed")
+                    self.events.dialog("showerror", "Error", f"Export failed: {e}")
+
+            threading.Thread(target=worker, daemon=True).start()
+
+        def delete():
+            snap = selected()
+            if snap is None:
+                return
+            if not messagebox.askyesno("Delete snapshot?", f"Delete snapshot {snap.id}?", parent=win):
+                return
+
+            # the save watcher holds the store lock while it snapshots, so
+            # waiting for it must not block the main loop
+            def worker():
+                try:
+                    set_status(f"Deleting snapshot {snap.id}...")
+                    freed = store.delete(snap)
+                    set_status(f"Deleted snapshot {snap.id} ({events.format_size(freed)} freed)")
+                except Exception as e:
+                    set_status("Delete failed")
+                    self.events.dialog("showerror", "Error", f"Delete failed: {e}")
+                self.events.call(lambda: win.winfo_exists() and refresh())
+
+            threading.Thread(target=worker, daemon=True).start()
+
+        btns = tk.Frame(win, bg=BG_COLOR)
+        btns.pack(anchor=tk.W, pady=(8, 0))
+        for text, cmd in (("Restore", restore), ("Export zip…", export), ("Delete", delete), ("Close", win.destroy)):
+            tk.Button(btns, text=text, command=cmd, bg=BTN_BG, fg=BTN_FG, activebackground=BTN_ACTIVE).pack(side=tk.LEFT, padx=(0, 8))
+
+        # compression preset for exports, shared with cli.py through backup_preset
+        preset_row = tk.Frame(win, bg=BG_COLOR)
+        preset_row.pack(anchor=tk.W, pady=(8, 0))
+        tk.Label(preset_row, text="Export compression:", bg=BG_COLOR, fg=BTN_FG).pack(side=tk.LEFT)
+        preset_var = tk.StringVar(value=self.config.get('backup_preset') or zipwriter.DEFAULT_PRESET)
+        preset_note = tk.Label(preset_row, text="", bg=BG_COLOR, fg=BTN_FG)
+
+        def choose_preset(value):
+            self.config['backup_preset'] = value
+            self.save_config()
+            show_preset_note()
+
+        def show_preset_note():
+            if preset_var.get() == 'max':
+                preset_note.config(text="bzip2/LZMA per file: open with 7-Zip, not Windows Explorer")
+            else:
+                preset_note.config(text="opens in any unzip tool")
+
+        preset_menu = tk.OptionMenu(preset_row, preset_var, *zipwriter.PRESETS, command=choose_preset)
+        preset_menu.config(bg=BTN_BG, fg=BTN_FG, activebackground=BTN_ACTIVE, highlightthickness=0)
+        preset_menu.pack(side=tk.LEFT, padx=(6, 8))
+        preset_note.pack(side=tk.LEFT)
+        show_preset_note()
+        refresh()
 
 
 if __name__ == "__main__":
@@ -6,7 +6,9 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('assets', 'assets')],
-    hiddenimports=[],
+    # imported on first use by launcher.py (LazyModule), so not found by analysis
+    hiddenimports=['tkinter.ttk', 'tkinter.filedialog', 'tkinter.messagebox', 'zipfile', 'webbrowser',
+                   'downloader', 'installer', 'integrity', 'saves', 'savewatch', 'snapshots'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
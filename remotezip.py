@@ -0,0 +1,354 @@
+"""Random access to a zip archive on an HTTP server that supports ranges.
+
+Only the end-of-central-directory record and the central directory are
+fetched when the archive is opened. Individual members can then be read,
+inflated and CRC-checked on demand, each costing one ranged request for just
+that member's bytes. This is what makes selective installs and repairing a
+single damaged file possible without downloading the whole season archive.
+
+The heavy lifting (ZIP64, compression methods, CRC checks, safe extraction
+paths) is left to the standard ``zipfile`` module, which reads the archive
+through ``HTTPRangeReader``, a seekable file object backed by range requests.
+The end records are fetched once up front and parsed here as well, for the
+central directory's offset, which ``zipfile`` does not expose publicly.
+"""
+import copy
+import io
+import struct
+import zipfile
+
+import downloader
+from httppool import ConnectionPool
+
+# Smallest ranged request issued for an unbounded read, so the handful of
+# tiny reads zipfile does around the end record share one request
+MIN_FETCH = 64 * 1024
+# Fetched when the archive is opened: the end record plus the longest
+# comment it can have, the zip64 locator and the zip64 end record
+TAIL_FETCH = 22 + 0xFFFF + 20 + 56
+
+_END_RECORD = struct.Struct('<4s4H2LH')
+_END_LOCATOR64 = struct.Struct('<4sLQL')
+_END_RECORD64 = struct.Struct('<4sQ2H2L4Q')
+
+
+class RemoteZipError(Exception):
+    """Raised when the remote archive cannot be read with range requests."""
+
+
+class HTTPRangeReader(io.RawIOBase):
+    """Read-only, seekable file object over an HTTP resource.
+
+    Reads are served from a streaming ranged response that stays open while
+    the caller keeps reading sequentially. ``set_window`` bounds the range
+    requested next, so reading a zip member asks for exactly its bytes.
+    """
+
+    def __init__(self, url, pool=None, info=None):
+        super().__init__()
+        self.url = url
+        self._own_pool = pool is None
+        self.pool = pool or ConnectionPool()
+        info = info or downloader.probe(url, self.pool)
+        if not info.get('accept_ranges') or not info.get('total'):
+            raise RemoteZipError(f"Server does not support range requests for {url}")
+        self.size = info['total']
+        self.info = info
+        etag = info.get('etag')
+        # Same rule as the download journal: strong ETag first, else the date
+        self._validator = etag if etag and not etag.startswith('W/') else info.get('last_modified')
+        self._pos = 0
+        self._stream = None
+        self._stream_pos = None
+        self._stream_end = None
+        self._window_end = None
+        # the last bytes of the file, kept by fetch_tail
+        self._tail = b''
+        self._tail_offset = self.size
+        self.requests = 0
+        self.bytes_fetched = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f"invalid whence ({whence})")
+        if pos < 0:
+            raise ValueError("negative seek position")
+        self._pos = pos
+        return pos
+
+    def set_window(self, end):
+        """Limit the next ranged request to end (exclusive) at ``end``; None clears it."""
+        self._window_end = end
+
+    def fetch_tail(self, length):
+        """Fetch the last ``length`` bytes in one request and serve later reads there from memory."""
+        start = max(0, self.size - length)
+        self.seek(start)
+        self.set_window(self.size)
+        try:
+            tail = self.read(self.size - start)
+        finally:
+            self.set_window(None)
+        self._tail, self._tail_offset = tail, start
+        return start, tail
+
+    def _close_stream(self):
+        if self._stream is not None:
+            self._stream.release()
+            self._stream = None
+
+    def _open_stream(self, pos, want):
+        self._close_stream()
+        if self._window_end is not None and self._window_end > pos:
+            end = self._window_end
+        else:
+            end = pos + max(want, MIN_FETCH)
+        end = min(end, self.size)
+        headers = {'Range': f'bytes={pos}-{end - 1}'}
+        if self._validator:
+            headers['If-Range'] = self._validator
+        resp = self.pool.request('GET', self.url, headers)
+        self.requests += 1
+        if resp.status == 200:
+            resp.release()
+            raise downloader.RemoteChangedError("The remote archive changed while it was being read")
+        if resp.status != 206:
+            resp.release()
+            raise RemoteZipError(f"Range request failed: HTTP {resp.status} {resp.reason}")
+        self._stream = resp
+        self._stream_pos = pos
+        self._stream_end = end
+
+    def readinto(self, b):
+        view = memoryview(b).cast('B')
+        want = min(len(view), max(0, self.size - self._pos))
+        if want == 0:
+            return 0
+        if self._pos >= self._tail_offset:
+            start = self._pos - self._tail_offset
+            view[:want] = self._tail[start:start + want]
+            self._pos += want
+            return want
+        if self._stream is None or self._stream_pos != self._pos or self._stream_pos >= self._stream_end:
+            self._open_stream(self._pos, want)
+        got = 0
+        while got < want and self._stream_pos < self._stream_end:
+            n = self._stream.readinto(view[got:min(want, got + self._stream_end - self._stream_pos)])
+            if not n:
+                self._close_stream()
+                raise RemoteZipError("Connection closed in the middle of a range")
+            got += n
+            self._stream_pos += n
+        self._pos += got
+        self.bytes_fetched += got
+        return got
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = max(0, self.size - self._pos)
+        buf = bytearray(size)
+        view = memoryview(buf)
+        got = 0
+        while got < size:
+            n = self.readinto(view[got:])
+            if not n:
+                break
+            got += n
+        return bytes(buf[:got])
+
+    def close(self):
+        if not self.closed:
+            self._close_stream()
+            if self._own_pool:
+                self.pool.close()
+        super().close()
+
+
+class RemoteZip:
+    """A remote zip archive whose members are fetched individually.
+
+    Example::
+
+        with RemoteZip(url) as rz:
+            for info in rz.infolist():
+                if info.filename.endswith('.exe'):
+                    rz.extract(info, target_dir)
+    """
+
+    def __init__(self, url, pool=None, info=None):
+        self.reader = HTTPRangeReader(url, pool, info)
+        try:
+            tail_offset, tail = self.reader.fetch_tail(TAIL_FETCH)
+            self.zip = zipfile.ZipFile(self.reader)
+            self.cd_start = _central_directory_start(self.reader, tail_offset, tail)
+        except zipfile.BadZipFile as e:
+            self.reader.close()
+            raise RemoteZipError(f"Remote file is not a valid zip: {e}")
+        except BaseException:
+            self.reader.close()
+            raise
+        # Each member's bytes end where the next local header (or the central
+        # directory) begins, which also covers any data descriptor
+        offsets = sorted({i.header_offset for i in self.zip.infolist()})
+        cd_start = self.cd_start
+        self._extent_end = {}
+        for idx, off in enumerate(offsets):
+            self._extent_end[off] = offsets[idx + 1] if idx + 1 < len(offsets) else cd_start
+
+    def infolist(self):
+        return self.zip.infolist()
+
+    def getinfo(self, name):
+        return self.zip.getinfo(name)
+
+    def member_extent(self, member):
+        """Return the (start, end) byte range holding ``member``'s header and data."""
+        info = member if isinstance(member, zipfile.ZipInfo) else self.zip.getinfo(member)
+        return info.header_offset, self._extent_end[info.header_offset]
+
+    def central_directory(self):
+        """Return ``(offset, data)``: the raw bytes from the central directory to the end of the file.
+
+        Together with member data downloaded elsewhere this is enough for
+        ``zipfile`` to open an archive that is still incomplete.
+        """
+        start = self.cd_start
+        self.reader.seek(start)
+        self.reader.set_window(self.reader.size)
+        try:
+            return start, self.reader.read(self.reader.size - start)
+        finally:
+            self.reader.set_window(None)
+
+    def open(self, member):
+        """Open a member for reading; its bytes are fetched with a single request.
+
+        The request is bounded to the member until the returned stream is
+        closed, so close it (or use it as a context manager) before reading
+        anything else from the archive.
+        """
+        info = member if isinstance(member, zipfile.ZipInfo) else self.zip.getinfo(member)
+        self.reader.set_window(self.member_extent(info)[1])
+        try:
+            return _MemberFile(self.zip.open(info), lambda: self.reader.set_window(None))
+        except BaseException:
+            self.reader.set_window(None)
+            raise
+
+    def read(self, member):
+        with self.open(member) as f:
+            return f.read()
+
+    def extract(self, member, path, arcname=None):
+        """Extract one member below ``path`` like ``ZipFile.extract`` and return its path.
+
+        ``arcname`` extracts the member under a different relative name.
+        """
+        info = member if isinstance(member, zipfile.ZipInfo) else self.zip.getinfo(member)
+        self.reader.set_window(self.member_extent(info)[1])
+        if arcname is not None and arcname != info.filename:
+            # zipfile checks the local header against orig_filename, so only
+            # the output name changes
+            info = copy.copy(info)
+            info.filename = arcname
+        try:
+            return self.zip.extract(info, path)
+        finally:
+            self.reader.set_window(None)
+
+    def extract_members(self, path, members=None, progress=None):
+        """Extract ``members`` (default: all) and return their output paths.
+
+        ``progress`` is called as ``progress(done_members, total_members)``.
+        """
+        members = list(members) if members is not None else self.zip.infolist()
+        # Sequential order keeps the reader's stream positions moving forward
+        members.sort(key=lambda i: i.header_offset)
+        out = []
+        for n, info in enumerate(members, start=1):
+            out.append(self.extract(info, path))
+            if progress:
+                progress(n, len(members))
+        return out
+
+    def close(self):
+        self.zip.close()
+        self.reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class _MemberFile:
+    """A member stream from ``zipfile`` that calls ``on_close`` once it is closed."""
+
+    def __init__(self, f, on_close):
+        self._f = f
+        self._on_close = on_close
+
+    def read(self, n=-1):
+        return self._f.read(n)
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+    def close(self):
+        if self._on_close is not None:
+            on_close, self._on_close = self._on_close, None
+            try:
+                self._f.close()
+            finally:
+                on_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def _central_directory_start(reader, tail_offset, tail):
+    """Return where the central directory starts, from the end records in ``tail``.
+
+    Like ``zipfile`` this is worked out backwards from the end record's own
+    position, so data prepended to the archive is allowed for.
+    """
+    pos = tail.rfind(b'PK\x05\x06')
+    if pos < 0 or pos + _END_RECORD.size > len(tail):
+        raise zipfile.BadZipFile("End of central directory record not found")
+    cd_size = _END_RECORD.unpack_from(tail, pos)[5]
+    end = tail_offset + pos
+    locator = pos - _END_LOCATOR64.size
+    if locator >= 0 and tail[locator:locator + 4] == b'PK\x06\x07':
+        # zip64: the real size is in the zip64 end record just before the locator
+        record = end - _END_LOCATOR64.size - _END_RECORD64.size
+        if record >= tail_offset:
+            data = tail[record - tail_offset:record - tail_offset + _END_RECORD64.size]
+        else:
+            reader.seek(record)
+            data = reader.read(_END_RECORD64.size)
+        fields = _END_RECORD64.unpack(data)
+        if fields[0] != b'PK\x06\x06':
+            raise zipfile.BadZipFile("Zip64 end of central directory record not found")
+        return record - fields[8]
+    return end - cd_size
@@ -0,0 +1,175 @@
+"""Restore points that make a saves import reversible.
+
+Before an import writes anything, every save it is about to replace is
+linked into ``<parent>/.mcsm-restore/<saves folder name>/``. A reflink
+(copy-on-write clone) is tried first, then a hardlink, then a plain copy.
+Reflinks and hardlinks take no time and no space. A list of the files the
+import is about to create is saved alongside.
+
+Hardlinks are safe only because imports never write into an existing file:
+each save is written to a temporary name and renamed over the old one. The
+old data then lives on under the restore point's link alone. That is also
+why only the files being replaced are linked, not the whole tree: the game
+writes its saves in place, so a hardlink to an untouched save would change
+along with it.
+
+Rolling back renames the kept files over the imported ones and deletes the
+files the import created, so it is instant. There is one restore point per
+saves folder, and the next import replaces it.
+"""
+import errno
+import json
+import os
+import shutil
+import sys
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+RESTORE_DIR = '.mcsm-restore'
+RESTORE_VERSION = 1
+# ioctl(2) request that clones a whole file on Btrfs, XFS and similar
+FICLONE = 0x40049409
+
+
+class RestorePoint:
+    """Saves replaced (kept under ``root/files``) and created by one import into ``saves_dir``."""
+
+    def __init__(self, saves_dir, replaced=None, added=None, created=None, methods=None):
+        self.saves_dir = os.path.abspath(saves_dir)
+        self.replaced = replaced or []
+        self.added = added or []
+        self.created = created or time.time()
+        # how the kept files were made: {'reflink': n, 'hardlink': n, 'copy': n}
+        self.methods = methods or {}
+
+    @property
+    def root(self):
+        return restore_dir(self.saves_dir)
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.root, 'restore.json')
+
+    def _kept(self, rel):
+        return os.path.join(self.root, 'files', *rel.split('/'))
+
+    def _live(self, rel):
+        return os.path.join(self.saves_dir, *rel.split('/'))
+
+    @classmethod
+    def create(cls, saves_dir, replaced, added):
+        """Keep the current copies of ``replaced`` and remember ``added`` (both '/'-separated relative paths).
+
+        Any older restore point for ``saves_dir`` is discarded first.
+        """
+        point = cls(saves_dir, list(replaced), list(added))
+        shutil.rmtree(point.root, ignore_errors=True)
+        for rel in point.replaced:
+            dst = point._kept(rel)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            method = clone_file(point._live(rel), dst)
+            point.methods[method] = point.methods.get(method, 0) + 1
+        point.save()
+        return point
+
+    @classmethod
+    def load(cls, saves_dir):
+        """Return the restore point of ``saves_dir`` or None if there is none."""
+        try:
+            with open(os.path.join(restore_dir(saves_dir), 'restore.json'), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != RESTORE_VERSION:
+                return None
+            return cls(saves_dir, data['replaced'], data['added'], data.get('created'), data.get('methods'))
+        except Exception:
+            return None
+
+    def save(self):
+        os.makedirs(self.root, exist_ok=True)
+        data = {
+            'version': RESTORE_VERSION,
+            'saves_dir': self.saves_dir,
+            'created': self.created,
+            'methods': self.methods,
+            'replaced': self.replaced,
+            'added': self.added,
+        }
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp, self.manifest_path)
+
+    def rollback(self):
+        """Put every replaced save back, delete the added ones and drop the restore point.
+
+        Returns the number of files restored or removed.
+        """
+        count = 0
+        for rel in self.replaced:
+            kept = self._kept(rel)
+            if os.path.exists(kept):
+                os.makedirs(os.path.dirname(self._live(rel)), exist_ok=True)
+                os.replace(kept, self._live(rel))
+                count += 1
+        for rel in self.added:
+            try:
+                os.remove(self._live(rel))
+                count += 1
+            except FileNotFoundError:
+                continue
+            # folders the import created are removed again once empty
+            parent = os.path.dirname(rel)
+            while parent:
+                try:
+                    os.rmdir(self._live(parent))
+                except OSError:
+                    break
+                parent = os.path.dirname(parent)
+        self.discard()
+        return count
+
+    def discard(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        try:
+            os.rmdir(os.path.dirname(self.root))
+        except OSError:
+            pass
+
+
+def restore_dir(saves_dir):
+    # next to the saves folder: same volume (so links work) but outside the
+    # tree the game and the save watcher look at
+    saves_dir = os.path.abspath(saves_dir)
+    return os.path.join(os.path.dirname(saves_dir), RESTORE_DIR, os.path.basename(saves_dir))
+
+
+def clone_file(src, dst):
+    """Make ``dst`` a copy of ``src`` as cheaply as the filesystem allows; return the method used."""
+    if fcntl is not None and sys.platform.startswith('linux'):
+        try:
+            with open(src, 'rb') as s, open(dst, 'wb') as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            shutil.copystat(src, dst)
+            return 'reflink'
+        except OSError as e:
+            _remove(dst)
+            if e.errno not in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS):
+                raise
+    try:
+        os.link(src, dst)
+        return 'hardlink'
+    except OSError:
+        # e.g. FAT/exFAT, or a saves folder on another volume than its parent
+        shutil.copy2(src, dst)
+        return 'copy'
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
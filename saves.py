@@ -0,0 +1,136 @@
+"""Backup and import of save folders, shared by the Tk launcher and the CLI."""
+import os
+import shutil
+import time
+import zipfile
+import zlib
+
+import extractor
+import zipwriter
+from restorepoint import RestorePoint
+
+COPY_CHUNK = 1024 * 1024
+
+
+def find_save_files(directory):
+    """Return list of tuples (fullpath, relpath) for all files under the saves folder."""
+    if not os.path.isdir(directory):
+        return []
+    found = []
+    try:
+        for root, dirs, files in os.walk(directory):
+            for name in files:
+                full = os.path.join(root, name)
+                rel = os.path.relpath(full, start=directory)
+                found.append((full, rel))
+    except Exception:
+        pass
+    return found
+
+
+def backup_saves(files, dest, progress=None, preset=zipwriter.DEFAULT_PRESET):
+    """Write ``files`` (from ``find_save_files``) to the zip ``dest`` and return a ``zipwriter.WriteResult``.
+
+    ``preset`` picks how hard each file is compressed (see ``zipwriter``).
+    ``progress(done, total)`` is called after each file.
+    """
+    # store with relative path so folder structure is preserved
+    return zipwriter.write_zip(dest, [(full, rel) for full, rel in files], progress=progress, preset=preset)
+
+
+def import_saves(zip_path, saves_dir, confirm_overwrite=None, progress=None):
+    """Copy every file in the backup ``zip_path`` into ``saves_dir``.
+
+    Members are read straight from the zip: a destination file with the
+    member's size and CRC-32 is left untouched, and every other member is
+    streamed to a temporary file next to its destination and renamed into
+    place. If existing files would change, ``confirm_overwrite(relpaths)``
+    decides whether to go ahead (without it they are overwritten).
+    ``progress(done, total)`` counts the files being written. Returns
+    ``(copied, skipped, found)``, or None when the user declined. Raises
+    ``zipfile.BadZipFile`` for something that is not a zip.
+
+    The import is all or nothing: a restore point of the saves it replaces
+    is made first (see ``restorepoint``). If any file fails, the import is
+    rolled back and the error re-raised. Otherwise the restore point is kept
+    for ``undo_last_import``.
+    """
+    with zipfile.ZipFile(zip_path, 'r') as z:
+        members = [info for info in z.infolist() if not info.is_dir()]
+        if not members:
+            return 0, 0, 0
+
+        # compare against what is already there without extracting anything
+        todo = []
+        overwrites = []
+        skipped = 0
+        for info in members:
+            # same path cleaning as ZipFile.extract, so '..' and absolute
+            # names cannot escape the saves folder
+            dst = extractor.member_path(info, saves_dir)
+            try:
+                st = os.stat(dst)
+            except FileNotFoundError:
+                todo.append((info, dst))
+                continue
+            if st.st_size == info.file_size and _file_crc32(dst) == info.CRC:
+                skipped += 1
+                continue
+            todo.append((info, dst))
+            overwrites.append(os.path.relpath(dst, saves_dir))
+        if overwrites and confirm_overwrite is not None and not confirm_overwrite(overwrites):
+            return None
+
+        if not todo:
+            return 0, skipped, len(members)
+        replaced = set(overwrites)
+        rels = [os.path.relpath(dst, saves_dir) for _, dst in todo]
+        point = RestorePoint.create(saves_dir,
+                                    [rel.replace(os.sep, '/') for rel in rels if rel in replaced],
+                                    [rel.replace(os.sep, '/') for rel in rels if rel not in replaced])
+        try:
+            for n, (info, dst) in enumerate(todo, start=1):
+                _write_member(z, info, dst)
+                if progress:
+                    progress(n, len(todo))
+        except BaseException:
+            point.rollback()
+            raise
+        return len(todo), skipped, len(members)
+
+
+def undo_last_import(saves_dir):
+    """Roll ``saves_dir`` back to before the last import; return the files restored or removed, or None."""
+    point = RestorePoint.load(saves_dir)
+    if point is None:
+        return None
+    return point.rollback()
+
+
+def _write_member(z, info, dst):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = dst + '.mcsm-tmp'
+    try:
+        # ZipFile checks the CRC as the last bytes are read
+        with z.open(info) as src, open(tmp, 'wb') as out:
+            shutil.copyfileobj(src, out, COPY_CHUNK)
+        mtime = time.mktime(info.date_time + (0, 0, -1))
+        os.utime(tmp, (mtime, mtime))
+        os.replace(tmp, dst)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _file_crc32(path):
+    crc = 0
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(COPY_CHUNK)
+            if not data:
+                break
+            crc = zlib.crc32(data, crc)
+    return crc & 0xFFFFFFFF
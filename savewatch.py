@@ -0,0 +1,306 @@
+"""Background watcher that snapshots a saves folder after the game writes to it.
+
+On Linux the folder tree is watched with inotify, through ctypes, so the
+thread sleeps in ``select`` until something changes. Elsewhere, or when
+inotify is unavailable, the folder is polled every ``POLL_INTERVAL``
+seconds: a scandir walk compared against a path -> (size, mtime) index.
+
+A burst of writes is debounced into one snapshot. The snapshot is taken once
+the folder has been quiet for ``QUIET_SECONDS``, or at the latest
+``MAX_DELAY`` after the first change when the game keeps writing. Snapshots
+are taken on the watcher thread at idle I/O priority and lowest CPU
+priority, and only files that changed are read (see ``snapshots``). Old
+automatic snapshots are then trimmed by the retention policy.
+"""
+import ctypes
+import ctypes.util
+import os
+import platform
+import select
+import struct
+import sys
+import threading
+import time
+
+QUIET_SECONDS = 15
+MAX_DELAY = 5 * 60
+POLL_INTERVAL = 10
+# retention for automatic snapshots (ones taken by hand are always kept)
+KEEP_LAST = 20
+KEEP_DAYS = 7
+
+# inotify(7)
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT = struct.Struct('iIII')
+
+# ioprio_set(2) syscall numbers; the call has no libc wrapper
+_IOPRIO_SET = {'x86_64': 251, 'amd64': 251, 'aarch64': 30, 'arm64': 30, 'i386': 289, 'i686': 289}
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_IDLE = 3
+
+
+class SaveWatcher(threading.Thread):
+    """Watches ``saves_dir`` and snapshots it into ``store`` under ``label``.
+
+    ``on_snapshot(snapshot, stats)`` is called after a new snapshot is
+    written and ``on_error(exc)`` when one fails; both run on the watcher
+    thread.
+    """
+
+    def __init__(self, store, label, saves_dir, on_snapshot=None, on_error=None,
+                 quiet=QUIET_SECONDS, max_delay=MAX_DELAY, poll_interval=POLL_INTERVAL,
+                 keep_last=KEEP_LAST, keep_days=KEEP_DAYS, use_inotify=True):
+        super().__init__(name=f'savewatch-{label}', daemon=True)
+        self.store = store
+        self.label = label
+        self.saves_dir = saves_dir
+        self.on_snapshot = on_snapshot
+        self.on_error = on_error
+        self.quiet = quiet
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.keep_last = keep_last
+        self.keep_days = keep_days
+        self.use_inotify = use_inotify
+        self.backend = None
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+        if self.backend is not None:
+            self.backend.wake()
+
+    def run(self):
+        lower_thread_priority()
+        self.backend = None
+        if self.use_inotify:
+            self.backend = _Inotify.create(self.saves_dir, self._stopping)
+        if self.backend is None:
+            self.backend = _Poller(self.saves_dir, self.poll_interval, self._stopping)
+        try:
+            # changes made while nothing was watching are picked up by a
+            # first (usually no-op) snapshot once the folder is quiet
+            first = last = time.monotonic()
+            dirty = True
+            while not self._stopping.is_set():
+                timeout = None
+                if dirty:
+                    due = min(last + self.quiet, first + self.max_delay)
+                    timeout = max(0.0, due - time.monotonic())
+                changed = self.backend.wait(timeout)
+                if getattr(self.backend, 'lost', False):
+                    # the folder itself was removed or moved away; polling
+                    # notices when it comes back
+                    self.backend.close()
+                    self.backend = _Poller(self.saves_dir, self.poll_interval, self._stopping)
+                if changed:
+                    now = time.monotonic()
+                    if not dirty:
+                        first = now
+                    dirty = True
+                    last = now
+                elif dirty and not self._stopping.is_set():
+                    dirty = False
+                    self._snapshot()
+        finally:
+            self.backend.close()
+
+    def _snapshot(self):
+        try:
+            snap, stats = self.store.snapshot(self.label, self.saves_dir, auto=True)
+            if stats['files'] and not stats['unchanged']:
+                self.store.apply_retention(self.label, self.keep_last, self.keep_days)
+                if self.on_snapshot:
+                    self.on_snapshot(snap, stats)
+        except Exception as e:
+            if self.on_error:
+                self.on_error(e)
+
+
+class _Poller:
+    """Change detection by comparing a size/mtime index every ``interval`` seconds."""
+
+    def __init__(self, root, interval, stopping):
+        self.root = root
+        self.interval = interval
+        self.stopping = stopping
+        self.index = _index(root)
+
+    def wait(self, timeout):
+        """Return True once the tree changed, False after ``timeout`` seconds (None: no limit)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            step = self.interval if deadline is None else min(self.interval, max(0.0, deadline - time.monotonic()))
+            if self.stopping.wait(step):
+                return False
+            index = _index(self.root)
+            if index != self.index:
+                self.index = index
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def wake(self):
+        # the stop event already interrupts the wait
+        pass
+
+    def close(self):
+        pass
+
+
+class _Inotify:
+    """Change detection with one inotify watch per directory in the tree."""
+
+    def __init__(self, libc, fd, root, stopping):
+        self.libc = libc
+        self.fd = fd
+        self.root = root
+        self.stopping = stopping
+        self.watches = {}
+        self._add_tree(root)
+        self._wake_r, self._wake_w = os.pipe()
+
+    @classmethod
+    def create(cls, root, stopping):
+        """Return an inotify backend for ``root``, or None where inotify cannot be used."""
+        if not sys.platform.startswith('linux') or not os.path.isdir(root):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            return None
+        try:
+            return cls(libc, fd, root, stopping)
+        except OSError:
+            os.close(fd)
+            return None
+
+    def _add_tree(self, top):
+        for d, _dirs, _files in os.walk(top):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(d), WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if d == self.root:
+                    raise OSError(err, os.strerror(err), d)
+                # e.g. the per-user watch limit; that folder goes unwatched
+                continue
+            self.watches[wd] = d
+
+    @property
+    def lost(self):
+        return self.root not in self.watches.values()
+
+    def wait(self, timeout):
+        """Return True once the tree changed, False after ``timeout`` seconds (None: no limit)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.stopping.is_set() and not self.lost:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ready, _, _ = select.select([self.fd, self._wake_r], [], [], remaining)
+            if self.fd in ready and self._read_events():
+                return True
+            if self._wake_r in ready or (deadline is not None and time.monotonic() >= deadline):
+                return False
+        return False
+
+    def _read_events(self):
+        changed = False
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            pos = 0
+            while pos + _EVENT.size <= len(buf):
+                wd, mask, _cookie, length = _EVENT.unpack_from(buf, pos)
+                name = buf[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b'\0')
+                pos += _EVENT.size + length
+                if mask & IN_IGNORED:
+                    self.watches.pop(wd, None)
+                    continue
+                changed = True
+                if mask & IN_Q_OVERFLOW:
+                    continue
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and wd in self.watches:
+                    # new folders need watches of their own
+                    self._add_tree(os.path.join(self.watches[wd], os.fsdecode(name)))
+
+    def wake(self):
+        try:
+            os.write(self._wake_w, b'x')
+        except OSError:
+            pass
+
+    def close(self):
+        for fd in (self.fd, self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def _index(root):
+    """Return ``{path: (size, mtime_ns)}`` for every file below ``root``."""
+    index = {}
+    stack = [root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        # on Windows scandir already carries the stat data
+                        st = entry.stat(follow_symlinks=False)
+                        index[entry.path] = (st.st_size, st.st_mtime_ns)
+                except OSError:
+                    pass
+    return index
+
+
+def lower_thread_priority():
+    """Best effort: idle I/O class and lowest CPU priority for the calling thread."""
+    if sys.platform == 'win32':
+        try:
+            kernel32 = ctypes.windll.kernel32
+            # THREAD_MODE_BACKGROUND_BEGIN lowers CPU, I/O and memory priority
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), 0x00010000)
+        except Exception:
+            pass
+        return
+    if sys.platform.startswith('linux'):
+        try:
+            # on Linux "process" priorities given a thread id apply to that thread
+            tid = threading.get_native_id()
+            os.setpriority(os.PRIO_PROCESS, tid, 19)
+        except Exception:
+            pass
+        nr = _IOPRIO_SET.get(platform.machine().lower())
+        if nr is not None:
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+                libc.syscall(nr, IOPRIO_WHO_PROCESS, 0, IOPRIO_CLASS_IDLE << 13)
+            except Exception:
+                pass
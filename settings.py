@@ -0,0 +1,152 @@
+"""Paths and the JSON config file shared by the Tk launcher and the CLI.
+
+Kept free of tkinter so headless tools can import it.
+"""
+import json
+import os
+import sys
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# When bundled as a one-file PyInstaller exe, APP_DIR points to a temporary
+# extraction folder that is removed after the process exits. We must not
+# store persistent user data there. Prefer a persistent per-user config
+# directory when frozen; otherwise keep config next to the script during
+# development.
+if getattr(sys, 'frozen', False):
+    CONFIG_DIR = os.path.join(os.path.expanduser("~"), "Documents", 'MCSM-Launcher')
+else:
+    CONFIG_DIR = APP_DIR
+
+# Ensure the config directory exists so writes won't fail
+try:
+    os.makedirs(CONFIG_DIR, exist_ok=True)
+except Exception:
+    # Non-fatal; save_config will try again before writing
+    pass
+
+CONFIG_PATH = os.path.join(CONFIG_DIR, 'launcher_config.json')
+ASSETS_DIR = os.path.join(APP_DIR, 'assets')
+# Expected block digests for the season archives: the bundled manifest, then
+# the one we record after an archive installs cleanly
+LEARNED_MANIFESTS_PATH = os.path.join(CONFIG_DIR, 'manifests.json')
+MANIFEST_PATHS = [os.path.join(ASSETS_DIR, 'manifests.json'), LEARNED_MANIFESTS_PATH]
+# Installed archives are kept here so reinstalls are served from disk
+CACHE_DIR = os.path.join(CONFIG_DIR, 'cache')
+# Incremental save snapshots (content-addressed, shared by both seasons)
+SNAPSHOTS_DIR = os.path.join(CONFIG_DIR, 'snapshots')
+# Banners and icons scaled for the launcher (see thumbcache)
+THUMBS_DIR = os.path.join(CONFIG_DIR, 'thumbs')
+
+# Default saves locations inside user's Documents
+S1_SAVES_DIR = os.path.join(os.path.expanduser("~"), "Documents", "Telltale Games", "S1")
+S2_SAVES_DIR = os.path.join(os.path.expanduser("~"), "Documents", "Telltale Games", "S2")
+
+# Everything the launcher needs to know about each season (kept here rather
+# than in installer so the launcher can start without the download code)
+SEASONS = {
+    1: {
+        'title': 'Season 1',
+        'config_key': 'season1_path',
+        'saves_key': 's1_saves',
+        'saves_dir': S1_SAVES_DIR,
+        'mirrors_key': 'season1_mirrors',
+        'url': 'https://archive.org/download/minecraft-story-mode-s1-2/Minecraft%20Story%20Mode%20S1.zip',
+        'exe': 'MinecraftStoryMode.exe',
+        'default_name': 'S1',
+        'layout': [],
+    },
+    2: {
+        'title': 'Season 2',
+        'config_key': 'season2_path',
+        'saves_key': 's2_saves',
+        'saves_dir': S2_SAVES_DIR,
+        'mirrors_key': 'season2_mirrors',
+        'url': 'https://archive.org/download/minecraft-story-mode-s1-2/Minecraft%20Story%20Mode%20S2.zip',
+        'exe': 'Minecraft2.exe',
+        'default_name': 'S2',
+        # The Season 2 zip buries the game several folders deep, e.g.
+        # "S2/Minecraft.Story.Mode.Season.Two/Minecraft Story Mode Season Two/".
+        # Strip everything up to the innermost "...Story...Season...Two"
+        # folder so the game files land directly in the install folder, and
+        # the top "S2/" folder from the files next to them so those land
+        # there too.
+        'layout': [
+            (r'(?i)^(?:.*/)?[^/]*story[^/]*season[^/]*two[^/]*/', ''),
+            (r'(?i)^s2/', ''),
+        ],
+    },
+}
+
+DEFAULT_CONFIG = {
+    "season1_path": "",
+    "season2_path": "",
+    # save locations (remember user's choice)
+    "s1_saves": S1_SAVES_DIR,
+    "s2_saves": S2_SAVES_DIR,
+    # extra download URLs serving the same season zip; the download spreads
+    # its ranges across them by measured speed
+    "season1_mirrors": [],
+    "season2_mirrors": [],
+    # size cap for the local archive cache (least recently used archives
+    # are evicted first)
+    "cache_max_gb": 20,
+    # how save backups are compressed: "fastest", "balanced" or "smallest"
+    "backup_preset": "balanced",
+    # snapshot the saves folders automatically after the game writes to them
+    "auto_snapshots": False,
+}
+
+
+def load_config():
+    # Load config from disk if present. If missing, create a default
+    # config file at CONFIG_PATH (ensuring parent dirs exist) so that
+    # the bundled exe has a persistent config file to modify.
+    try:
+        if os.path.exists(CONFIG_PATH):
+            with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+                data = json.load(f)
+                if isinstance(data, dict):
+                    return {**DEFAULT_CONFIG, **data}
+        else:
+            # Create parent directory if necessary and write default config
+            cfg_dir = os.path.dirname(CONFIG_PATH)
+            if cfg_dir and not os.path.isdir(cfg_dir):
+                try:
+                    os.makedirs(cfg_dir, exist_ok=True)
+                except Exception:
+                    pass
+            try:
+                with open(CONFIG_PATH, "w", encoding="utf-8") as f:
+                    json.dump(DEFAULT_CONFIG, f, indent=2)
+            except Exception:
+                # If we can't write the file that's non-fatal; continue
+                pass
+            return DEFAULT_CONFIG.copy()
+    except Exception:
+        pass
+    return DEFAULT_CONFIG.copy()
+
+
+def save_config(config):
+    """Write ``config`` to CONFIG_PATH; errors propagate to the caller."""
+    # Ensure parent directory exists (important for frozen exe)
+    cfg_dir = os.path.dirname(CONFIG_PATH)
+    if cfg_dir and not os.path.isdir(cfg_dir):
+        try:
+            os.makedirs(cfg_dir, exist_ok=True)
+        except Exception:
+            pass
+    with open(CONFIG_PATH, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+
+def make_archive_cache(config):
+    # imported here: it pulls in zipfile, which the launcher does not need
+    # until the first download
+    import archive_cache
+    try:
+        max_bytes = int(float(config.get("cache_max_gb", 20)) * 1024 ** 3)
+    except Exception:
+        max_bytes = archive_cache.DEFAULT_MAX_BYTES
+    return archive_cache.ArchiveCache(CACHE_DIR, max_bytes)
@@ -0,0 +1,412 @@
+"""Incremental, deduplicated snapshots of a saves folder.
+
+Every file's contents are stored once under ``blobs/<sha256>``; a snapshot
+is a small JSON manifest mapping relative paths to a blob digest plus the
+size and mtime the file had. Taking a snapshot compares each file's size and
+mtime with the previous snapshot of the same folder and only reads and
+hashes the files that differ, so a snapshot after changing one save slot
+writes one blob. Any snapshot can be restored or exported as a plain zip.
+
+Layout under the store root::
+
+    blobs/ab/ab12...        file contents, named by SHA-256
+    <label>/<id>.json       one manifest per snapshot (label: e.g. 's1_saves')
+    .lock                   held while snapshotting or deleting
+
+Taking a snapshot and deleting blobs are serialized by a store-wide lock: a
+thread lock for the save watchers and the UI, plus a file lock for
+``cli.py`` running in another process. Without it a prune could delete
+blobs that a snapshot had just stored but not yet listed in its manifest.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+import zipwriter
+
+SNAPSHOT_VERSION = 1
+COPY_CHUNK = 1024 * 1024
+LOCK_NAME = '.lock'
+INCOMING_PREFIX = '.incoming-'
+# a temp blob untouched for this long was left by a writer that crashed
+INCOMING_MAX_AGE = 3600
+
+# store root -> threading.Lock, shared by every SnapshotStore on that root
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot is missing or its stored data is damaged."""
+
+
+class Snapshot:
+    """One manifest: ``files`` maps '/'-separated relative paths to [digest, size, mtime_ns]."""
+
+    def __init__(self, label, id, source, files, created=None, path=None, auto=False):
+        self.label = label
+        self.id = id
+        self.source = source
+        self.files = files
+        self.created = created or time.time()
+        self.path = path
+        # taken by the save watcher; only these are subject to retention
+        self.auto = auto
+
+    def total_bytes(self):
+        return sum(size for _, size, _ in self.files.values())
+
+    def to_json(self):
+        return {
+            'version': SNAPSHOT_VERSION,
+            'id': self.id,
+            'source': self.source,
+            'created': self.created,
+            'auto': self.auto,
+            'files': self.files,
+        }
+
+
+class SnapshotStore:
+    """Content-addressed snapshot store rooted at ``root``."""
+
+    def __init__(self, root):
+        self.root = root
+        self.blob_dir = os.path.join(root, 'blobs')
+
+    def lock(self):
+        """Return a context manager holding the store-wide lock."""
+        return _StoreLock(self.root)
+
+    def blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def _label_dir(self, label):
+        return os.path.join(self.root, label)
+
+    # -- reading -------------------------------------------------------------
+
+    def list(self, label):
+        """Return the snapshots stored under ``label``, newest first."""
+        out = []
+        try:
+            names = os.listdir(self._label_dir(label))
+        except OSError:
+            return out
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            snap = self._read(label, os.path.join(self._label_dir(label), name))
+            if snap is not None:
+                out.append(snap)
+        out.sort(key=lambda s: (s.created, s.id), reverse=True)
+        return out
+
+    def latest(self, label):
+        snaps = self.list(label)
+        return snaps[0] if snaps else None
+
+    def load(self, label, snapshot_id):
+        snap = self._read(label, os.path.join(self._label_dir(label), snapshot_id + '.json'))
+        if snap is None:
+            raise SnapshotError(f"No snapshot {snapshot_id} for {label}")
+        return snap
+
+    def _read(self, label, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != SNAPSHOT_VERSION:
+                return None
+            files = {rel: [digest, int(size), int(mtime)] for rel, (digest, size, mtime) in data['files'].items()}
+            return Snapshot(label, data['id'], data.get('source'), files, data.get('created'), path,
+                            bool(data.get('auto')))
+        except Exception:
+            return None
+
+    # -- taking snapshots ----------------------------------------------------
+
+    def snapshot(self, label, source_dir, progress=None, auto=False):
+        """Snapshot every file under ``source_dir`` and return ``(snapshot, stats)``.
+
+        Files whose size and mtime match the previous snapshot of the same
+        folder reuse its digest without being read. ``stats`` holds
+        ``files``, ``hashed`` (files read), ``stored`` (new blobs) and
+        ``stored_bytes``, and ``unchanged`` is true when nothing changed: the
+        previous snapshot is then returned and no new one is written.
+        ``progress(done, total)`` is called per file; ``auto`` marks
+        snapshots taken by the save watcher.
+        """
+        with self.lock():
+            return self._snapshot(label, source_dir, progress, auto)
+
+    def _snapshot(self, label, source_dir, progress, auto):
+        previous = self.latest(label)
+        known = {}
+        if previous is not None and _same_dir(previous.source, source_dir):
+            known = previous.files
+        entries = _scan(source_dir)
+        stats = {'files': len(entries), 'hashed': 0, 'stored': 0, 'stored_bytes': 0, 'unchanged': False}
+        files = {}
+        for i, (rel, full, st) in enumerate(entries, start=1):
+            old = known.get(rel)
+            if (old is not None and old[1] == st.st_size and old[2] == st.st_mtime_ns
+                    and os.path.exists(self.blob_path(old[0]))):
+                files[rel] = old
+            else:
+                digest, stored = self._store_file(full)
+                stats['hashed'] += 1
+                if stored:
+                    stats['stored'] += 1
+                    stats['stored_bytes'] += st.st_size
+                files[rel] = [digest, st.st_size, st.st_mtime_ns]
+            if progress:
+                progress(i, len(entries))
+        if previous is not None and files == previous.files:
+            stats['unchanged'] = True
+            return previous, stats
+        snap = Snapshot(label, _new_id(self._label_dir(label)), os.path.abspath(source_dir), files, auto=auto)
+        self._write(snap)
+        return snap, stats
+
+    def _store_file(self, path):
+        """Copy ``path`` into the blob store while hashing it; return ``(digest, newly_stored)``."""
+        os.makedirs(self.blob_dir, exist_ok=True)
+        tmp = os.path.join(self.blob_dir, f'{INCOMING_PREFIX}{os.getpid()}-{threading.get_ident()}-{time.monotonic_ns()}')
+        h = hashlib.sha256()
+        try:
+            with open(path, 'rb') as src, open(tmp, 'wb') as dst:
+                while True:
+                    chunk = src.read(COPY_CHUNK)
+                    if not chunk:
+                        break
+                    h.update(chunk)
+                    dst.write(chunk)
+            digest = h.hexdigest()
+            blob = self.blob_path(digest)
+            if os.path.exists(blob):
+                return digest, False
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            os.replace(tmp, blob)
+            return digest, True
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _write(self, snap):
+        os.makedirs(self._label_dir(snap.label), exist_ok=True)
+        snap.path = os.path.join(self._label_dir(snap.label), snap.id + '.json')
+        tmp = snap.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(snap.to_json(), f)
+        os.replace(tmp, snap.path)
+
+    # -- using snapshots -----------------------------------------------------
+
+    def restore(self, snap, dest_dir, confirm_overwrite=None, progress=None):
+        """Write the files of ``snap`` into ``dest_dir`` and return how many were written.
+
+        Files already identical (same size and mtime) are skipped; files not
+        in the snapshot are left alone. If existing files would change,
+        ``confirm_overwrite(relpaths)`` decides whether to go ahead; None is
+        returned when it declines.
+        """
+        todo = []
+        overwrites = []
+        for rel, (digest, size, mtime) in sorted(snap.files.items()):
+            dst = os.path.join(dest_dir, *rel.split('/'))
+            try:
+                st = os.stat(dst)
+            except OSError:
+                todo.append((rel, dst, digest, mtime))
+                continue
+            if st.st_size != size or st.st_mtime_ns != mtime:
+                todo.append((rel, dst, digest, mtime))
+                overwrites.append(rel)
+        if overwrites and confirm_overwrite is not None and not confirm_overwrite(overwrites):
+            return None
+        for i, (rel, dst, digest, mtime) in enumerate(todo, start=1):
+            blob = self.blob_path(digest)
+            if not os.path.exists(blob):
+                raise SnapshotError(f"Stored data for {rel} is missing")
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            tmp = dst + '.mcsm-tmp'
+            with open(blob, 'rb') as src, open(tmp, 'wb') as out:
+                while True:
+                    chunk = src.read(COPY_CHUNK)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+            os.utime(tmp, ns=(mtime, mtime))
+            os.replace(tmp, dst)
+            if progress:
+                progress(i, len(todo))
+        return len(todo)
+
+    def export_zip(self, snap, dest, progress=None, preset=zipwriter.DEFAULT_PRESET):
+        """Write ``snap`` as a plain zip (same layout as a saves backup) and return a ``zipwriter.WriteResult``."""
+        members = []
+        for rel, (digest, size, mtime) in snap.files.items():
+            blob = self.blob_path(digest)
+            if not os.path.exists(blob):
+                raise SnapshotError(f"Stored data for {rel} is missing")
+            members.append((blob, rel, mtime))
+        return zipwriter.write_zip(dest, members, progress=progress, preset=preset)
+
+    def delete(self, snap):
+        """Remove ``snap`` and any blobs no other snapshot uses; return the bytes freed."""
+        with self.lock():
+            try:
+                os.remove(snap.path)
+            except OSError:
+                pass
+            return self._prune()
+
+    def apply_retention(self, label, keep_last, keep_days):
+        """Delete automatic snapshots beyond the policy and return the bytes freed.
+
+        The newest ``keep_last`` automatic snapshots are kept, plus the
+        newest one of each of the last ``keep_days`` days. Snapshots taken
+        by hand are never removed.
+        """
+        with self.lock():
+            autos = [s for s in self.list(label) if s.auto]
+            keep = set(s.id for s in autos[:keep_last])
+            cutoff = time.time() - keep_days * 86400
+            days = set()
+            for snap in autos:
+                day = time.strftime('%Y-%m-%d', time.localtime(snap.created))
+                if snap.created >= cutoff and day not in days:
+                    days.add(day)
+                    keep.add(snap.id)
+            dropped = [s for s in autos if s.id not in keep]
+            for snap in dropped:
+                try:
+                    os.remove(snap.path)
+                except OSError:
+                    pass
+            return self._prune() if dropped else 0
+
+    def prune(self):
+        """Delete blobs no snapshot refers to; return the bytes freed."""
+        with self.lock():
+            return self._prune()
+
+    def _prune(self):
+        # caller holds the lock. Temp files and blobs written since the prune
+        # started are left alone anyway, in case a writer does not lock
+        # (e.g. an older version of the launcher). A temp file is removed
+        # only once nothing has written to it for INCOMING_MAX_AGE.
+        started = time.time()
+        used = set()
+        try:
+            labels = [d for d in os.listdir(self.root) if d != 'blobs']
+        except OSError:
+            return 0
+        for label in labels:
+            if os.path.isdir(self._label_dir(label)):
+                for snap in self.list(label):
+                    used.update(digest for digest, _, _ in snap.files.values())
+        freed = 0
+        for root, _dirs, names in os.walk(self.blob_dir):
+            for name in names:
+                if name in used:
+                    continue
+                path = os.path.join(root, name)
+                cutoff = started - INCOMING_MAX_AGE if name.startswith(INCOMING_PREFIX) else started
+                try:
+                    st = os.stat(path)
+                    if st.st_mtime >= cutoff:
+                        continue
+                    os.remove(path)
+                    freed += st.st_size
+                except OSError:
+                    pass
+        return freed
+
+
+class _StoreLock:
+    """Store-wide lock: a thread lock per root, then an exclusive lock on ``root/.lock``."""
+
+    def __init__(self, root):
+        self.root = root
+        key = os.path.normcase(os.path.abspath(root))
+        with _thread_locks_guard:
+            self.thread_lock = _thread_locks.setdefault(key, threading.Lock())
+        self.f = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            self.f = open(os.path.join(self.root, LOCK_NAME), 'a+b')
+            if fcntl is not None:
+                fcntl.flock(self.f.fileno(), fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        self.f.seek(0)
+                        # LK_LOCK retries for about 10 seconds, then raises
+                        msvcrt.locking(self.f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+        except BaseException:
+            if self.f is not None:
+                self.f.close()
+                self.f = None
+            self.thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.f.fileno(), fcntl.LOCK_UN)
+            else:
+                self.f.seek(0)
+                msvcrt.locking(self.f.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.f.close()
+            self.f = None
+            self.thread_lock.release()
+
+
+def _scan(directory):
+    """Return ``[(relpath, fullpath, stat)]`` for every file below ``directory``."""
+    out = []
+    if not os.path.isdir(directory):
+        return out
+    for root, _dirs, names in os.walk(directory):
+        for name in names:
+            full = os.path.join(root, name)
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            rel = os.path.relpath(full, directory).replace(os.sep, '/')
+            out.append((rel, full, st))
+    out.sort(key=lambda e: e[0])
+    return out
+
+
+def _same_dir(a, b):
+    return bool(a) and os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b))
+
+
+def _new_id(label_dir):
+    base = time.strftime('%Y%m%d-%H%M%S')
+    snapshot_id = base
+    n = 1
+    while os.path.exists(os.path.join(label_dir, snapshot_id + '.json')):
+        n += 1
+        snapshot_id = f'{base}-{n}'
+    return snapshot_id
@@ -0,0 +1,159 @@
+"""Startup timing report: the cost of each import and the time to first frame.
+
+Turned on with ``launcher.py --startup-timing``. ``install()`` has to run
+before the imports it should see. It puts a finder at the front of
+``sys.meta_path`` that wraps each module's loader and times
+``exec_module``. Time spent importing submodules is subtracted, so every
+module is charged only its own work, as with ``python -X importtime``. That
+option is not available in the frozen PyInstaller build, which is where
+startup time matters most.
+
+``first_frame(seconds)`` records when the window was drawn and writes the
+report: a summary to stderr (when there is one; the windowed exe has none)
+and one JSON line appended to ``startup_timing.jsonl`` in the config folder,
+so runs can be compared over time.
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+REPORT_NAME = 'startup_timing.jsonl'
+# modules listed on stderr, most expensive first
+TOP_MODULES = 25
+
+_timer = None
+
+
+class ImportTimer:
+    """Meta path finder that times module execution; see the module docstring."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # (name, self seconds, cumulative seconds) in import order
+        self.modules = []
+        self._stack = []
+        # only imports on the main thread are timed; a worker importing at
+        # the same time would make the nesting meaningless
+        self._thread = threading.get_ident()
+
+    def find_spec(self, name, path=None, target=None):
+        if threading.get_ident() != self._thread:
+            return None
+        for finder in sys.meta_path:
+            if finder is self:
+                continue
+            find_spec = getattr(finder, 'find_spec', None)
+            if find_spec is None:
+                continue
+            spec = find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    def _run(self, loader, module, created=0.0):
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start + created
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            self.modules.append((module.__name__, elapsed - children, elapsed))
+            # put the real loader back where importlib left ours
+            module.__loader__ = loader
+            if getattr(module, '__spec__', None) is not None:
+                module.__spec__.loader = loader
+
+
+class _TimedLoader:
+    def __init__(self, loader, timer):
+        self._loader = loader
+        self._timer = timer
+        self._created = 0.0
+
+    def create_module(self, spec):
+        create_module = getattr(self._loader, 'create_module', None)
+        if create_module is None:
+            return None
+        # extension modules do their loading here rather than in exec_module
+        start = time.perf_counter()
+        try:
+            return create_module(spec)
+        finally:
+            self._created = time.perf_counter() - start
+
+    def exec_module(self, module):
+        self._timer._run(self._loader, module, self._created)
+
+    def __getattr__(self, name):
+        # anything else (get_data, get_resource_reader, ...) is the real loader's
+        return getattr(self._loader, name)
+
+
+def install():
+    """Start timing imports; a no-op when already installed."""
+    global _timer
+    if _timer is None:
+        _timer = ImportTimer()
+        sys.meta_path.insert(0, _timer)
+    return _timer
+
+
+def enabled():
+    return _timer is not None
+
+
+def first_frame(seconds):
+    """Record the time to first frame (``seconds`` as measured by the caller) and write the report.
+
+    Import timing stops here; a later call does nothing.
+    """
+    global _timer
+    timer = _timer
+    if timer is None:
+        return
+    _timer = None
+    try:
+        sys.meta_path.remove(timer)
+    except ValueError:
+        pass
+    since_start = time.perf_counter() - timer.started
+    imports = sum(own for _, own, _ in timer.modules)
+    record = {
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'frozen': bool(getattr(sys, 'frozen', False)),
+        'python': sys.version.split()[0],
+        'first_frame_ms': round(since_start * 1000, 1),
+        'window_ms': round(seconds * 1000, 1),
+        'imports_ms': round(imports * 1000, 1),
+        'modules': [[name, round(own * 1000, 2), round(total * 1000, 2)]
+                    for name, own, total in timer.modules],
+    }
+    if sys.stderr is not None:
+        try:
+            _print_summary(record, sys.stderr)
+        except Exception:
+            pass
+    try:
+        import settings
+        with open(os.path.join(settings.CONFIG_DIR, REPORT_NAME), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+    except Exception:
+        pass
+
+
+def _print_summary(record, out):
+    print(f"startup: first frame after {record['first_frame_ms']:.1f} ms "
+          f"({record['window_ms']:.1f} ms building the window, "
+          f"{record['imports_ms']:.1f} ms in {len(record['modules'])} imports)", file=out)
+    print(f"{'self ms':>9} {'total ms':>9}  module", file=out)
+    for name, own, total in sorted(record['modules'], key=lambda m: m[1], reverse=True)[:TOP_MODULES]:
+        print(f"{own:9.2f} {total:9.2f}  {name}", file=out)
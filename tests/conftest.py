@@ -0,0 +1,116 @@
+"""Shared fixtures: the repo's flat modules on sys.path and a local ranged HTTP server."""
+import http.server
+import os
+import re
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SEND_CHUNK = 64 * 1024
+
+
+class RangeServer:
+    """Serves ``data`` at ``url`` with HEAD, Range/If-Range and an ETag.
+
+    ``delay`` sleeps before each chunk of a response, ``fail_after`` drops
+    every connection after that many bytes of a body, ``budget`` drops
+    them all once that many body bytes have been sent in total,
+    ``max_active`` records the most GETs served at once and ``heads``
+    counts HEAD requests.
+    """
+
+    def __init__(self):
+        self.data = b''
+        self.etag = '"v1"'
+        self.delay = 0
+        self.fail_after = None
+        self.budget = None
+        self.ranges = True
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.heads = 0
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                with server.lock:
+                    server.heads += 1
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(server.data)))
+                if server.ranges:
+                    self.send_header('Accept-Ranges', 'bytes')
+                self.send_header('ETag', server.etag)
+                self.end_headers()
+
+            def do_GET(self):
+                with server.lock:
+                    server.requests.append(self.headers.get('Range'))
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                try:
+                    self._send_body()
+                finally:
+                    with server.lock:
+                        server.active -= 1
+
+            def _send_body(self):
+                data = server.data
+                start, end = 0, len(data) - 1
+                status = 200
+                rng = self.headers.get('Range')
+                if_range = self.headers.get('If-Range')
+                if server.ranges and rng and (if_range is None or if_range == server.etag):
+                    m = re.match(r'bytes=(\d+)-(\d*)$', rng)
+                    start = int(m.group(1))
+                    end = min(int(m.group(2)), len(data) - 1) if m.group(2) else len(data) - 1
+                    status = 206
+                self.send_response(status)
+                self.send_header('Content-Length', str(end - start + 1))
+                self.send_header('ETag', server.etag)
+                if status == 206:
+                    self.send_header('Content-Range', f'bytes {start}-{end}/{len(data)}')
+                self.end_headers()
+                sent = 0
+                for offset in range(start, end + 1, SEND_CHUNK):
+                    if ((server.fail_after is not None and sent >= server.fail_after)
+                            or (server.budget is not None and server.budget <= 0)):
+                        self.close_connection = True
+                        return
+                    if server.delay:
+                        time.sleep(server.delay)
+                    chunk = data[offset:min(offset + SEND_CHUNK, end + 1)]
+                    self.wfile.write(chunk)
+                    sent += len(chunk)
+                    if server.budget is not None:
+                        with server.lock:
+                            server.budget -= len(chunk)
+
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}/Season%20Archive.zip'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def http_server():
+    server = RangeServer()
+    try:
+        yield server
+    finally:
+        server.close()
@@ -0,0 +1,175 @@
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+import downloader
+import httppool
+import integrity
+from conftest import RangeServer
+
+
+def test_ranged_download_matches_the_remote_file(http_server, tmp_path):
+    http_server.data = os.urandom(3 * 1024 * 1024 + 123)
+    dest = downloader.download_path_for(http_server.url, str(tmp_path))
+    assert os.path.basename(dest) == 'Season Archive.zip'
+
+    seen = []
+    result = downloader.download_file(http_server.url, dest, progress=lambda done, total: seen.append((done, total)))
+
+    with open(dest, 'rb') as f:
+        assert f.read() == http_server.data
+    assert not os.path.exists(dest + downloader.JOURNAL_SUFFIX)
+    assert result.digest
+    assert seen[-1] == (len(http_server.data), len(http_server.data))
+    assert all(rng is not None for rng in http_server.requests)
+
+
+def test_server_without_ranges_gets_a_single_request(http_server, tmp_path):
+    http_server.data = os.urandom(1024 * 1024)
+    http_server.ranges = False
+    dest = str(tmp_path / 'a.zip')
+
+    downloader.download_file(http_server.url, dest)
+
+    with open(dest, 'rb') as f:
+        assert f.read() == http_server.data
+    assert http_server.requests == [None]
+
+
+def test_interrupted_download_resumes_from_the_journal(http_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(downloader, 'JOURNAL_FLUSH_BYTES', 64 * 1024)
+    # a resume keeps whole hash blocks, so each segment needs more than one
+    http_server.data = os.urandom(6 * integrity.HASH_BLOCK_SIZE)
+    http_server.budget = 5 * integrity.HASH_BLOCK_SIZE
+    dest = str(tmp_path / 'a.zip')
+
+    with pytest.raises(downloader.DownloadError):
+        downloader.download_file(http_server.url, dest)
+    journal = downloader.RangeJournal.load(dest + downloader.JOURNAL_SUFFIX)
+    assert journal is not None and journal.blocks
+
+    http_server.budget = None
+    http_server.requests = []
+    downloader.download_file(http_server.url, dest)
+
+    with open(dest, 'rb') as f:
+        assert f.read() == http_server.data
+    # blocks that were on disk and verified are never asked for again
+    block = integrity.HASH_BLOCK_SIZE
+    for rng in http_server.requests:
+        start, end = (int(n) for n in rng[len('bytes='):].split('-'))
+        for index in journal.blocks:
+            assert end < index * block or start >= (index + 1) * block
+
+
+def test_changed_remote_file_is_downloaded_again(http_server, tmp_path):
+    http_server.data = os.urandom(2 * 1024 * 1024)
+    http_server.fail_after = 128 * 1024
+    dest = str(tmp_path / 'a.zip')
+    with pytest.raises(downloader.DownloadError):
+        downloader.download_file(http_server.url, dest)
+
+    http_server.fail_after = None
+    http_server.data = os.urandom(2 * 1024 * 1024)
+    http_server.etag = '"v2"'
+    downloader.download_file(http_server.url, dest)
+
+    with open(dest, 'rb') as f:
+        assert f.read() == http_server.data
+
+
+def test_lower_limit_closes_connections_mid_segment(http_server, tmp_path, monkeypatch):
+    # once the controller drops to one connection, the other workers must
+    # hand their segments back instead of finishing them
+    http_server.data = os.urandom(8 * 1024 * 1024)
+    http_server.delay = 0.01
+    dropped = []
+
+    class DropToOne(downloader.ConcurrencyController):
+        def on_sample(self, rate):
+            self.limit = self.maximum = 1
+            if not dropped:
+                dropped.append(time.monotonic())
+
+    monkeypatch.setattr(downloader, 'ConcurrencyController', DropToOne)
+    monkeypatch.setattr(downloader, 'SAMPLE_SECONDS', 0.2)
+    peak = [0]
+    finished = threading.Event()
+
+    def watch():
+        while not finished.wait(0.02):
+            # a worker notices the lower limit on its next read
+            if dropped and time.monotonic() - dropped[0] > 0.3:
+                peak[0] = max(peak[0], http_server.active)
+
+    watcher = threading.Thread(target=watch)
+    watcher.start()
+    dest = str(tmp_path / 'a.zip')
+    try:
+        downloader.download_file(http_server.url, dest)
+    finally:
+        finished.set()
+        watcher.join()
+
+    with open(dest, 'rb') as f:
+        assert f.read() == http_server.data
+    assert dropped
+    assert http_server.max_active > 1
+    assert peak[0] <= 1
+
+
+def test_pool_falls_back_when_the_cached_redirect_is_gone(http_server):
+    http_server.data = os.urandom(4096)
+    pool = httppool.ConnectionPool(timeout=5)
+    # a port nothing listens on, as if the data node had gone away
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        dead = f'http://127.0.0.1:{s.getsockname()[1]}/gone.zip'
+    pool._redirects[http_server.url] = dead
+
+    with pool.request('GET', http_server.url) as resp:
+        assert resp.read() == http_server.data
+    assert http_server.url not in pool._redirects
+
+    for _ in range(3):
+        with pool.request('GET', http_server.url, headers={'Range': 'bytes=0-99'}) as resp:
+            resp.read()
+    pool.close()
+    stats = pool.stats()
+    # closed connections are counted, not kept
+    assert stats['connections'] == [] and not pool._live
+    assert stats['requests'] == 4
+    assert stats['bytes_read'] == len(http_server.data) + 300
+
+
+def test_mirrors_share_the_download_and_a_broken_one_is_dropped(http_server, tmp_path):
+    data = os.urandom(6 * 1024 * 1024)
+    fast = http_server
+    slow = RangeServer()
+    broken = RangeServer()
+    try:
+        for server in (fast, slow, broken):
+            server.data = data
+        # per 64 KiB chunk: about 13 and 6 MB/s, close enough that both stay in use
+        fast.delay = 0.005
+        slow.delay = 0.01
+        # answers HEAD like the others but drops every body
+        broken.fail_after = 0
+        dest = str(tmp_path / 'a.zip')
+
+        result = downloader.download_file(fast.url, dest, mirrors=[slow.url, broken.url])
+
+        with open(dest, 'rb') as f:
+            assert f.read() == data
+        taken = {src['url']: src['bytes'] for src in result.sources}
+        assert taken[fast.url] > 0 and taken[slow.url] > 0
+        assert taken[fast.url] > taken[slow.url]
+        # left out when its tail sample failed, before any range was assigned
+        assert broken.url not in taken
+        assert sum(taken.values()) == len(data)
+    finally:
+        slow.close()
+        broken.close()
@@ -0,0 +1,143 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+import downloader
+import extractor
+import integrity
+from remotezip import RemoteZip
+
+LAYOUT = [(r'^Game/', '')]
+
+
+def _zip_bytes(members, compression=zipfile.ZIP_DEFLATED):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', compression) as z:
+        for name, data in members.items():
+            z.writestr(name, data)
+    return buf.getvalue()
+
+
+def _members(count=40, size=200 * 1024):
+    members = {f'Game/data/{n:03d}.bin': os.urandom(size // 2) + bytes([n]) * (size // 2) for n in range(count)}
+    members['Game/Game.exe'] = os.urandom(64 * 1024)
+    members['Extras/notes.txt'] = b'notes\n' * 100
+    return members
+
+
+def _assert_extracted(target, members):
+    for name, data in members.items():
+        path = os.path.join(target, *extractor.apply_layout(LAYOUT, name).split('/'))
+        with open(path, 'rb') as f:
+            assert f.read() == data, name
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_extract_all_applies_the_layout(tmp_path, workers):
+    members = _members(count=8)
+    archive = tmp_path / 'a.zip'
+    archive.write_bytes(_zip_bytes(members))
+    target = str(tmp_path / 'out')
+
+    result = extractor.extract_all(str(archive), target, workers=workers, layout=LAYOUT)
+
+    _assert_extracted(target, members)
+    assert result.find('game.exe') == 'Game.exe'
+    assert not os.path.exists(os.path.join(target, 'Game'))
+    assert result.total_bytes == sum(len(data) for data in members.values())
+
+
+def test_pipelined_extraction_while_downloading(http_server, tmp_path):
+    members = _members(count=90)
+    http_server.data = _zip_bytes(members)
+    assert len(http_server.data) > 2 * integrity.HASH_BLOCK_SIZE
+    target = str(tmp_path / 'out')
+    with RemoteZip(http_server.url) as rz:
+        pipeline = extractor.PipelinedExtractor(str(tmp_path / 'a.zip'), target, rz.infolist(),
+                                                rz.central_directory(), LAYOUT)
+
+    downloader.download_file(http_server.url, str(tmp_path / 'a.zip'), on_block=pipeline.block_done)
+    result = pipeline.finish()
+
+    _assert_extracted(target, members)
+    assert len(result.timings) == len(members)
+
+
+@pytest.mark.parametrize('prefix, comment', [(b'', b''), (b'self-extractor stub', b'comment ' * 1000)])
+def test_remote_zip_finds_the_central_directory(http_server, prefix, comment):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('a.txt', b'a' * 5000)
+        z.writestr('b.txt', b'b' * 10)
+        z.comment = comment
+    http_server.data = prefix + buf.getvalue()
+
+    with RemoteZip(http_server.url) as rz:
+        offset, tail = rz.central_directory()
+        assert offset == http_server.data.find(b'PK\x01\x02')
+        assert tail == http_server.data[offset:]
+        assert rz.read('a.txt') == b'a' * 5000
+        assert rz.member_extent('b.txt')[1] == offset
+
+
+def test_remote_member_stream_does_not_bound_later_reads(http_server):
+    members = {f'{n}.bin': os.urandom(100 * 1024) for n in range(3)}
+    http_server.data = _zip_bytes(members, zipfile.ZIP_STORED)
+
+    with RemoteZip(http_server.url) as rz:
+        with rz.open('0.bin') as f:
+            assert f.read(10) == members['0.bin'][:10]
+        # a read past the first member after it was closed is one request
+        # for what was asked, not a run of requests clamped to that member
+        rz.reader.seek(0)
+        before = rz.reader.requests
+        assert rz.reader.read(250 * 1024) == http_server.data[:250 * 1024]
+        assert rz.reader.requests == before + 1
+
+
+@pytest.mark.parametrize('compression', [zipfile.ZIP_DEFLATED, zipfile.ZIP_BZIP2, zipfile.ZIP_LZMA])
+def test_member_read_before_its_data_arrived_is_retried(tmp_path, compression):
+    # the local header is on disk but the data is still the preallocated
+    # zeros: the decompressor fails, and finish() must try that member again
+    payload = os.urandom(100 * 1024) + b'a' * 300 * 1024
+    data = _zip_bytes({'m.bin': payload}, compression)
+    with zipfile.ZipFile(io.BytesIO(data)) as z:
+        infos = z.infolist()
+        start_dir = z.start_dir
+    archive = tmp_path / 'a.zip'
+    header = 30 + len('m.bin')
+    archive.write_bytes(data[:header] + bytes(len(data) - header))
+    target = tmp_path / 'out'
+    pipeline = extractor.PipelinedExtractor(str(archive), str(target), infos, (start_dir, data[start_dir:]),
+                                            block_size=64 * 1024)
+
+    pipeline.block_done(0, len(data))
+    for future in pipeline._futures:
+        future.result()
+    archive.write_bytes(data)
+    pipeline.finish()
+
+    assert (target / 'm.bin').read_bytes() == payload
+
+
+def test_member_still_damaged_at_the_end_raises(tmp_path):
+    data = _zip_bytes({'m.bin': os.urandom(1000) + b'b' * 100000})
+    with zipfile.ZipFile(io.BytesIO(data)) as z:
+        infos = z.infolist()
+        start_dir = z.start_dir
+    # the member's data is zeros even in the finished archive
+    archive = tmp_path / 'a.zip'
+    header = 30 + len('m.bin')
+    archive.write_bytes(data[:header] + bytes(start_dir - header) + data[start_dir:])
+    pipeline = extractor.PipelinedExtractor(str(archive), str(tmp_path / 'out'), infos,
+                                            (start_dir, data[start_dir:]), block_size=64 * 1024)
+    pipeline.block_done(0, len(data))
+
+    with pytest.raises(zipfile.BadZipFile):
+        pipeline.finish()
+
+
+def test_windows_names_are_sanitized():
+    assert extractor._sanitize_windows_name('Saves\\a:b?.sav \\trailing. \\c', '\\') == 'Saves\\a_b_.sav\\trailing\\c'
@@ -0,0 +1,171 @@
+import io
+import json
+import os
+import zipfile
+
+import pytest
+
+import installer
+import settings
+from archive_cache import ArchiveCache
+from install_manifest import InstallManifest
+from remotezip import RemoteZip
+
+# the Season 2 archive's shape: the game several folders deep, plus files
+# next to it; the layout rules bring them all up to the install folder
+GAME_DIR = 'S2/Minecraft.Story.Mode.Season.Two/Minecraft Story Mode Season Two/'
+MEMBERS = {
+    GAME_DIR + 'Minecraft2.exe': os.urandom(300 * 1024),
+    GAME_DIR + 'Archives/MC2_pc_Menu.ttarch2': os.urandom(600 * 1024) + b'menu' * 100000,
+    GAME_DIR + 'Archives/MC2_pc_Ep1.ttarch2': b'episode one ' * 80000,
+    'S2/readme.txt': b'read me\n' * 1000,
+    'S2/Minecraft.Story.Mode.Season.Two/notes.txt': b'notes\n' * 100,
+}
+
+
+def _season_zip():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as z:
+        for name, data in MEMBERS.items():
+            z.writestr(name, data)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def season(http_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'MANIFEST_PATHS', [])
+    monkeypatch.setattr(settings, 'LEARNED_MANIFESTS_PATH', str(tmp_path / 'manifests.json'))
+    http_server.data = _season_zip()
+    return dict(settings.SEASONS[2], url=http_server.url)
+
+
+@pytest.fixture
+def installed(season, tmp_path):
+    target = str(tmp_path / 'S2')
+    exe = installer.install_season(season, target, ArchiveCache(str(tmp_path / 'cache')))
+    return target, exe
+
+
+def _infos(season):
+    with RemoteZip(season['url']) as rz:
+        return rz.infolist()
+
+
+def test_install_applies_the_layout(season, installed, http_server):
+    target, exe = installed
+    assert exe == os.path.join(target, 'Minecraft2.exe')
+    with open(os.path.join(target, 'Archives', 'MC2_pc_Ep1.ttarch2'), 'rb') as f:
+        assert f.read() == MEMBERS[GAME_DIR + 'Archives/MC2_pc_Ep1.ttarch2']
+    assert sorted(os.listdir(target)) == ['.mcsm-install.json', 'Archives', 'Minecraft2.exe', 'notes.txt', 'readme.txt']
+    assert not os.path.exists(os.path.join(target, installer.PARTIAL_DIR))
+    # one probe serves the cache lookup, the pipeline and the download
+    assert http_server.heads == 1
+
+
+def test_member_paths_follow_the_extraction_layout(season, installed):
+    target, exe = installed
+    infos = _infos(season)
+    install = installer.find_install(exe)
+    assert installer.install_root(infos, season, exe, install) == target
+    # without a manifest the root is worked out from the executable's depth
+    assert installer.install_root(infos, season, exe) == target
+
+    pairs = installer.member_paths(infos, target, season['layout'])
+    paths = sorted(os.path.relpath(path, target) for _, path in pairs)
+    assert paths == sorted([
+        'Minecraft2.exe',
+        os.path.join('Archives', 'MC2_pc_Ep1.ttarch2'),
+        os.path.join('Archives', 'MC2_pc_Menu.ttarch2'),
+        'notes.txt',
+        'readme.txt',
+    ])
+    assert installer.verify_install(pairs) == []
+
+
+def test_verify_and_repair_fix_only_damaged_files(season, installed):
+    target, exe = installed
+    infos = _infos(season)
+    install = installer.find_install(exe)
+    root = installer.install_root(infos, season, exe, install)
+    pairs = installer.member_paths(infos, root, season['layout'])
+
+    menu = os.path.join(target, 'Archives', 'MC2_pc_Menu.ttarch2')
+    readme = os.path.join(target, 'readme.txt')
+    with open(menu, 'r+b') as f:
+        f.write(b'\0' * 16)
+    os.remove(readme)
+
+    changed = installer.changed_pairs(pairs, install)
+    assert sorted(path for _, path in changed) == sorted([menu, readme])
+    problems = installer.verify_install(changed)
+    assert sorted((path, reason) for _, path, reason in problems) == sorted([(menu, 'crc'), (readme, 'missing')])
+
+    with RemoteZip(season['url']) as rz:
+        assert installer.repair_install(rz, problems, root) == 2
+    assert installer.verify_install(pairs) == []
+    with open(menu, 'rb') as f:
+        assert f.read() == MEMBERS[GAME_DIR + 'Archives/MC2_pc_Menu.ttarch2']
+
+
+def test_repair_refuses_paths_outside_the_install(season, installed, tmp_path):
+    target, _ = installed
+    info = next(i for i in _infos(season) if i.filename.endswith('readme.txt'))
+    outside = str(tmp_path / 'elsewhere' / 'readme.txt')
+    problems = [(info, os.path.join(target, 'readme.txt'), 'missing'), (info, outside, 'missing')]
+
+    with RemoteZip(season['url']) as rz:
+        with pytest.raises(installer.InstallError):
+            installer.repair_install(rz, problems, target)
+    assert not os.path.exists(outside)
+
+
+def test_manifest_never_reaches_outside_the_install(tmp_path):
+    root = tmp_path / 'game'
+    (root / 'x').parent.mkdir()
+    # where ZipFile puts '../x' and '/y': inside the folder, not next to it
+    (root / 'x').write_bytes(b'inside')
+    (root / 'y').write_bytes(b'inside too')
+    outside = tmp_path / 'x'
+    outside.write_bytes(b'not ours')
+
+    manifest = InstallManifest.create(str(root), 'S1', ['../x', '/y'])
+    assert sorted(manifest.files) == ['x', 'y']
+    manifest.save()
+
+    # a hand-edited record is not trusted either
+    with open(manifest.path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    data['files']['../x'] = [8, 0]
+    data['exe'] = '../x'
+    with open(manifest.path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    loaded = InstallManifest.load(str(root))
+    assert '../x' not in loaded.files and loaded.exe is None
+    with pytest.raises(ValueError):
+        loaded.full_path('../x')
+
+    assert loaded.uninstall() == (2, [])
+    assert outside.read_bytes() == b'not ours'
+
+
+def test_uninstall_keeps_a_record_of_files_it_could_not_remove(installed, monkeypatch):
+    target, exe = installed
+    install = installer.find_install(exe)
+    total = len(install.files)
+    real_remove = os.remove
+
+    def remove(path):
+        if path == exe:
+            raise PermissionError(13, "file is in use", path)
+        real_remove(path)
+    monkeypatch.setattr(os, 'remove', remove)
+
+    removed, failed = install.uninstall()
+    assert removed == total - 1
+    assert [name for name, _ in failed] == ['Minecraft2.exe']
+    left = installer.find_install(exe)
+    assert sorted(left.files) == ['Minecraft2.exe'] and left.exe == 'Minecraft2.exe'
+
+    monkeypatch.setattr(os, 'remove', real_remove)
+    assert left.uninstall() == (1, [])
+    assert not os.path.exists(target)
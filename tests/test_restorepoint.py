@@ -0,0 +1,92 @@
+import os
+import zipfile
+
+import pytest
+
+import restorepoint
+import saves
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def saves_dir(tmp_path):
+    root = tmp_path / 'saves'
+    _write(str(root / 'slot0' / 'prefs.prop'), b'original slot 0')
+    _write(str(root / 'slot1' / 'prefs.prop'), b'original slot 1')
+    return root
+
+
+@pytest.fixture
+def backup(tmp_path):
+    path = str(tmp_path / 'backup.zip')
+    with zipfile.ZipFile(path, 'w') as z:
+        z.writestr('slot0/prefs.prop', b'imported slot 0')
+        z.writestr('slot1/prefs.prop', b'original slot 1')
+        z.writestr('slot2/new/prefs.prop', b'imported slot 2')
+    return path
+
+
+def _no_reflink(monkeypatch):
+    monkeypatch.setattr(restorepoint, 'fcntl', None)
+
+
+def _no_links(monkeypatch):
+    _no_reflink(monkeypatch)
+
+    def link(src, dst):
+        raise OSError("links not supported")
+    monkeypatch.setattr(os, 'link', link)
+
+
+@pytest.mark.parametrize('limit, method', [(None, None), (_no_reflink, 'hardlink'), (_no_links, 'copy')])
+def test_undo_puts_the_original_saves_back(saves_dir, backup, monkeypatch, limit, method):
+    if limit is not None:
+        limit(monkeypatch)
+
+    assert saves.import_saves(str(backup), str(saves_dir)) == (2, 1, 3)
+    assert _read(saves_dir / 'slot0' / 'prefs.prop') == b'imported slot 0'
+    point = restorepoint.RestorePoint.load(str(saves_dir))
+    assert point.replaced == ['slot0/prefs.prop'] and point.added == ['slot2/new/prefs.prop']
+    if method is not None:
+        assert point.methods == {method: 1}
+    # the game keeps writing in place after the import
+    _write(str(saves_dir / 'slot1' / 'prefs.prop'), b'played on slot 1')
+
+    assert saves.undo_last_import(str(saves_dir)) == 2
+
+    assert _read(saves_dir / 'slot0' / 'prefs.prop') == b'original slot 0'
+    assert _read(saves_dir / 'slot1' / 'prefs.prop') == b'played on slot 1'
+    assert not os.path.exists(saves_dir / 'slot2')
+    assert not os.path.exists(restorepoint.restore_dir(str(saves_dir)))
+    assert saves.undo_last_import(str(saves_dir)) is None
+
+
+def test_failed_import_is_rolled_back(saves_dir, backup, monkeypatch):
+    written = []
+    real_write = saves._write_member
+
+    def write_member(z, info, dst):
+        if written:
+            raise OSError("disk full")
+        real_write(z, info, dst)
+        written.append(dst)
+    monkeypatch.setattr(saves, '_write_member', write_member)
+
+    with pytest.raises(OSError):
+        saves.import_saves(str(backup), str(saves_dir))
+
+    assert written
+    assert _read(saves_dir / 'slot0' / 'prefs.prop') == b'original slot 0'
+    assert _read(saves_dir / 'slot1' / 'prefs.prop') == b'original slot 1'
+    assert not os.path.exists(saves_dir / 'slot2')
+    assert restorepoint.RestorePoint.load(str(saves_dir)) is None
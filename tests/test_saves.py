@@ -0,0 +1,51 @@
+import os
+import zipfile
+
+import saves
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def test_import_rewrites_only_the_changed_files(tmp_path):
+    saves_dir = tmp_path / 'saves'
+    same = str(saves_dir / 'slot0' / 'prefs.prop')
+    changed = str(saves_dir / 'slot1' / 'prefs.prop')
+    _write(same, b'same slot ' * 300)
+    _write(changed, b'old slot ' * 300)
+    backup = str(tmp_path / 'backup.zip')
+    with zipfile.ZipFile(backup, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('slot0/prefs.prop', b'same slot ' * 300)
+        # same size as the file on disk, so only the CRC tells them apart
+        z.writestr('slot1/prefs.prop', b'new slot ' * 300)
+        z.writestr('slot2/prefs.prop', b'added slot')
+    before = os.stat(same)
+    asked = []
+
+    result = saves.import_saves(backup, str(saves_dir), confirm_overwrite=lambda rels: asked.append(rels) or True)
+
+    assert result == (2, 1, 3)
+    assert asked == [[os.path.join('slot1', 'prefs.prop')]]
+    # the identical file was not written: same inode, same mtime
+    after = os.stat(same)
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+    with open(changed, 'rb') as f:
+        assert f.read() == b'new slot ' * 300
+    with open(saves_dir / 'slot2' / 'prefs.prop', 'rb') as f:
+        assert f.read() == b'added slot'
+
+
+def test_declined_import_changes_nothing(tmp_path):
+    saves_dir = tmp_path / 'saves'
+    path = str(saves_dir / 'prefs.prop')
+    _write(path, b'mine')
+    backup = str(tmp_path / 'backup.zip')
+    with zipfile.ZipFile(backup, 'w') as z:
+        z.writestr('prefs.prop', b'theirs')
+
+    assert saves.import_saves(backup, str(saves_dir), confirm_overwrite=lambda rels: False) is None
+    with open(path, 'rb') as f:
+        assert f.read() == b'mine'
@@ -0,0 +1,159 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import zipfile
+
+import pytest
+
+import snapshots
+
+LABEL = 's1_saves'
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+@pytest.fixture
+def saves(tmp_path):
+    root = tmp_path / 'saves'
+    for slot in range(3):
+        _write(str(root / f'slot{slot}' / 'prefs.prop'), os.urandom(2000))
+    _write(str(root / 'shared.prop'), b'shared' * 100)
+    return root
+
+
+@pytest.fixture
+def store(tmp_path):
+    return snapshots.SnapshotStore(str(tmp_path / 'store'))
+
+
+def _blob_count(store):
+    return sum(len(names) for _, _, names in os.walk(store.blob_dir))
+
+
+def _missing_blobs(store):
+    return [rel for snap in store.list(LABEL) for rel, (digest, _, _) in snap.files.items()
+            if not os.path.exists(store.blob_path(digest))]
+
+
+def test_unchanged_files_are_not_read_again(store, saves):
+    first, stats = store.snapshot(LABEL, str(saves))
+    assert (stats['files'], stats['hashed'], stats['stored']) == (4, 4, 4)
+
+    _, stats = store.snapshot(LABEL, str(saves))
+    assert stats['unchanged'] and stats['hashed'] == 0
+
+    _write(str(saves / 'slot1' / 'prefs.prop'), os.urandom(2000))
+    second, stats = store.snapshot(LABEL, str(saves))
+    assert (stats['hashed'], stats['stored']) == (1, 1)
+    assert second.id != first.id
+    assert _blob_count(store) == 5
+
+
+def test_restore_and_export_round_trip(store, saves, tmp_path):
+    snap, _ = store.snapshot(LABEL, str(saves))
+    originals = {rel: (saves / rel).read_bytes() for rel in snap.files}
+
+    restored = tmp_path / 'restored'
+    assert store.restore(snap, str(restored)) == len(originals)
+    for rel, data in originals.items():
+        assert (restored / rel).read_bytes() == data
+
+    dest = str(tmp_path / 'export.zip')
+    store.export_zip(snap, dest)
+    with zipfile.ZipFile(dest) as z:
+        assert z.testzip() is None
+        assert {name: z.read(name) for name in z.namelist()} == originals
+
+
+def test_delete_frees_only_unshared_blobs(store, saves):
+    first, _ = store.snapshot(LABEL, str(saves))
+    _write(str(saves / 'shared.prop'), b'changed')
+    store.snapshot(LABEL, str(saves))
+    # prune keeps blobs written since it started, so age them
+    for root, _, names in os.walk(store.blob_dir):
+        for name in names:
+            os.utime(os.path.join(root, name), (time.time() - 60, time.time() - 60))
+
+    freed = store.delete(first)
+
+    assert freed == len(b'shared' * 100)
+    assert _blob_count(store) == 4
+    assert _missing_blobs(store) == []
+
+
+def test_prune_leaves_incoming_and_fresh_files(store, saves):
+    store.snapshot(LABEL, str(saves))
+    old = time.time() - 60
+    stray = store.blob_path('ab' * 32)
+    fresh = store.blob_path('cd' * 32)
+    incoming = os.path.join(store.blob_dir, snapshots.INCOMING_PREFIX + '1-2-3')
+    # left behind by a writer that crashed before renaming it into place
+    orphan = os.path.join(store.blob_dir, snapshots.INCOMING_PREFIX + '4-5-6')
+    for path in (stray, fresh, incoming, orphan):
+        _write(path, b'x')
+    os.utime(stray, (old, old))
+    os.utime(incoming, (old, old))
+    abandoned = time.time() - snapshots.INCOMING_MAX_AGE - 60
+    os.utime(orphan, (abandoned, abandoned))
+    # as if stored by a writer while the prune was walking the blobs
+    later = time.time() + 60
+    os.utime(fresh, (later, later))
+
+    assert store.prune() == 2
+
+    assert not os.path.exists(stray)
+    assert not os.path.exists(orphan)
+    assert os.path.exists(fresh)
+    assert os.path.exists(incoming)
+
+
+def test_prune_racing_snapshots_never_drops_a_referenced_blob(store, saves):
+    errors = []
+    stop = threading.Event()
+
+    def snapshot_loop():
+        try:
+            for n in range(40):
+                _write(str(saves / 'slot0' / 'prefs.prop'), os.urandom(2000) + bytes([n]))
+                store.snapshot(LABEL, str(saves), auto=True)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            stop.set()
+
+    def prune_loop():
+        try:
+            while not stop.is_set():
+                store.apply_retention(LABEL, keep_last=2, keep_days=0)
+                store.prune()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=snapshot_loop), threading.Thread(target=prune_loop)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert _missing_blobs(store) == []
+
+
+def test_store_lock_excludes_other_processes(store, tmp_path):
+    marker = tmp_path / 'locked'
+    child = ("import sys; sys.path.insert(0, sys.argv[1]); import snapshots\n"
+             "with snapshots.SnapshotStore(sys.argv[2]).lock():\n"
+             "    open(sys.argv[3], 'w').close()\n")
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with store.lock():
+        proc = subprocess.Popen([sys.executable, '-c', child, repo, store.root, str(marker)])
+        time.sleep(1.0)
+        assert proc.poll() is None and not marker.exists()
+    assert proc.wait(timeout=30) == 0
+    assert marker.exists()
@@ -0,0 +1,128 @@
+import os
+import random
+import shutil
+import subprocess
+import time
+import zipfile
+
+import pytest
+
+import zipwriter
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / 'src'
+    files = {
+        'slot0/prefs.prop': b'prefs ' * 50000,
+        'slot0/random.bin': os.urandom(300 * 1024),
+        'slot1/mixed.bin': b''.join(os.urandom(64) + bytes(range(256)) * 8 for _ in range(3000)),
+        'empty.prop': b'',
+        'spécial/über.sav': b'unicode name ' * 100,
+    }
+    # a file spanning several CHUNK pieces
+    files['big.bin'] = b''.join(os.urandom(100) + b'z' * 4000 for _ in range(3 * zipwriter.CHUNK // 4000))
+    for rel, data in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    members = [(str(root / rel), rel) for rel in files]
+    return files, members
+
+
+def _check(dest, files):
+    with zipfile.ZipFile(dest) as z:
+        assert z.testzip() is None
+        assert z.namelist() == sorted(files)
+        for name, data in files.items():
+            assert z.read(name) == data
+        return {info.filename: info for info in z.infolist()}
+
+
+@pytest.mark.parametrize('preset', sorted(zipwriter.PRESETS))
+def test_round_trip_is_identical_for_any_worker_count(tree, tmp_path, monkeypatch, preset):
+    monkeypatch.setattr(zipwriter, 'MIN_PARALLEL_BYTES', 0)
+    files, members = tree
+    outputs = []
+    for workers in (1, 4):
+        dest = str(tmp_path / f'out{workers}.zip')
+        result = zipwriter.write_zip(dest, members, workers=workers, preset=preset)
+        infos = _check(dest, files)
+        assert result.files == len(files)
+        assert result.file_bytes == sum(len(data) for data in files.values())
+        with open(dest, 'rb') as f:
+            outputs.append(f.read())
+    assert outputs[0] == outputs[1]
+    if preset != 'max':
+        # save backups have to open in Explorer and Info-ZIP
+        assert {info.compress_type for info in infos.values()} <= {zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED}
+    assert infos['slot0/random.bin'].compress_type == zipfile.ZIP_STORED
+    assert infos['slot0/prefs.prop'].compress_type != zipfile.ZIP_STORED
+
+
+@pytest.mark.skipif(zipwriter.bz2 is None or zipwriter.lzma is None, reason="needs bz2 and lzma")
+def test_max_preset_picks_a_codec_per_file(tmp_path):
+    rng = random.Random(1)
+    words = [bytes(rng.choice(b'abcdefghij') for _ in range(rng.randint(2, 8))) for _ in range(500)]
+    files = {
+        # short: the bzip2 and LZMA headers cost more than they save
+        'short.prop': b'hello world hello world',
+        # word soup: bzip2's block sort does best
+        'text.txt': b' '.join(rng.choice(words) for _ in range(20000)),
+        # one random block repeated: LZMA encodes the repeats most cheaply
+        'blocks.bin': rng.randbytes(2000) * 20,
+        'random.bin': rng.randbytes(40000),
+    }
+    for rel, data in files.items():
+        (tmp_path / rel).write_bytes(data)
+    chosen = {rel: zipwriter.choose_codec(str(tmp_path / rel), len(data), 'max').name for rel, data in files.items()}
+    assert chosen == {'short.prop': 'deflate-9', 'text.txt': 'bzip2-9', 'blocks.bin': 'lzma', 'random.bin': 'stored'}
+
+    dest = str(tmp_path / 'out.zip')
+    result = zipwriter.write_zip(dest, [(str(tmp_path / rel), rel) for rel in files], preset='max')
+    infos = _check(dest, files)
+    assert {info.compress_type for info in infos.values()} == {
+        zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED, zipfile.ZIP_BZIP2, zipfile.ZIP_LZMA}
+    assert sorted(result.codecs) == ['bzip2-9', 'deflate-9', 'lzma', 'stored']
+
+
+def test_timestamps_and_names(tree, tmp_path):
+    files, members = tree
+    mtime = time.mktime((2021, 6, 5, 4, 3, 2, 0, 0, -1))
+    members = [(path, rel, int(mtime * 1e9)) for path, rel in members]
+    dest = str(tmp_path / 'out.zip')
+    zipwriter.write_zip(dest, members)
+
+    infos = _check(dest, files)
+    assert {info.date_time for info in infos.values()} == {(2021, 6, 5, 4, 3, 2)}
+    assert infos['spécial/über.sav'].flag_bits & zipwriter.FLAG_UTF8
+    assert not infos['empty.prop'].flag_bits & zipwriter.FLAG_UTF8
+
+
+def test_zip64_records(tree, tmp_path, monkeypatch):
+    # a tiny limit sends every member and the central directory through the
+    # zip64 code paths without writing gigabytes
+    monkeypatch.setattr(zipwriter, 'ZIP64_LIMIT', 1000)
+    files, members = tree
+    dest = str(tmp_path / 'out.zip')
+    zipwriter.write_zip(dest, members, workers=2)
+
+    _check(dest, files)
+    with open(dest, 'rb') as f:
+        data = f.read()
+    assert b'PK\x06\x06' in data and b'PK\x06\x07' in data
+
+
+@pytest.mark.skipif(shutil.which('unzip') is None, reason="needs Info-ZIP unzip")
+def test_info_zip_reads_the_archive(tree, tmp_path):
+    files, members = tree
+    dest = str(tmp_path / 'out.zip')
+    zipwriter.write_zip(dest, members, preset='smallest')
+
+    assert subprocess.run(['unzip', '-tq', dest], capture_output=True).returncode == 0
+
+
+def test_unknown_preset(tree, tmp_path):
+    with pytest.raises(ValueError):
+        zipwriter.write_zip(str(tmp_path / 'out.zip'), tree[1], preset='tiny')
+    assert not os.path.exists(tmp_path / 'out.zip')
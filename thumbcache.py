@@ -0,0 +1,111 @@
+"""On-disk cache of the launcher's banners and icons, already scaled.
+
+Scaling the full-size PNGs in ``assets`` (LANCZOS with Pillow, subsample
+without) gives the same result on every start. The scaled images are kept
+as PNG files, which Tk's own ``PhotoImage`` reads directly, so a warm start
+decodes small images and never needs Pillow.
+
+Each entry is named ``<path hash>-<W>x<H>-<version hash>.png``. The target
+box is W x H, with 0 meaning "any width". The version hash covers the
+source's mtime and size, so an edited asset misses the cache. Storing a new
+version removes the old ones for the same source and box. A size cap drops
+the least recently used entries (hits touch the file's mtime).
+"""
+import hashlib
+import os
+import threading
+
+DEFAULT_MAX_BYTES = 32 * 1024 ** 2
+
+
+class ThumbCache:
+    """Scaled copies of image files under ``root``, capped at ``max_bytes``."""
+
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def _names(self, src, width, height):
+        """Return ``(prefix, filename)`` for ``src`` scaled into width x height, or None if it is missing."""
+        src = os.path.abspath(src)
+        try:
+            st = os.stat(src)
+        except OSError:
+            return None
+        path_hash = hashlib.sha1(os.path.normcase(src).encode('utf-8', 'surrogateescape')).hexdigest()[:16]
+        version = hashlib.sha1(f'{st.st_mtime_ns}:{st.st_size}'.encode('ascii')).hexdigest()[:16]
+        prefix = f'{path_hash}-{int(width)}x{int(height)}-'
+        return prefix, prefix + version + '.png'
+
+    def get(self, src, width, height):
+        """Return the cached file for ``src`` scaled into width x height, or None."""
+        names = self._names(src, width, height)
+        if names is None:
+            return None
+        path = os.path.join(self.root, names[1])
+        try:
+            # the mtime doubles as the last-used time for eviction
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def store(self, src, width, height, write):
+        """Add an entry by calling ``write(path)`` to save the scaled image as PNG.
+
+        Returns the entry's path, or None if ``src`` is gone or writing
+        failed. Errors are swallowed: the cache only ever makes things
+        faster.
+        """
+        names = self._names(src, width, height)
+        if names is None:
+            return None
+        prefix, name = names
+        path = os.path.join(self.root, name)
+        tmp = os.path.join(self.root, f'.{name}.{os.getpid()}-{threading.get_ident()}.tmp')
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            write(tmp)
+            os.replace(tmp, path)
+        except Exception:
+            _remove(tmp)
+            return None
+        self._evict(prefix, keep=name)
+        return path
+
+    def _evict(self, prefix, keep):
+        entries = []
+        try:
+            it = os.scandir(self.root)
+        except OSError:
+            return
+        with it:
+            for entry in it:
+                if entry.name == keep or not entry.name.endswith('.png'):
+                    continue
+                if entry.name.startswith(prefix):
+                    # an older version of the image just stored
+                    _remove(entry.path)
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        try:
+            total = os.path.getsize(os.path.join(self.root, keep))
+        except OSError:
+            total = 0
+        total += sum(size for _, size, _ in entries)
+        entries.sort()
+        while total > self.max_bytes and entries:
+            _, size, path = entries.pop(0)
+            _remove(path)
+            total -= size
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,518 @@
+"""Benchmark and fault-injection harness for the season downloader.
+
+Starts local HTTP servers (in child processes, so they do not skew the
+client's memory and descriptor counts) that serve a synthetic zip of any
+size below 4 GiB. The zip is generated on the fly from a seeded pattern and
+never stored. Each scenario configures the servers - range support, HEAD,
+latency, bandwidth caps, connection resets, truncated bodies, several
+mirrors - and drives ``downloader.download_file`` the way the launcher does,
+calling it again after a failure as a user clicking Download would.
+
+Reported per scenario: throughput, time to first byte, peak RSS, peak and
+leftover open file descriptors, attempts needed, faults injected by the
+server, connection pool stats and whether the result is byte-identical.
+
+Usage::
+
+    python tools/bench_download.py --size 2G
+    python tools/bench_download.py --size 256M --scenario resets --scenario mirrors -o before.json
+
+Compare the JSON output of two commits to judge a change to the range logic.
+"""
+import argparse
+import bisect
+import http.server
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import downloader  # noqa: E402
+from httppool import ConnectionPool  # noqa: E402
+
+PATTERN_SIZE = 1024 * 1024
+LARGE_MEMBER_SIZE = 64 * 1024 * 1024
+SMALL_MEMBERS = 256
+SMALL_MEMBER_SIZE = 16 * 1024
+MAX_ZIP_SIZE = 0xFFFFFFFF - 64 * 1024 * 1024
+SEND_CHUNK = 256 * 1024
+SAMPLE_INTERVAL = 0.05
+
+# name -> list of server option dicts (the first server is the primary URL)
+SCENARIOS = {
+    'baseline': [{}],
+    'latency': [{'latency': 0.15}],
+    'bandwidth': [{'bandwidth': 40 * 1024 * 1024}],
+    'no-ranges': [{'ranges': False}],
+    'no-head': [{'head': False}],
+    'resets': [{'reset_prob': 0.25, 'max_faults': 25}],
+    'truncation': [{'truncate_prob': 0.25, 'max_faults': 25}],
+    'mirrors': [{'conn_bandwidth': 8 * 1024 * 1024}, {}, {'latency': 0.2, 'conn_bandwidth': 4 * 1024 * 1024}],
+}
+
+
+# -- synthetic zip -----------------------------------------------------------
+
+class SyntheticZip:
+    """A STORED zip whose bytes are computed from ``(size, seed)`` on demand."""
+
+    def __init__(self, size, seed=1):
+        rng = random.Random(seed)
+        pattern = rng.getrandbits(8 * PATTERN_SIZE).to_bytes(PATTERN_SIZE, 'little')
+        self._pattern = pattern + pattern
+        self._starts = []
+        self._parts = []
+        offset = 0
+        central = []
+        members = [(f'Game/data/small{i:04d}.bin', SMALL_MEMBER_SIZE) for i in range(SMALL_MEMBERS)]
+        members.append(('Game/Game.exe', SMALL_MEMBER_SIZE))
+        remaining = size - sum(s + 128 for _, s in members) - 64 * 1024
+        i = 0
+        while remaining > 0:
+            chunk = min(LARGE_MEMBER_SIZE, remaining)
+            members.append((f'Game/packs/pack{i:04d}.ttarch2', chunk))
+            remaining -= chunk + 128
+            i += 1
+        for index, (name, length) in enumerate(members):
+            shift = (index * 7919) % PATTERN_SIZE
+            crc = self._crc(shift, length)
+            encoded = name.encode('utf-8')
+            header = struct.pack('<4s5H3L2H', b'PK\x03\x04', 20, 0, 0, 0, 0x21, crc, length, length, len(encoded), 0) + encoded
+            self._add(offset, header)
+            central.append(struct.pack('<4s6H3L5H2L', b'PK\x01\x02', 20, 20, 0, 0, 0, 0x21, crc, length, length,
+                                       len(encoded), 0, 0, 0, 0, 0, offset) + encoded)
+            offset += len(header)
+            self._add(offset, (shift, length))
+            offset += length
+        cd = b''.join(central)
+        eocd = struct.pack('<4s4H2LH', b'PK\x05\x06', 0, 0, len(members), len(members), len(cd), offset, 0)
+        self._add(offset, cd + eocd)
+        self.size = offset + len(cd) + len(eocd)
+        self.members = len(members)
+
+    def _add(self, offset, part):
+        self._starts.append(offset)
+        self._parts.append(part)
+
+    def _crc(self, shift, length):
+        crc = 0
+        pos = 0
+        while pos < length:
+            n = min(PATTERN_SIZE, length - pos)
+            start = (shift + pos) % PATTERN_SIZE
+            crc = zlib.crc32(self._pattern[start:start + n], crc)
+            pos += n
+        return crc & 0xFFFFFFFF
+
+    def read(self, offset, n):
+        """Return up to ``n`` bytes at ``offset`` (shorter only at a part boundary or EOF)."""
+        i = bisect.bisect_right(self._starts, offset) - 1
+        part = self._parts[i]
+        rel = offset - self._starts[i]
+        if isinstance(part, bytes):
+            return part[rel:rel + n]
+        shift, length = part
+        n = min(n, length - rel, PATTERN_SIZE)
+        start = (shift + rel) % PATTERN_SIZE
+        return self._pattern[start:start + n]
+
+    def compare(self, path):
+        """Return the first offset where the file at ``path`` differs, or None if identical."""
+        if os.path.getsize(path) != self.size:
+            return min(os.path.getsize(path), self.size)
+        offset = 0
+        with open(path, 'rb') as f:
+            while offset < self.size:
+                expected = self.read(offset, SEND_CHUNK * 4)
+                got = f.read(len(expected))
+                if got != expected:
+                    return offset
+                offset += len(expected)
+        return None
+
+
+# -- server ------------------------------------------------------------------
+
+class TokenBucket:
+    def __init__(self, rate):
+        self.rate = rate
+        self.allowance = 0.0
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self, n):
+        with self.lock:
+            now = time.monotonic()
+            self.allowance = min(self.rate, self.allowance + (now - self.last) * self.rate)
+            self.last = now
+            self.allowance -= n
+            wait = -self.allowance / self.rate if self.allowance < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class FaultServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 64
+
+    def __init__(self, zipdata, options, seed):
+        super().__init__(('127.0.0.1', 0), BenchHandler)
+        self.zip = zipdata
+        self.opts = {'ranges': True, 'head': True, 'latency': 0.0, 'bandwidth': 0, 'conn_bandwidth': 0,
+                     'reset_prob': 0.0, 'truncate_prob': 0.0, 'max_faults': 0}
+        self.opts.update(options)
+        self.bucket = TokenBucket(self.opts['bandwidth']) if self.opts['bandwidth'] else None
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'connections': 0, 'heads': 0, 'gets': 0, 'range_gets': 0, 'bytes_sent': 0,
+                      'resets_injected': 0, 'truncations_injected': 0}
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    def pick_fault(self):
+        """Return ('reset'|'truncate'|None, fraction of the body to send first)."""
+        with self.lock:
+            faults = self.stats['resets_injected'] + self.stats['truncations_injected']
+            if faults >= self.opts['max_faults']:
+                return None, 1.0
+            roll = self.rng.random()
+            if roll < self.opts['reset_prob']:
+                self.stats['resets_injected'] += 1
+                return 'reset', self.rng.random()
+            if roll < self.opts['reset_prob'] + self.opts['truncate_prob']:
+                self.stats['truncations_injected'] += 1
+                return 'truncate', self.rng.random()
+        return None, 1.0
+
+
+class BenchHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    etag = '"bench-1"'
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.count('connections')
+
+    def do_HEAD(self):
+        srv = self.server
+        srv.count('heads')
+        if not srv.opts['head']:
+            self.send_response(405)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self._delay()
+        self.send_response(200)
+        self._entity_headers(srv.zip.size)
+        self.end_headers()
+
+    def do_GET(self):
+        srv = self.server
+        if self.path == '/_stats':
+            body = json.dumps(srv.stats).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        srv.count('gets')
+        size = srv.zip.size
+        start, end = 0, size - 1
+        status = 200
+        rng = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        if srv.opts['ranges'] and rng and rng.startswith('bytes=') and (if_range is None or if_range == self.etag):
+            first, _, last = rng[6:].partition('-')
+            if first:
+                start = int(first)
+                end = min(int(last), size - 1) if last else size - 1
+            else:
+                start = max(0, size - int(last))
+            if start >= size or start > end:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            status = 206
+            srv.count('range_gets')
+        self._delay()
+        self.send_response(status)
+        self._entity_headers(end - start + 1)
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        self.end_headers()
+
+        fault, fraction = srv.pick_fault()
+        stop = end + 1 if fault is None else start + int((end + 1 - start) * fraction)
+        conn_bucket = TokenBucket(srv.opts['conn_bandwidth']) if srv.opts['conn_bandwidth'] else None
+        pos = start
+        try:
+            while pos < stop:
+                data = srv.zip.read(pos, min(SEND_CHUNK, stop - pos))
+                if srv.bucket:
+                    srv.bucket.take(len(data))
+                if conn_bucket:
+                    conn_bucket.take(len(data))
+                self.wfile.write(data)
+                pos += len(data)
+                srv.count('bytes_sent', len(data))
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+            return
+        if fault == 'reset':
+            # abortive close: the client sees ECONNRESET
+            self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+            self.close_connection = True
+        elif fault == 'truncate':
+            self.wfile.flush()
+            self.connection.shutdown(socket.SHUT_WR)
+            self.close_connection = True
+
+    def _entity_headers(self, length):
+        self.send_header('Content-Length', str(length))
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('ETag', self.etag)
+        if self.server.opts['ranges']:
+            self.send_header('Accept-Ranges', 'bytes')
+
+    def _delay(self):
+        if self.server.opts['latency']:
+            time.sleep(self.server.opts['latency'])
+
+
+def serve(size, seed, options):
+    srv = FaultServer(SyntheticZip(size, seed), options, seed)
+    print(f"PORT {srv.server_address[1]}", flush=True)
+    srv.serve_forever()
+
+
+def start_server(size, seed, options):
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', json.dumps(options),
+                             '--size', str(size), '--seed', str(seed)], stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line.startswith('PORT '):
+        proc.kill()
+        raise RuntimeError("benchmark server failed to start")
+    return proc, f"http://127.0.0.1:{int(line.split()[1])}/Synthetic%20Season.zip"
+
+
+# -- client measurements -----------------------------------------------------
+
+def current_rss():
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except Exception:
+        return None
+
+
+def open_fds():
+    for d in ('/proc/self/fd', '/dev/fd'):
+        try:
+            return len(os.listdir(d))
+        except OSError:
+            continue
+    return None
+
+
+class Sampler(threading.Thread):
+    """Tracks peak RSS and open descriptors while a scenario runs."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak_rss = current_rss()
+        self.peak_fds = open_fds()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(SAMPLE_INTERVAL):
+            rss, fds = current_rss(), open_fds()
+            if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+                self.peak_rss = rss
+            if fds is not None and (self.peak_fds is None or fds > self.peak_fds):
+                self.peak_fds = fds
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def run_scenario(name, server_opts, size, seed, workdir, attempts, connections, expected):
+    procs = []
+    try:
+        urls = []
+        for i, opts in enumerate(server_opts):
+            proc, url = start_server(size, seed, opts)
+            procs.append(proc)
+            urls.append(url)
+        dest = os.path.join(workdir, f'{name}.zip')
+        downloader.discard_partial(dest)
+        baseline_fds = open_fds()
+        sampler = Sampler()
+        sampler.start()
+        first_byte = []
+        errors = []
+
+        def on_progress(done, total):
+            if done and not first_byte:
+                first_byte.append(time.monotonic())
+
+        pool = ConnectionPool(timeout=downloader.STALL_TIMEOUT)
+        result = None
+        t0 = time.monotonic()
+        tries = 0
+        try:
+            while tries < attempts and result is None:
+                tries += 1
+                try:
+                    result = downloader.download_file(urls[0], dest, progress=on_progress, max_connections=connections,
+                                                      pool=pool, mirrors=urls[1:])
+                except downloader.DownloadError as e:
+                    errors.append(str(e))
+        finally:
+            elapsed = time.monotonic() - t0
+            pool_stats = pool.stats()
+            pool.close()
+            sampler.stop()
+
+        server_stats = []
+        for url in urls:
+            try:
+                with urllib.request.urlopen(url.rsplit('/', 1)[0] + '/_stats', timeout=10) as resp:
+                    server_stats.append(json.loads(resp.read()))
+            except Exception as e:
+                server_stats.append({'error': str(e)})
+
+        mismatch = expected.compare(dest) if result is not None else None
+        report = {
+            'scenario': name,
+            'servers': server_opts,
+            'ok': result is not None and mismatch is None,
+            'attempts': tries,
+            'errors': errors,
+            'seconds': round(elapsed, 3),
+            'throughput_mib_s': round(expected.size / elapsed / 2 ** 20, 2) if result is not None else None,
+            'ttfb_ms': round((first_byte[0] - t0) * 1000, 1) if first_byte else None,
+            'peak_rss_mib': round(sampler.peak_rss / 2 ** 20, 1) if sampler.peak_rss else None,
+            'peak_fds': sampler.peak_fds,
+            'fds_before': baseline_fds,
+            'fds_after': open_fds(),
+            'first_mismatch': mismatch,
+            'pool': {k: v for k, v in pool_stats.items() if not isinstance(v, (list, dict))},
+            'sources': result.sources if result is not None else None,
+            'server': server_stats,
+        }
+        downloader.discard_partial(dest)
+        return report
+    finally:
+        for proc in procs:
+            proc.terminate()
+            try:
+                proc.wait(5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+            proc.stdout.close()
+
+
+def parse_size(text):
+    units = {'K': 2 ** 10, 'M': 2 ** 20, 'G': 2 ** 30}
+    text = text.strip().upper().rstrip('B').rstrip('I')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the downloader against local fault-injecting servers")
+    parser.add_argument('--size', default='2G', help="synthetic zip size, e.g. 512M or 3.5G (default 2G, max just under 4G)")
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS), help="scenario to run (repeatable; default all)")
+    parser.add_argument('--attempts', type=int, default=5, help="download attempts per scenario before giving up")
+    parser.add_argument('--connections', type=int, default=downloader.MAX_CONNECTIONS, help="max parallel connections")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workdir', help="where downloads are written (default: a temp dir)")
+    parser.add_argument('-o', '--output', help="write the JSON report here instead of stdout")
+    parser.add_argument('--serve', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    size = parse_size(args.size)
+    if size > MAX_ZIP_SIZE:
+        parser.error("--size must stay below 4 GiB (the synthetic zip does not use ZIP64)")
+    if args.serve is not None:
+        serve(size, args.seed, json.loads(args.serve))
+        return 0
+
+    names = args.scenario or list(SCENARIOS)
+    workdir = args.workdir or tempfile.mkdtemp(prefix='mcsm-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    print(f"Building {size / 2 ** 30:.2f} GiB synthetic zip...", file=sys.stderr)
+    expected = SyntheticZip(size, args.seed)
+    results = []
+    try:
+        for name in names:
+            print(f"[{name}] running", file=sys.stderr)
+            r = run_scenario(name, SCENARIOS[name], size, args.seed, workdir, args.attempts, args.connections, expected)
+            results.append(r)
+            print(f"[{name}] ok={r['ok']} attempts={r['attempts']} {r['throughput_mib_s']} MiB/s "
+                  f"ttfb={r['ttfb_ms']} ms rss={r['peak_rss_mib']} MiB fds={r['peak_fds']}/{r['fds_after']}",
+                  file=sys.stderr)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'tool': 'bench_download',
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'zip_size': expected.size,
+        'zip_members': expected.members,
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0 if all(r['ok'] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,514 @@
+"""Zip writer that picks a codec per file and compresses on a thread pool.
+
+Each file is sampled first (up to three 16 KiB slices) and stored with the
+codec that suits it under the chosen preset:
+
+- ``fastest``: deflate level 1
+- ``balanced``: deflate level 6
+- ``smallest``: deflate level 9
+- ``max``: the best of deflate 9, bzip2 and LZMA on the sample (opt-in)
+
+Under every preset, a file whose sample barely shrinks is stored
+uncompressed. The first three presets only write stored and deflated
+members, so their archives open in Windows Explorer and Info-ZIP ``unzip``.
+``max`` shrinks some saves further, but its bzip2 and LZMA members need
+7-Zip or Python's ``zipfile`` to open; it is never the default.
+
+``ZipFile.write`` compresses one file after another on a single core. Here
+the work runs on a thread pool (zlib, bz2 and lzma all release the GIL).
+Deflated files are cut into ``CHUNK``-sized pieces. Each piece is primed
+with the last 32 KiB of the piece before it, the way pigz does it, so even
+one large file spreads across cores and the ratio stays close to a single
+stream. bzip2 and LZMA streams cannot be split that way, so those files are
+compressed whole, one per job. Results are written back in order into one
+ordinary zip.
+
+Members are written sorted by name, with timestamps and attributes taken
+from the sources. The same tree and preset therefore always give the same
+archive, whatever the worker count. Trees smaller than
+``MIN_PARALLEL_BYTES`` are compressed on the calling thread because a pool
+would cost more than it saves.
+
+The archive's local headers, central directory and end records (with the
+zip64 variants) are written here from the format specification
+(APPNOTE.TXT), not through ``zipfile.ZipFile``. That way the writer relies
+only on public APIs and does not break when ``zipfile`` internals change
+between Python versions. ``zipfile`` is used only for its constants and
+``ZipInfo``, and to read archives back.
+"""
+import collections
+import os
+import struct
+import time
+import zipfile
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+
+try:
+    import bz2
+except ImportError:
+    bz2 = None
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+import events
+
+COMPRESS_WORKERS = min(8, os.cpu_count() or 4)
+CHUNK = 1024 * 1024
+# deflate looks back at most this far, so it is all the priming a piece needs
+DICT_SIZE = 32 * 1024
+# below this much data a pool costs more than it saves
+MIN_PARALLEL_BYTES = 4 * 1024 * 1024
+SAMPLE_SLICE = 16 * 1024
+DEFAULT_PRESET = 'balanced'
+
+# sizes and offsets above this need zip64 records (the limit zipfile uses)
+ZIP64_LIMIT = (1 << 31) - 1
+ZIP_MAX_ENTRIES = 0xFFFF
+# "version needed to extract" (APPNOTE 4.4.3)
+_VERSIONS = {zipfile.ZIP_STORED: 20, zipfile.ZIP_DEFLATED: 20, zipfile.ZIP_BZIP2: 46, zipfile.ZIP_LZMA: 63}
+ZIP64_VERSION = 45
+# general purpose flags: LZMA end-of-stream marker, UTF-8 names
+FLAG_LZMA_EOS = 0x02
+FLAG_UTF8 = 0x800
+
+_LOCAL_HEADER = struct.Struct('<4s2B4HL2L2H')
+_CENTRAL_HEADER = struct.Struct('<4s4B4HL2L5H2L')
+_END_RECORD = struct.Struct('<4s4H2LH')
+_END_RECORD64 = struct.Struct('<4sQ2H2L4Q')
+_END_LOCATOR64 = struct.Struct('<4sLQL')
+
+
+class Codec:
+    """A zip compression method plus level, e.g. deflate at level 6."""
+
+    def __init__(self, name, method, level=None):
+        self.name = name
+        self.method = method
+        self.level = level
+
+    @property
+    def available(self):
+        # bz2 and lzma are optional parts of a Python build
+        if self.method == zipfile.ZIP_BZIP2:
+            return bz2 is not None
+        if self.method == zipfile.ZIP_LZMA:
+            return lzma is not None
+        return True
+
+    def compressor(self):
+        """Return a fresh ``compress``/``flush`` object, or None for stored data."""
+        if self.method == zipfile.ZIP_DEFLATED:
+            return zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        if self.method == zipfile.ZIP_BZIP2:
+            return bz2.BZ2Compressor(self.level)
+        if self.method == zipfile.ZIP_LZMA:
+            return _LZMACompressor()
+        return None
+
+    def compress(self, data):
+        c = self.compressor()
+        if c is None:
+            return bytes(data)
+        return c.compress(data) + c.flush()
+
+
+STORED = Codec('stored', zipfile.ZIP_STORED)
+DEFLATE_FAST = Codec('deflate-1', zipfile.ZIP_DEFLATED, 1)
+DEFLATE = Codec('deflate-6', zipfile.ZIP_DEFLATED, 6)
+DEFLATE_BEST = Codec('deflate-9', zipfile.ZIP_DEFLATED, 9)
+BZIP2 = Codec('bzip2-9', zipfile.ZIP_BZIP2, 9)
+LZMA = Codec('lzma', zipfile.ZIP_LZMA)
+
+# preset -> (candidate codecs, store the file when the best candidate only
+# gets the sample down to this fraction of its size or worse)
+PRESETS = {
+    'fastest': ([DEFLATE_FAST], 0.9),
+    'balanced': ([DEFLATE], 0.95),
+    'smallest': ([DEFLATE_BEST], 0.98),
+    # bzip2 and LZMA members do not open in Explorer or Info-ZIP unzip
+    'max': ([DEFLATE_BEST, BZIP2, LZMA], 0.98),
+}
+
+
+class WriteResult:
+    """Sizes, wall time and per-codec totals of one archive write."""
+
+    def __init__(self, files, file_bytes, compressed_bytes, seconds, workers, preset, codecs):
+        self.files = files
+        self.file_bytes = file_bytes
+        self.compressed_bytes = compressed_bytes
+        self.seconds = seconds
+        self.workers = workers
+        self.preset = preset
+        # codec name -> {'files', 'bytes', 'compressed', 'seconds'}; seconds
+        # is CPU time spent compressing, summed over workers
+        self.codecs = codecs
+
+    @property
+    def ratio(self):
+        return self.compressed_bytes / self.file_bytes if self.file_bytes else 1.0
+
+    def summary(self):
+        """Return one line per codec used, e.g. ``deflate-6: 10 files, 4.0 MB -> 1.2 MB (30%), 0.21s``."""
+        lines = []
+        for name, c in sorted(self.codecs.items(), key=lambda kv: -kv[1]['bytes']):
+            ratio = c['compressed'] * 100.0 / c['bytes'] if c['bytes'] else 100.0
+            lines.append(f"{name}: {c['files']} files, {events.format_size(c['bytes'])} -> "
+                         f"{events.format_size(c['compressed'])} ({ratio:.0f}%), {c['seconds']:.2f}s")
+        return lines
+
+
+def write_zip(dest, members, workers=None, progress=None, preset=DEFAULT_PRESET):
+    """Write ``members`` to the zip ``dest`` and return a WriteResult.
+
+    ``members`` are ``(path, arcname)`` or ``(path, arcname, mtime_ns)``
+    tuples naming files; ``mtime_ns`` overrides the timestamp of ``path``.
+    ``preset`` is a key of PRESETS. The archive is written to a temporary
+    file and moved into place once complete. ``progress(done, total)`` is
+    called after each file.
+    """
+    if preset not in PRESETS:
+        raise ValueError(f"Unknown compression preset {preset!r} (choose from {', '.join(PRESETS)})")
+    t0 = time.monotonic()
+    infos = sorted(((_zipinfo(*m), m[0]) for m in members), key=lambda e: e[0].filename)
+    total_bytes = sum(info.file_size for info, _ in infos)
+    if workers is None:
+        workers = COMPRESS_WORKERS
+    if total_bytes < MIN_PARALLEL_BYTES:
+        workers = 1
+    codecs = {}
+    tmp = dest + '.tmp'
+    try:
+        with open(tmp, 'wb') as fp:
+            z = _ZipOutput(fp)
+            if workers > 1:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    _write_members(z, infos, pool, workers, preset, codecs, progress)
+            else:
+                _write_members(z, infos, _Inline(), 1, preset, codecs, progress)
+            z.close()
+            compressed = sum(info.compress_size for info, _ in z.entries)
+        os.replace(tmp, dest)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return WriteResult(len(infos), total_bytes, compressed, time.monotonic() - t0, workers, preset, codecs)
+
+
+def choose_codec(path, size, preset=DEFAULT_PRESET):
+    """Pick the codec for one file from a sample of its contents."""
+    if size == 0:
+        return STORED
+    candidates, store_above = PRESETS[preset]
+    sample = _read_sample(path, size)
+    best = None
+    best_size = None
+    for codec in candidates:
+        if not codec.available:
+            continue
+        n = len(codec.compress(sample))
+        if best is None or n < best_size:
+            best, best_size = codec, n
+    if best is None or best_size > len(sample) * store_above:
+        return STORED
+    return best
+
+
+def _read_sample(path, size):
+    """Return the start, middle and end of the file, or all of it when it is small."""
+    with open(path, 'rb') as f:
+        if size <= 3 * SAMPLE_SLICE:
+            return f.read()
+        parts = []
+        for offset in (0, size // 2 - SAMPLE_SLICE // 2, size - SAMPLE_SLICE):
+            f.seek(offset)
+            parts.append(f.read(SAMPLE_SLICE))
+        return b''.join(parts)
+
+
+def _zipinfo(path, arcname, mtime_ns=None):
+    info = zipfile.ZipInfo.from_file(path, arcname)
+    if mtime_ns is not None:
+        info.date_time = time.localtime(mtime_ns / 1e9)[:6]
+    # zip timestamps start in 1980
+    info.date_time = max(info.date_time, (1980, 1, 1, 0, 0, 0))
+    return info
+
+
+class _LZMACompressor:
+    """Raw LZMA1 stream behind the small header zip uses for method 14 (APPNOTE 5.8.8)."""
+
+    # lc=3, lp=0, pb=2 with an 8 MiB dictionary: what preset 6 uses
+    LC, LP, PB = 3, 0, 2
+    DICT_SIZE = 8 * 1024 * 1024
+
+    def __init__(self):
+        self._comp = lzma.LZMACompressor(lzma.FORMAT_RAW, filters=[{
+            'id': lzma.FILTER_LZMA1, 'preset': 6, 'dict_size': self.DICT_SIZE,
+            'lc': self.LC, 'lp': self.LP, 'pb': self.PB}])
+        props = struct.pack('<BL', (self.PB * 5 + self.LP) * 9 + self.LC, self.DICT_SIZE)
+        # LZMA SDK version 9.4, then the properties
+        self._header = struct.pack('<BBH', 9, 4, len(props)) + props
+
+    def compress(self, data):
+        out = self._header + self._comp.compress(data)
+        self._header = b''
+        return out
+
+    def flush(self):
+        # raw LZMA1 always ends with an end-of-stream marker (FLAG_LZMA_EOS)
+        out = self._header + self._comp.flush()
+        self._header = b''
+        return out
+
+
+class _ZipOutput:
+    """Writes members' headers and data to ``fp``, then the central directory."""
+
+    def __init__(self, fp):
+        self.fp = fp
+        # (ZipInfo, zip64 local header) of every finished member
+        self.entries = []
+
+    def start(self, info, zip64):
+        info.header_offset = self.fp.tell()
+        info.CRC = 0
+        info.compress_size = 0
+        self.fp.write(_local_header(info, zip64, final=False))
+
+    def write(self, data):
+        self.fp.write(data)
+
+    def finish(self, info, zip64):
+        """Rewrite the member's local header now that its CRC and sizes are known."""
+        end_offset = self.fp.tell()
+        self.fp.seek(info.header_offset)
+        self.fp.write(_local_header(info, zip64, final=True))
+        self.fp.seek(end_offset)
+        self.entries.append((info, zip64))
+
+    def close(self):
+        fp = self.fp
+        start = fp.tell()
+        for info, zip64 in self.entries:
+            fp.write(_central_header(info, zip64))
+        end = fp.tell()
+        count = len(self.entries)
+        size = end - start
+        if count > ZIP_MAX_ENTRIES or start > ZIP64_LIMIT or size > ZIP64_LIMIT:
+            fp.write(_END_RECORD64.pack(b'PK\x06\x06', _END_RECORD64.size - 12, ZIP64_VERSION, ZIP64_VERSION,
+                                        0, 0, count, count, size, start))
+            fp.write(_END_LOCATOR64.pack(b'PK\x06\x07', 0, end, 1))
+            fp.write(_END_RECORD.pack(b'PK\x05\x06', 0, 0, min(count, ZIP_MAX_ENTRIES),
+                                      min(count, ZIP_MAX_ENTRIES), 0xFFFFFFFF, 0xFFFFFFFF, 0))
+        else:
+            fp.write(_END_RECORD.pack(b'PK\x05\x06', 0, 0, count, count, size, start, 0))
+
+
+def _encoded_name(info):
+    try:
+        return info.filename.encode('ascii'), info.flag_bits & ~FLAG_UTF8
+    except UnicodeEncodeError:
+        return info.filename.encode('utf-8'), info.flag_bits | FLAG_UTF8
+
+
+def _dos_date_time(info):
+    year, month, day, hour, minute, second = info.date_time
+    return (year - 1980) << 9 | month << 5 | day, hour << 11 | minute << 5 | second // 2
+
+
+def _version(info, zip64):
+    version = _VERSIONS.get(info.compress_type, 20)
+    return max(version, ZIP64_VERSION) if zip64 else version
+
+
+def _local_header(info, zip64, final):
+    """Local file header; with ``zip64`` the sizes live in a zip64 extra field."""
+    name, flags = _encoded_name(info)
+    date, dostime = _dos_date_time(info)
+    if zip64:
+        # the extra field is written from the start so the header keeps its
+        # length when it is rewritten
+        extra = struct.pack('<HHQQ', 1, 16, info.file_size if final else 0, info.compress_size)
+        sizes = (0xFFFFFFFF, 0xFFFFFFFF)
+    else:
+        extra = b''
+        sizes = (info.compress_size, info.file_size)
+    return _LOCAL_HEADER.pack(b'PK\x03\x04', _version(info, zip64), 0, flags, info.compress_type,
+                              dostime, date, info.CRC, sizes[0], sizes[1], len(name), len(extra)) + name + extra
+
+
+def _central_header(info, zip64):
+    name, flags = _encoded_name(info)
+    date, dostime = _dos_date_time(info)
+    # zip64 extra: only the fields that do not fit, in this order
+    fields = []
+    file_size, compress_size, offset = info.file_size, info.compress_size, info.header_offset
+    if file_size > ZIP64_LIMIT:
+        fields.append(file_size)
+        file_size = 0xFFFFFFFF
+    if compress_size > ZIP64_LIMIT:
+        fields.append(compress_size)
+        compress_size = 0xFFFFFFFF
+    if offset > ZIP64_LIMIT:
+        fields.append(offset)
+        offset = 0xFFFFFFFF
+    extra = struct.pack(f'<HH{len(fields)}Q', 1, 8 * len(fields), *fields) if fields else b''
+    version = _version(info, zip64 or bool(fields))
+    return _CENTRAL_HEADER.pack(b'PK\x01\x02', version, info.create_system, version, 0, flags,
+                                info.compress_type, dostime, date, info.CRC, compress_size, file_size,
+                                len(name), len(extra), 0, 0, 0, info.external_attr, offset) + name + extra
+
+
+class _Inline:
+    """Stand-in for a thread pool that runs each job as it is submitted."""
+
+    def submit(self, fn, *args):
+        f = Future()
+        try:
+            f.set_result(fn(*args))
+        except BaseException as e:
+            f.set_exception(e)
+        return f
+
+
+def _timed(fn, *args):
+    # CPU time of this thread, so jobs waiting on each other do not count
+    t0 = time.thread_time()
+    return fn(*args), time.thread_time() - t0
+
+
+def _deflate_piece(data, zdict, final, level):
+    if zdict:
+        c = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=zdict)
+    else:
+        c = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    # a sync flush ends the piece on a byte boundary without marking the
+    # last block, so the next piece's stream can simply follow it
+    return c.compress(data) + c.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def _compress_whole(path, codec):
+    """Compress a file as one stream; return ``(compressed, crc, size)``."""
+    c = codec.compressor()
+    out = []
+    crc = 0
+    size = 0
+    with open(path, 'rb') as src:
+        while True:
+            data = src.read(CHUNK)
+            if not data:
+                break
+            crc = zlib.crc32(data, crc)
+            size += len(data)
+            out.append(c.compress(data))
+    out.append(c.flush())
+    return b''.join(out), crc, size
+
+
+def _write_members(z, infos, pool, workers, preset, codecs, progress):
+    """Compress on ``pool`` and write the results in order to ``z`` (a _ZipOutput).
+
+    Each local header is written with zero sizes first and rewritten once
+    the member is complete, the same way ``zipfile`` handles streamed
+    writes. Only a bounded number of jobs are in flight at once.
+    """
+    pending = collections.deque()
+    max_pending = workers * 4
+    chosen = {}
+    done = [0]
+
+    def drain(limit):
+        while len(pending) > limit:
+            kind, info, value = pending.popleft()
+            stats = codecs[chosen[info.filename].name]
+            if kind == 'start':
+                z.start(info, value)
+            elif kind == 'piece':
+                data, seconds = value.result()
+                z.write(data)
+                info.compress_size += len(data)
+                stats['seconds'] += seconds
+            elif kind == 'whole':
+                (data, info.CRC, info.file_size), seconds = value.result()
+                z.write(data)
+                info.compress_size = len(data)
+                stats['seconds'] += seconds
+            else:
+                _finish_member(z, info, *value)
+                stats['files'] += 1
+                stats['bytes'] += info.file_size
+                stats['compressed'] += info.compress_size
+                done[0] += 1
+                if progress:
+                    progress(done[0], len(infos))
+
+    # sampling is cheap next to compressing, and doing it on the pool keeps
+    # the main thread free to read and queue pieces
+    choices = [pool.submit(choose_codec, path, info.file_size, preset) for info, path in infos]
+    try:
+        for (info, path), choice in zip(infos, choices):
+            codec = chosen[info.filename] = choice.result()
+            codecs.setdefault(codec.name, {'files': 0, 'bytes': 0, 'compressed': 0, 'seconds': 0.0})
+            info.compress_type = codec.method
+            if codec.method == zipfile.ZIP_LZMA:
+                # the stream ends with an end-of-stream marker
+                info.flag_bits |= FLAG_LZMA_EOS
+            zip64 = info.file_size * 1.05 > ZIP64_LIMIT
+            pending.append(('start', info, zip64))
+            if codec.method in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+                crc, size = _queue_pieces(pending, pool, info, path, codec, drain, max_pending)
+                pending.append(('end', info, (crc, size, zip64)))
+            else:
+                pending.append(('whole', info, pool.submit(_timed, _compress_whole, path, codec)))
+                pending.append(('end', info, (None, None, zip64)))
+            drain(max_pending)
+        drain(0)
+    except BaseException:
+        for f in choices:
+            f.cancel()
+        for _, _, value in pending:
+            if isinstance(value, Future):
+                value.cancel()
+        raise
+
+
+def _queue_pieces(pending, pool, info, path, codec, drain, max_pending):
+    """Queue ``path`` in CHUNK pieces (deflated on the pool, or as they are); return ``(crc, size)``."""
+    crc = 0
+    size = 0
+    with open(path, 'rb') as src:
+        data = src.read(CHUNK)
+        zdict = b''
+        while True:
+            following = src.read(CHUNK)
+            final = not following
+            crc = zlib.crc32(data, crc)
+            size += len(data)
+            if codec.method == zipfile.ZIP_STORED:
+                piece = Future()
+                piece.set_result((data, 0.0))
+            else:
+                piece = pool.submit(_timed, _deflate_piece, data, zdict, final, codec.level)
+            pending.append(('piece', info, piece))
+            drain(max_pending)
+            if final:
+                return crc, size
+            zdict = data[-DICT_SIZE:]
+            data = following
+
+
+def _finish_member(z, info, crc, size, zip64):
+    """Patch the local header of a completed member and record it in ``z``."""
+    if crc is not None:
+        info.CRC = crc
+        info.file_size = size
+    if not zip64 and max(info.file_size, info.compress_size) > ZIP64_LIMIT:
+        raise RuntimeError(f"{info.filename} grew past 2 GiB while it was being compressed")
+    z.finish(info, zip64)